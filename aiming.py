@@ -0,0 +1,166 @@
+"""
+Precomputed aiming table for the spotlight.
+
+Tabulates the strut extensions calculate_actuator_offsets() gives for a
+grid of radar angles (-90..90 degrees) and distances (0..8000 mm) and
+interpolates bilinearly in between, so arrays of targets can be mapped to
+strut extensions in one vectorized step. The table is cached in an .npz
+file together with the geometry it was built for, and is rebuilt when the
+geometry changes. Every table carries its measured worst case error
+against the closed form function.
+
+Usage:
+    table = AimingTable.load_or_build('aiming_table.npz', func, params)
+    x, y = table.lookup(angles, distances)
+
+    python aiming.py    # build the table for motor.py and benchmark it
+"""
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+ANGLE_RANGE = (-90.0, 90.0)         # degrees
+DISTANCE_RANGE = (0.0, 8000.0)      # mm
+ERROR_SAMPLES = 20000               # random targets used to measure the error bound
+
+log = logging.getLogger('aiming')
+
+
+class AimingTable:
+    """Strut extensions on a regular (angle, distance) grid.
+
+    Args:
+        angles: Grid angles in degrees, evenly spaced.
+        distances: Grid distances in mm, evenly spaced.
+        x, y: Strut extensions (mm) for each (angle, distance) cell.
+        params: The geometry the table was built for, e.g. LIGHT_HEIGHT_CM.
+        error_bound_mm: Largest error seen against the closed form, or None.
+    """
+
+    def __init__(self, angles, distances, x, y, params, error_bound_mm=None):
+        self.angles = angles
+        self.distances = distances
+        self.x = x
+        self.y = y
+        self.params = params
+        self.error_bound_mm = error_bound_mm
+        self._angle_step = angles[1] - angles[0]
+        self._distance_step = distances[1] - distances[0]
+
+    @property
+    def steps(self):
+        return float(self._angle_step), float(self._distance_step)
+
+    @classmethod
+    def build(cls, func, params, angle_step=0.5, distance_step=25.0):
+        """Tabulate func(angle, distance) -> (x, y) and measure the interpolation error"""
+        angles = np.linspace(*ANGLE_RANGE, int(round((ANGLE_RANGE[1] - ANGLE_RANGE[0]) / angle_step)) + 1)
+        distances = np.linspace(*DISTANCE_RANGE,
+                                int(round((DISTANCE_RANGE[1] - DISTANCE_RANGE[0]) / distance_step)) + 1)
+        x = np.empty((len(angles), len(distances)))
+        y = np.empty_like(x)
+        for i, angle in enumerate(angles.tolist()):
+            for j, distance in enumerate(distances.tolist()):
+                x[i, j], y[i, j] = func(angle, distance)
+        table = cls(angles, distances, x, y, params)
+        table.error_bound_mm = table.measure_error(func)
+        return table
+
+    def measure_error(self, func, samples=ERROR_SAMPLES, seed=0):
+        """Largest difference from func over random targets, in mm"""
+        rng = np.random.default_rng(seed)
+        angles = rng.uniform(*ANGLE_RANGE, samples)
+        distances = rng.uniform(*DISTANCE_RANGE, samples)
+        x, y = self.lookup(angles, distances)
+        exact = np.array([func(a, d) for a, d in zip(angles.tolist(), distances.tolist())])
+        return float(max(np.abs(x - exact[:, 0]).max(), np.abs(y - exact[:, 1]).max()))
+
+    def lookup(self, angles, distances):
+        """Strut extensions for arrays of targets.
+
+        Args:
+            angles: Radar angles in degrees, any shape; clipped to -90..90.
+            distances: Radar distances in mm, same shape; clipped to 0..8000.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: x and y extensions in mm.
+        """
+        a = (np.clip(np.asarray(angles, dtype=float), *ANGLE_RANGE) - self.angles[0]) / self._angle_step
+        d = (np.clip(np.asarray(distances, dtype=float), *DISTANCE_RANGE) - self.distances[0]) / self._distance_step
+        i = np.minimum(a.astype(np.intp), len(self.angles) - 2)
+        j = np.minimum(d.astype(np.intp), len(self.distances) - 2)
+        ta = a - i
+        td = d - j
+        w00 = (1 - ta) * (1 - td)
+        w10 = ta * (1 - td)
+        w01 = (1 - ta) * td
+        w11 = ta * td
+
+        def interpolate(grid):
+            return grid[i, j] * w00 + grid[i + 1, j] * w10 + grid[i, j + 1] * w01 + grid[i + 1, j + 1] * w11
+
+        return interpolate(self.x), interpolate(self.y)
+
+    def save(self, path):
+        np.savez(path, angles=self.angles, distances=self.distances, x=self.x, y=self.y,
+                 params=json.dumps(self.params, sort_keys=True), error_bound_mm=self.error_bound_mm)
+
+    @classmethod
+    def load(cls, path, params, angle_step=0.5, distance_step=25.0):
+        """The cached table, or None if it is missing or was built for other params or steps"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if json.loads(str(data['params'])) != params:
+                    return None
+                table = cls(data['angles'], data['distances'], data['x'], data['y'], params,
+                            float(data['error_bound_mm']))
+        except (OSError, ValueError, KeyError):
+            return None  # Unreadable cache, build a new one
+        if not np.allclose(table.steps, (angle_step, distance_step)):
+            return None
+        return table
+
+    @classmethod
+    def load_or_build(cls, path, func, params, angle_step=0.5, distance_step=25.0):
+        """Load the cached table for params, or build it and update the cache"""
+        table = cls.load(path, params, angle_step, distance_step)
+        if table is None:
+            started = time.monotonic()
+            table = cls.build(func, params, angle_step, distance_step)
+            log.info('built aiming table', extra={'shape': table.x.shape,
+                                                  'seconds': round(time.monotonic() - started, 1),
+                                                  'error_bound_mm': round(table.error_bound_mm, 3)})
+            try:
+                table.save(path)
+            except OSError as e:
+                log.warning('could not cache aiming table', extra={'path': path, 'error': str(e)})
+        return table
+
+
+def main():
+    import motor
+
+    table = motor.aim_table()
+    print(f"{table.x.shape[0]} angles x {table.x.shape[1]} distances, steps {table.steps}")
+    print(f"error bound {table.error_bound_mm:.4f} mm over {ERROR_SAMPLES} random targets")
+
+    rng = np.random.default_rng(1)
+    angles = rng.uniform(*ANGLE_RANGE, 100000)
+    distances = rng.uniform(*DISTANCE_RANGE, 100000)
+    started = time.perf_counter()
+    for a, d in zip(angles.tolist(), distances.tolist()):
+        motor.calculate_actuator_offsets(a, d, 0.0, 0.0)
+    closed_form = time.perf_counter() - started
+    started = time.perf_counter()
+    table.lookup(angles, distances)
+    batch = time.perf_counter() - started
+    print(f"100000 targets: closed form {closed_form * 1000:.1f} ms, table batch {batch * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
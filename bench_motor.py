@@ -0,0 +1,116 @@
+"""
+Benchmark for the strut motion timing code.
+
+Runs moves through motor.drive() on the fake GPIO backend, so it works on
+any Linux machine without RPi.GPIO, and reports:
+
+- release error: when each strut was actually released vs. the requested time
+- stop latency: from cancelling a move to both struts being released
+- GPIO writes per move, against the old setup/cleanup per move pattern
+
+Usage:
+    python bench_motor.py [moves]
+"""
+import contextlib
+import io
+import random
+import sys
+import threading
+import time
+
+import motor
+from gpio_backend import FakeBackend, GPIODriver
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summary(name, values_ms):
+    print(f"{name:>22} {sum(values_ms) / len(values_ms):>8.2f} {percentile(values_ms, 0.5):>8.2f} "
+          f"{percentile(values_ms, 0.99):>8.2f} {max(values_ms):>8.2f}")
+
+
+def release_times(backend, since):
+    """First time each strut's pins all went low after since"""
+    released = {}
+    for when, pin, level in backend.edges:
+        if when >= since and not level:
+            for strut, pins in enumerate(motor.STRUT_PINS):
+                if pin in pins:
+                    released[strut] = when
+    return released
+
+
+def release_error(backend, moves, rng):
+    """Milliseconds between the requested and actual release of each strut"""
+    errors = []
+    for _ in range(moves):
+        seconds = (rng.uniform(0.02, 0.3) * rng.choice((1, -1)), rng.uniform(0.02, 0.3) * rng.choice((1, -1)))
+        started = time.monotonic()
+        motor.drive(seconds, token=motor.CancelToken())
+        released = release_times(backend, started)
+        for strut, strut_seconds in enumerate(seconds):
+            errors.append((released[strut] - started - abs(strut_seconds)) * 1000)
+    return errors
+
+
+def stop_latency(backend, moves, rng):
+    """Milliseconds from CancelToken.cancel() to both struts released"""
+    latencies = []
+    for _ in range(moves):
+        token = motor.CancelToken()
+        cancel_at = [None]
+
+        def cancel():
+            cancel_at[0] = time.monotonic()
+            token.cancel('bench')
+
+        timer = threading.Timer(rng.uniform(0.01, 0.2), cancel)
+        timer.start()
+        motor.drive((1.0, -1.0), token=token)
+        timer.join()
+        released = release_times(backend, cancel_at[0])
+        latencies.append((max(released.values()) - cancel_at[0]) * 1000)
+    return latencies
+
+
+def writes_per_move(moves):
+    """Backend calls per move, persistent session vs. setup/cleanup per move"""
+    persistent = FakeBackend()
+    motor.gpio = GPIODriver(motor.gpio.pins, persistent)
+    motor.init()
+    for _ in range(moves):
+        motor.drive((0.001, -0.001), token=motor.CancelToken())
+
+    per_move = FakeBackend()
+    for _ in range(moves):
+        motor.gpio = GPIODriver(motor.gpio.pins, per_move)
+        motor.init()
+        motor.drive((0.001, -0.001), token=motor.CancelToken())
+        motor.gpio.close()
+    return ((persistent.writes + persistent.setups) / moves,
+            (per_move.writes + per_move.setups * len(motor.gpio.pins)) / moves)
+
+
+def main():
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(1)
+    backend = FakeBackend()
+    motor.gpio = GPIODriver(motor.gpio.pins, backend)
+    motor.init()
+
+    print(f"{moves} moves, control tick {motor.CONTROL_TICK_SECONDS * 1000:.0f} ms")
+    print(f"{'ms':>22} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8}")
+    with contextlib.redirect_stdout(io.StringIO()):  # motor prints every duty cycle update
+        errors = release_error(backend, moves, rng)
+        latencies = stop_latency(backend, moves, rng)
+        persistent, per_move = writes_per_move(moves)
+    summary('release error', errors)
+    summary('stop latency', latencies)
+    print(f"GPIO calls per move: {persistent:.1f} persistent, {per_move:.1f} with setup/cleanup per move")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Microbenchmark for the RD03D frame scanner.
+
+Feeds synthetic radar byte streams through the legacy byte-by-byte frame
+search and the current single-pass scanner, polling in chunks of different
+sizes the way RD03D.update() sees them from the UART.
+
+Usage:
+    python bench_rd03d.py [frames]
+"""
+import random
+import struct
+import sys
+import time
+
+from rd03d import RD03D
+
+
+def encode_signed16(value):
+    """Inverse of RD03D.parse_signed16 (sign bit set means positive)"""
+    return (abs(value) | 0x8000) if value >= 0 else abs(value)
+
+
+def make_frame(targets):
+    """Build a 30 byte RD03D frame from (x, y, speed, pixel_distance) tuples"""
+    body = b''.join(struct.pack('<HHHH', encode_signed16(x), encode_signed16(y),
+                                encode_signed16(speed), pixel_distance)
+                    for x, y, speed, pixel_distance in targets)
+    return RD03D.FRAME_HEADER + body + RD03D.FRAME_TAIL
+
+
+def make_stream(frame_count, seed=1):
+    """A byte stream of frame_count frames with the odd line-noise byte in between"""
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(frame_count):
+        targets = [(rng.randint(-4000, 4000), rng.randint(0, 8000),
+                    rng.randint(-50, 50), rng.randint(0, 400)) for _ in range(3)]
+        chunks.append(make_frame(targets))
+        if rng.random() < 0.05:
+            chunks.append(bytes([rng.randint(0, 255)]))
+    return b''.join(chunks)
+
+
+class StreamSerial:
+    """Serves a recorded byte stream in fixed size chunks, like a busy UART"""
+
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.pos = 0
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk_size, len(self.data) - self.pos)
+
+    def read(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def write(self, data):
+        return len(data)  # Mode commands go nowhere
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+
+class LegacyRD03D(RD03D):
+    """The original byte-by-byte scanner, kept for comparison"""
+
+    def _find_complete_frame(self, data):
+        start_idx = -1
+        for i in range(len(data) - 1):
+            if data[i] == 0xAA and data[i+1] == 0xFF:
+                start_idx = i
+                break
+
+        if start_idx == -1:
+            return None, data
+
+        for i in range(start_idx + 2, len(data) - 1):
+            if data[i] == 0x55 and data[i+1] == 0xCC:
+                return data[start_idx:i+2], data[i+2:]
+
+        return None, data[start_idx:]
+
+    def update(self):
+        if self.uart.in_waiting > 0:
+            self.buffer += self.uart.read(self.uart.in_waiting)
+
+        if len(self.buffer) > 300:
+            self.buffer = self.buffer[-150:]
+
+        latest_frame = None
+        temp_buffer = self.buffer
+        while True:
+            frame, temp_buffer = self._find_complete_frame(temp_buffer)
+            if frame:
+                latest_frame = frame
+            else:
+                break
+
+        if latest_frame:
+            frame_end_pos = self.buffer.rfind(latest_frame) + len(latest_frame)
+            self.buffer = self.buffer[frame_end_pos:]
+            decoded = self._decode_frame(latest_frame)
+            if decoded:
+                self.targets = decoded
+                return True
+
+        return False
+
+
+def make_radar(cls, data, chunk_size):
+    """Create a radar object reading from a byte stream instead of a serial port"""
+    radar = cls(uart=StreamSerial(data, chunk_size))
+    if cls is LegacyRD03D:
+        radar.buffer = b''  # The legacy scanner grows a bytes buffer
+    return radar
+
+
+def run(cls, data, chunk_size):
+    """Poll until the stream is drained, returns (seconds, polls, updates)"""
+    radar = make_radar(cls, data, chunk_size)
+    polls = updates = 0
+    started = time.perf_counter()
+    while radar.uart.pos < len(data):
+        polls += 1
+        if radar.update():
+            updates += 1
+    return time.perf_counter() - started, polls, updates
+
+
+def main():
+    frame_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    data = make_stream(frame_count)
+    print(f"{frame_count} frames, {len(data)} bytes")
+    print(f"{'chunk':>6} {'path':>8} {'polls':>7} {'updates':>8} {'total ms':>10} {'us/poll':>9}")
+    for chunk_size in (30, 64, 150, 300, 1024):
+        for name, cls in (('legacy', LegacyRD03D), ('scanner', RD03D)):
+            seconds, polls, updates = run(cls, data, chunk_size)
+            print(f"{chunk_size:>6} {name:>8} {polls:>7} {updates:>8} "
+                  f"{seconds * 1000:>10.1f} {seconds / polls * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
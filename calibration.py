@@ -0,0 +1,242 @@
+"""
+Strut calibration: how far each actuator moves for a given drive time.
+
+Every strut has a speed curve per direction:
+
+    seconds = lag + mm / speed,   speed = mm_per_second + load * position_mm
+
+lag is the start-up time before the actuator moves at all and load is how
+the speed changes with extension (mm/s per mm), e.g. as the weight of the
+light works with or against the strut. position_mm is taken halfway through
+the move. Curves are fitted from a move log of measured moves (JSON lines
+written by /calibrate in motor.py) and stored in a JSON file.
+
+Usage:
+    python calibration.py fit [--log moves.jsonl] [--output calibration.json]
+    python calibration.py show [calibration.json]
+"""
+import argparse
+import json
+import os
+import time
+
+CALIBRATION_FILE = 'calibration.json'
+MOVE_LOG_FILE = 'moves.jsonl'
+DIRECTIONS = {1: 'extend', -1: 'retract'}
+MIN_SPEED = 0.1  # mm/s, stops a badly fitted load term from stalling the model
+MIN_ERROR_FRACTION = 0.01
+
+
+class SpeedCurve:
+    """Speed of one strut in one direction.
+
+    Args:
+        direction: 1 for extend, -1 for retract.
+        mm_per_second: Speed with the strut fully in.
+        lag_seconds: Drive time before the strut starts moving.
+        load: Change of speed with extension in mm/s per mm.
+        error_fraction: Standard deviation of the distance error relative to the distance.
+        samples: Number of measured moves the curve was fitted from.
+    """
+
+    def __init__(self, direction, mm_per_second, lag_seconds=0.0, load=0.0, error_fraction=0.05, samples=0):
+        self.direction = direction
+        self.mm_per_second = mm_per_second
+        self.lag_seconds = lag_seconds
+        self.load = load
+        self.error_fraction = error_fraction
+        self.samples = samples
+
+    def speed(self, position_mm):
+        return max(MIN_SPEED, self.mm_per_second + self.load * position_mm)
+
+    def duration(self, mm, position_mm):
+        """Seconds of drive to move mm (either sign) from position_mm"""
+        mm = abs(mm)
+        if not mm:
+            return 0.0
+        return self.lag_seconds + mm / self.speed(position_mm + self.direction * mm / 2)
+
+    def distance(self, seconds, position_mm):
+        """mm moved, as a magnitude, by seconds of drive from position_mm"""
+        moving = abs(seconds) - self.lag_seconds
+        if moving <= 0:
+            return 0.0
+        # Solve mm = moving * speed(position + direction * mm / 2) for mm
+        denominator = 1.0 - self.direction * self.load * moving / 2
+        if denominator < 0.5:
+            return moving * self.speed(position_mm)
+        return max(0.0, moving * (self.mm_per_second + self.load * position_mm) / denominator)
+
+    def to_dict(self):
+        return {
+            'mm_per_second': self.mm_per_second,
+            'lag_seconds': self.lag_seconds,
+            'load': self.load,
+            'error_fraction': self.error_fraction,
+            'samples': self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, direction, data):
+        return cls(direction, data['mm_per_second'], data.get('lag_seconds', 0.0), data.get('load', 0.0),
+                   data.get('error_fraction', 0.05), data.get('samples', 0))
+
+
+class Calibration:
+    """Speed curves for every strut and direction.
+
+    Args:
+        curves: One {1: SpeedCurve, -1: SpeedCurve} dict per strut.
+        fitted_at: Wall clock time of the fit, None for defaults.
+    """
+
+    def __init__(self, curves, fitted_at=None):
+        self.curves = curves
+        self.fitted_at = fitted_at
+
+    @classmethod
+    def default(cls, seconds_per_mm):
+        """Constant speed curves from one seconds per mm rate per strut"""
+        return cls([{direction: SpeedCurve(direction, 1.0 / rate) for direction in DIRECTIONS}
+                    for rate in seconds_per_mm])
+
+    @classmethod
+    def load(cls, path, seconds_per_mm):
+        """Read a calibration file, or defaults from seconds_per_mm if there is none"""
+        if not os.path.exists(path):
+            return cls.default(seconds_per_mm)
+        with open(path) as f:
+            data = json.load(f)
+        curves = []
+        for strut in data['struts']:
+            curves.append({direction: SpeedCurve.from_dict(direction, strut[name])
+                           for direction, name in DIRECTIONS.items()})
+        return cls(curves, data.get('fitted_at'))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_dict(self):
+        return {
+            'fitted_at': self.fitted_at,
+            'struts': [{name: strut[direction].to_dict() for direction, name in DIRECTIONS.items()}
+                       for strut in self.curves],
+        }
+
+    def curve(self, strut, sign):
+        return self.curves[strut][1 if sign >= 0 else -1]
+
+    def duration(self, strut, mm, position_mm):
+        """Signed seconds of drive to move a strut mm from position_mm"""
+        seconds = self.curve(strut, mm).duration(mm, position_mm)
+        return seconds if mm >= 0 else -seconds
+
+    def distance(self, strut, seconds, position_mm):
+        """Signed mm a strut moves in seconds of drive from position_mm"""
+        mm = self.curve(strut, seconds).distance(seconds, position_mm)
+        return mm if seconds >= 0 else -mm
+
+    def error_mm(self, strut, mm):
+        """Standard deviation of the error of a move of mm"""
+        return self.curve(strut, mm).error_fraction * abs(mm)
+
+
+def append_log(path, strut, seconds, start_mm, moved_mm):
+    """Add one measured move to a move log"""
+    entry = {'time': time.time(), 'strut': strut, 'seconds': seconds,
+             'start_mm': start_mm, 'moved_mm': moved_mm}
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def fit_curve(direction, moves, default):
+    """Fit a SpeedCurve to measured moves of one strut in one direction.
+
+    moved = (seconds - lag) * (mm_per_second + load * mid) is linear in
+    [seconds, 1, seconds * mid, mid] once mid comes from the measured move,
+    so this is a least squares fit. With few or similar moves it falls back
+    to lag and speed, or speed alone.
+    """
+    import numpy as np
+
+    seconds = np.array([abs(m['seconds']) for m in moves], dtype=float)
+    moved = np.array([abs(m['moved_mm']) for m in moves], dtype=float)
+    mid = np.array([m['start_mm'] for m in moves], dtype=float) + direction * moved / 2
+
+    lag, load = 0.0, 0.0
+    if len(moves) >= 5 and np.ptp(mid) > 10 and np.ptp(seconds) > 0.5:
+        features = np.column_stack([seconds, np.ones_like(seconds), seconds * mid, mid])
+        (speed, offset, load, _), *_ = np.linalg.lstsq(features, moved, rcond=None)
+        lag = -offset / speed if speed > 0 else 0.0
+    elif len(moves) >= 3 and np.ptp(seconds) > 0.5:
+        features = np.column_stack([seconds, np.ones_like(seconds)])
+        (speed, offset), *_ = np.linalg.lstsq(features, moved, rcond=None)
+        lag = -offset / speed if speed > 0 else 0.0
+    elif len(moves):
+        speed = moved.sum() / seconds.sum()
+    else:
+        return default
+    if speed <= 0:
+        return default
+
+    curve = SpeedCurve(direction, float(speed), max(0.0, float(lag)), float(load), samples=len(moves))
+    predicted = np.array([curve.distance(s, m['start_mm']) for s, m in zip(seconds, moves)])
+    relative = (predicted - moved) / np.maximum(moved, 1.0)
+    curve.error_fraction = max(MIN_ERROR_FRACTION, float(np.sqrt(np.mean(relative ** 2))))
+    return curve
+
+
+def fit(moves, default):
+    """A Calibration fitted from a move log, keeping default curves where there is no data"""
+    curves = []
+    for strut, default_curves in enumerate(default.curves):
+        curves.append({direction: fit_curve(direction, [m for m in moves if m['strut'] == strut
+                                                         and (m['seconds'] > 0) == (direction > 0)],
+                                            default_curves[direction])
+                       for direction in DIRECTIONS})
+    return Calibration(curves, time.time())
+
+
+def show(path):
+    with open(path) as f:
+        data = json.load(f)
+    fitted = data.get('fitted_at')
+    print(f"{path}: fitted {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fitted)) if fitted else 'never'}")
+    print(f"{'strut':>5} {'direction':>9} {'mm/s':>7} {'lag s':>7} {'load':>8} {'error':>6} {'moves':>6}")
+    for strut, curves in enumerate(data['struts']):
+        for name in DIRECTIONS.values():
+            c = curves[name]
+            print(f"{strut:>5} {name:>9} {c['mm_per_second']:>7.2f} {c['lag_seconds']:>7.3f} "
+                  f"{c['load']:>8.4f} {c['error_fraction']:>6.1%} {c['samples']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit and inspect strut calibration')
+    commands = parser.add_subparsers(dest='command', required=True)
+    fit_parser = commands.add_parser('fit', help='fit speed curves from a move log')
+    fit_parser.add_argument('--log', default=MOVE_LOG_FILE)
+    fit_parser.add_argument('--output', default=CALIBRATION_FILE)
+    show_parser = commands.add_parser('show', help='print a calibration file')
+    show_parser.add_argument('file', nargs='?', default=CALIBRATION_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'fit':
+        from motor import SECONDS_PER_MM_STRUT0, SECONDS_PER_MM_STRUT1
+        default = Calibration.load(args.output, (SECONDS_PER_MM_STRUT0, SECONDS_PER_MM_STRUT1))
+        moves = read_log(args.log)
+        fit(moves, default).save(args.output)
+        print(f"Fitted {len(moves)} moves from {args.log}")
+        show(args.output)
+    else:
+        show(args.file)
+
+
+if __name__ == "__main__":
+    main()
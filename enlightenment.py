@@ -1,26 +1,46 @@
-import json
+import argparse
+import asyncio
+import logging
 
-from rd03d import RD03D
-import time
+import logs
+from radar_capture import add_replay_arguments, open_radar
+from tracker import MultiTargetTracker
 
-# Initialize radar with Pi 5 UART settings
-radar = RD03D()  # Uses /dev/ttyAMA0 by default
+log = logging.getLogger('enlightenment')
 
-radar.set_multi_mode(True)   # Switch to multi-target mode
 
-while True:
-    if radar.update():
-        try:
-            target1 = radar.get_target(1)
-            target2 = radar.get_target(2)
-            target3 = radar.get_target(3)
-            position = { 'distance_mm': target1.distance, 'angle': target1.angle, 'speed': target1.speed, 'x': target1.x, 'y': target1.y }
-            print(json.dumps(position, indent=4))
-            print('1 dist:', target1.distance, 'mm Angle:', target1.angle, " deg Speed:", target1.speed, "cm/s X:", target1.x, "mm Y:", target1.y, "mm")
-        except Exception as e:
-            print(e)
+async def main(replay=None, speed=1.0):
+    # Initialize radar with Pi 5 UART settings, or a recorded capture
+    radar = open_radar(replay, speed)  # Uses /dev/ttyAMA0 by default
 
-    else:
-        print('No radar data received.')
+    radar.set_multi_mode(True)   # Switch to multi-target mode
 
-    time.sleep(1)
+    # Follow people across frames, the sensor reorders its target slots
+    tracker = MultiTargetTracker()
+
+    try:
+        # Frames arrive as soon as they are decoded; keep a few so the tracker sees every one
+        async for frame in radar.frames(queue_depth=8, idle_timeout=1):
+            if frame is None:
+                log.warning('no radar data received')
+                continue
+            try:
+                tracker.update(frame.targets, frame.timestamp)
+                target1 = tracker.best()
+                if target1 is None:
+                    continue
+                position = { 'track_id': target1.id, 'confidence': target1.confidence, 'distance_mm': target1.distance, 'angle': target1.angle, 'speed': target1.speed, 'x': target1.x, 'y': target1.y }
+                # Written by the log thread, a slow console doesn't hold up the radar
+                log.info('target', extra=position)
+            except Exception:
+                log.exception('frame failed')
+    finally:
+        radar.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Log radar targets as JSON lines')
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+    logs.setup(console_level='INFO')
+    asyncio.run(main(args.replay, args.speed))
@@ -0,0 +1,162 @@
+"""
+GPIO access for the strut drivers.
+
+GPIODriver claims the output pins once, keeps them driven low while the
+struts are idle and only releases them on close(), i.e. on /shutdown or
+when the process exits. Pin access goes through a backend: RPiBackend on
+the Pi, or FakeBackend anywhere else, e.g. to benchmark the motion timing
+code on a machine without RPi.GPIO.
+
+Usage:
+    gpio = GPIODriver((17, 22, 23, 25))           # RPi.GPIO if available
+    gpio = GPIODriver((17, 22, 23, 25), FakeBackend())
+    gpio.output(17, True)
+    gpio.close()
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger('gpio')
+
+
+class GPIOBackend:
+    """The part of a GPIO library GPIODriver needs"""
+
+    def setup(self, pins):
+        """Configure pins as outputs, driven low"""
+        raise NotImplementedError
+
+    def output(self, pin, level):
+        raise NotImplementedError
+
+    def cleanup(self, pins):
+        """Give the pins back, e.g. as inputs"""
+        raise NotImplementedError
+
+
+class RPiBackend(GPIOBackend):
+    """RPi.GPIO with BCM pin numbers"""
+
+    def __init__(self):
+        import RPi.GPIO as gpio  # Only installed on the Pi
+        self.gpio = gpio
+
+    def setup(self, pins):
+        self.gpio.setmode(self.gpio.BCM)
+        for pin in pins:
+            self.gpio.setup(pin, self.gpio.OUT, initial=self.gpio.LOW)
+
+    def output(self, pin, level):
+        self.gpio.output(pin, level)
+
+    def cleanup(self, pins):
+        self.gpio.cleanup(list(pins))
+
+
+class FakeBackend(GPIOBackend):
+    """Keeps pin levels in memory and logs every change with its time"""
+
+    def __init__(self, log_size=10000):
+        self.levels = {}
+        self.edges = deque(maxlen=log_size)  # (time.monotonic(), pin, level)
+        self.setups = 0
+        self.writes = 0
+
+    def setup(self, pins):
+        self.setups += 1
+        for pin in pins:
+            self.levels[pin] = False
+
+    def output(self, pin, level):
+        if pin not in self.levels:
+            raise RuntimeError(f'pin {pin} was not set up as an output')
+        self.writes += 1
+        level = bool(level)
+        if self.levels[pin] != level:
+            self.levels[pin] = level
+            self.edges.append((time.monotonic(), pin, level))
+
+    def cleanup(self, pins):
+        for pin in pins:
+            self.levels.pop(pin, None)
+
+
+def default_backend():
+    """RPiBackend, or FakeBackend where RPi.GPIO can't be used.
+
+    GPIO_BACKEND=rpi or GPIO_BACKEND=fake in the environment forces one.
+    """
+    name = os.environ.get('GPIO_BACKEND', '').lower()
+    if name == 'fake':
+        return FakeBackend()
+    try:
+        return RPiBackend()
+    except (ImportError, RuntimeError) as e:  # RPi.GPIO raises RuntimeError off the Pi
+        if name == 'rpi':
+            raise
+        log.warning('RPi.GPIO not available, using the fake GPIO backend', extra={'error': str(e)})
+        return FakeBackend()
+
+
+class GPIODriver:
+    """A long lived claim on a set of output pins.
+
+    The pins are set up on first use (or claim()) and kept in a known
+    state: an output is only written when its level changes, and idle()
+    drives them all low. close() releases them and is registered to run
+    at exit.
+
+    Args:
+        pins: BCM numbers of the output pins.
+        backend: A GPIOBackend, default_backend() if None.
+    """
+
+    def __init__(self, pins, backend=None):
+        self.pins = tuple(pins)
+        self.backend = backend
+        self.claimed = False
+        self.levels = {}
+        self._lock = threading.RLock()
+        self._atexit = False
+
+    def claim(self):
+        """Set the pins up as low outputs, once"""
+        with self._lock:
+            if self.claimed:
+                return
+            if self.backend is None:
+                self.backend = default_backend()
+            self.backend.setup(self.pins)
+            self.levels = dict.fromkeys(self.pins, False)
+            self.claimed = True
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+
+    def output(self, pin, level):
+        level = bool(level)
+        with self._lock:
+            if not self.claimed:
+                self.claim()
+            if self.levels.get(pin) is level:
+                return
+            self.backend.output(pin, level)
+            self.levels[pin] = level
+
+    def idle(self):
+        """Drive every pin low, i.e. stop both struts"""
+        for pin in self.pins:
+            self.output(pin, False)
+
+    def close(self):
+        """Stop the struts and release the pins"""
+        with self._lock:
+            if not self.claimed:
+                return
+            self.idle()
+            self.backend.cleanup(self.pins)
+            self.claimed = False
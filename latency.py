@@ -0,0 +1,187 @@
+"""
+Latency instrumentation for the radar to spotlight pipeline.
+
+A target's way through the pipeline is a trace: a dict of time.monotonic()
+stamps set by each stage as it passes,
+
+    read      UART read that completed the radar frame (Frame.timestamp)
+    decoded   frame decoded (Frame.decoded)
+    received  /target request received (HTTP targets only)
+    selected  target chosen by the selector
+    accepted  target accepted by the motion controller
+    started   move started
+    gpio      first GPIO edge of the move
+    finished  move finished
+    dropped   set to True if a newer target replaced it before it started
+
+record_trace() turns the stamps into per-stage latencies kept in HDR style
+histograms: log-linear buckets with a fixed relative precision, so memory
+is fixed and recording is an index calculation and an increment.
+
+Usage:
+    recorder.record_trace(trace)
+    recorder.prometheus()   # text for a /metrics endpoint
+    recorder.summary()      # one line for the log
+"""
+import logging
+import threading
+import time
+
+# (name, from stamp, to stamp)
+STAGES = (
+    ('decode', 'read', 'decoded'),
+    ('select', 'decoded', 'selected'),
+    ('http', 'received', 'accepted'),
+    ('accept', 'selected', 'accepted'),
+    ('dispatch', 'accepted', 'started'),
+    ('plan', 'started', 'gpio'),
+    ('move', 'started', 'finished'),
+    ('total', 'read', 'gpio'),
+)
+# Upper bounds of the buckets exported to Prometheus, in seconds
+EXPORT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                  0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+REPORT_INTERVAL_SECONDS = 60.0
+
+log = logging.getLogger('latency')
+
+
+class Histogram:
+    """Fixed memory log-linear histogram of durations, like HdrHistogram.
+
+    Values are recorded in whole microseconds. Below 2**precision_bits us
+    every value has its own bucket; above, each power of two is split into
+    2**(precision_bits - 1) buckets, so a bucket is within 2**(1 - precision_bits)
+    of its value (1.6% with the default 7 bits).
+
+    Args:
+        highest_seconds: Larger values are recorded as this.
+        precision_bits: Sub-bucket bits, more is finer and bigger.
+    """
+
+    def __init__(self, highest_seconds=100.0, precision_bits=7):
+        self.sub_buckets = 1 << precision_bits
+        self.half = self.sub_buckets // 2
+        self.precision_bits = precision_bits
+        self.highest = int(highest_seconds * 1e6)
+        self.counts = [0] * (self._index(self.highest) + 1)
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def _index(self, micros):
+        if micros < self.sub_buckets:
+            return micros
+        shift = micros.bit_length() - self.precision_bits
+        return self.sub_buckets + (shift - 1) * self.half + (micros >> shift) - self.half
+
+    def _upper(self, index):
+        """Largest value in microseconds that lands in bucket index"""
+        if index < self.sub_buckets:
+            return index
+        shift, offset = divmod(index - self.sub_buckets, self.half)
+        shift += 1
+        return ((offset + self.half + 1) << shift) - 1
+
+    def record(self, seconds):
+        micros = min(self.highest, max(0, int(seconds * 1e6)))
+        index = self._index(micros)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction):
+        """Value at fraction (0..1) of the recorded durations, in seconds (bucket upper bound)"""
+        with self._lock:
+            wanted = fraction * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= wanted:
+                    return min(self._upper(index) / 1e6, self.max)
+        return 0.0
+
+    def cumulative(self, bounds):
+        """Number of durations at or below each bound in seconds, to bucket precision"""
+        result = []
+        with self._lock:
+            index = seen = 0
+            for bound in bounds:
+                limit = bound * 1e6
+                while index < len(self.counts) and self._upper(index) <= limit:
+                    seen += self.counts[index]
+                    index += 1
+                result.append(seen)
+        return result
+
+
+class LatencyRecorder:
+    """A histogram per pipeline stage, and counts of what became of targets"""
+
+    def __init__(self):
+        self.histograms = {name: Histogram() for name, _, _ in STAGES}
+        self.outcomes = {'moved': 0, 'dropped': 0, 'still': 0}
+        self._lock = threading.Lock()
+        self._reporter = None
+
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+
+    def record_trace(self, trace):
+        """Record every stage a finished (or dropped) trace has both stamps for"""
+        outcome = 'dropped' if trace.get('dropped') else 'moved' if 'gpio' in trace else 'still'
+        with self._lock:
+            self.outcomes[outcome] += 1
+        if outcome == 'dropped':
+            return
+        for name, start, end in STAGES:
+            if trace.get(start) is not None and trace.get(end) is not None:
+                self.histograms[name].record(trace[end] - trace[start])
+
+    def summary(self):
+        """One log line: p50/p99 per stage in ms and target outcomes"""
+        parts = []
+        for name, histogram in self.histograms.items():
+            if histogram.count:
+                parts.append(f"{name} {histogram.percentile(0.5) * 1000:.1f}/"
+                             f"{histogram.percentile(0.99) * 1000:.1f}ms")
+        outcomes = ' '.join(f"{k}={v}" for k, v in self.outcomes.items())
+        return f"latency p50/p99: {', '.join(parts) or 'no samples'} | targets {outcomes}"
+
+    def prometheus(self):
+        """Histograms and outcome counters in the Prometheus text format"""
+        lines = [
+            '# HELP spotlight_stage_latency_seconds Latency of each radar to spotlight pipeline stage.',
+            '# TYPE spotlight_stage_latency_seconds histogram',
+        ]
+        for name, histogram in self.histograms.items():
+            for bound, count in zip(EXPORT_BUCKETS, histogram.cumulative(EXPORT_BUCKETS)):
+                lines.append(f'spotlight_stage_latency_seconds_bucket{{stage="{name}",le="{bound:g}"}} {count}')
+            lines.append(f'spotlight_stage_latency_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'spotlight_stage_latency_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+            lines.append(f'spotlight_stage_latency_seconds_count{{stage="{name}"}} {histogram.count}')
+        lines.append('# HELP spotlight_targets_total Targets by what became of them.')
+        lines.append('# TYPE spotlight_targets_total counter')
+        for outcome, count in self.outcomes.items():
+            lines.append(f'spotlight_targets_total{{outcome="{outcome}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def start_reporting(self, interval=REPORT_INTERVAL_SECONDS):
+        """Log summary() every interval seconds from a daemon thread"""
+        if self._reporter is not None:
+            return
+
+        def report():
+            while True:
+                time.sleep(interval)
+                log.info(self.summary())
+
+        self._reporter = threading.Thread(target=report, name='latency-report', daemon=True)
+        self._reporter.start()
+
+
+recorder = LatencyRecorder()
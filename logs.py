@@ -0,0 +1,177 @@
+"""
+Structured logging that never blocks the radar or motor threads.
+
+Loggers hand records to a bounded queue and return; a background listener
+formats them and writes JSON lines to a rotating file, plus a readable line
+to stderr for records at or above the console level. Each record's extra
+fields become JSON keys, and %-style arguments are only formatted by the
+listener, so keep them immutable (numbers and strings).
+
+Below WARNING, records are sampled: a message (per logger and format string)
+is logged at most SAMPLE_PER_SECOND times a second, and the next record that
+gets through carries the number that were skipped as 'suppressed'. When the
+queue is full, records are dropped and counted rather than waited for. At
+exit the writer gets LOG_STOP_SECONDS to write what is queued, and exit
+never waits on a full queue or a stuck writer beyond that.
+
+Usage:
+    log = logging.getLogger('motor')
+    log.info('move struts', extra={'seconds': (t0, t1)})
+
+    logs.setup()    # once, in the program's entry point
+
+Environment: LOG_FILE, LOG_LEVEL and LOG_CONSOLE_LEVEL override the defaults.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_FILE = 'spotlight.jsonl'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+LOG_QUEUE_SIZE = 10000
+SAMPLE_PER_SECOND = 20
+LOG_STOP_SECONDS = 2.0
+
+# Attributes every LogRecord has, anything else came in through extra
+_RECORD_ATTRIBUTES = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+def fields(record):
+    """The extra fields of a record"""
+    return {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Time, level, logger and message, then the extra fields as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extra = fields(record)
+        if extra:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in extra.items())
+        return line
+
+
+class SampleFilter(logging.Filter):
+    """Lets each message through at most per_second times a second below WARNING"""
+
+    def __init__(self, per_second=SAMPLE_PER_SECOND):
+        super().__init__()
+        self.per_second = per_second
+        self._windows = {}  # (logger, format string) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.msg)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.per_second:
+                window[1] += 1
+                suppressed, window[2] = window[2], 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class AsyncHandler(logging.handlers.QueueHandler):
+    """Puts records on the queue without formatting them or waiting for room"""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record  # formatted by the listener
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AsyncListener(logging.handlers.QueueListener):
+    """A QueueListener whose stop() gives up after a timeout instead of blocking on a full queue"""
+
+    def stop(self, timeout=LOG_STOP_SECONDS):
+        thread = self._thread
+        if thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(self._sentinel, timeout=timeout)
+        except queue.Full:
+            return  # the writer is stuck, leave its daemon thread behind
+        thread.join(max(0.0, deadline - time.monotonic()))
+        self._thread = None
+
+
+def setup(path=None, level=None, console_level=None, per_second=SAMPLE_PER_SECOND):
+    """Send all logging through the background writer. Only the first call does anything.
+
+    Args:
+        path: JSON lines file, rotated at LOG_MAX_BYTES.
+        level: Lowest level logged, INFO by default.
+        console_level: Lowest level also written to stderr, WARNING by default.
+        per_second: Sampling limit per message below WARNING.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    path = path or os.environ.get('LOG_FILE', LOG_FILE)
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    console_level = console_level or os.environ.get('LOG_CONSOLE_LEVEL', 'WARNING')
+
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(ConsoleFormatter())
+    console_handler.setLevel(console_level)
+
+    records = queue.Queue(LOG_QUEUE_SIZE)
+    handler = AsyncHandler(records)
+    handler.addFilter(SampleFilter(per_second))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+
+    _listener = AsyncListener(records, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # flush what is queued on the way out
@@ -1,14 +1,22 @@
-import RPi.GPIO as gpio
 import time
 import math
+import functools
+import itertools
+import logging
 import os
+import queue
 import sys
+import threading
+from collections import OrderedDict, deque
 from time import sleep
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, Response, jsonify, request, render_template_string
+from gpio_backend import GPIODriver
+from thermal import ThermalModel
+from calibration import CALIBRATION_FILE, MOVE_LOG_FILE, Calibration, append_log
+from aiming import AimingTable
+from latency import recorder
+import logs
 ORANGE=25
-DUTY_CYCLE=.001
-ACTIVE_SECONDS=0
-MOVE_SECONDS=0
 DISTANCE_RADAR_TO_AXIS_CM=75
 MAX_OUT_MM = 120
 MAX_MOVE_SECONDS = 30
@@ -16,12 +24,41 @@ LIGHT_HEIGHT_CM = 300
 X_AT = 0
 Y_AT = 0
 # Per-strut calibration (both struts now move 130mm in 10 seconds)
+# Defaults for calibration.py when there is no fitted CALIBRATION_FILE
 SECONDS_PER_MM_STRUT0 = 0.0769  # 10 seconds / 130mm = 0.0769 sec/mm
 SECONDS_PER_MM_STRUT1 = 0.0769  # 10 seconds / 130mm = 0.0769 sec/mm
+calibration = Calibration.load(CALIBRATION_FILE, (SECONDS_PER_MM_STRUT0, SECONDS_PER_MM_STRUT1))
+POSITION_SIGMA_MM = [0.0, 0.0]  # uncertainty of each strut's dead reckoned position (1 sigma)
+REHOME_SIGMA_MM = 5.0  # re-home a strut onto its stop once its position is this uncertain
+REHOME_MARGIN_MM = 5.0  # retract this far past where the stop should be
+LAST_MOVES = [None, None]  # (seconds, start mm, estimated mm) of each strut's last move, for /calibrate
 VERSION = "1.0.0"
+# GPIO pins driving each strut: (extend, retract)
+STRUT_PINS = ((17, 22), (23, ORANGE))
+# Claimed once and kept low while idle; released on /shutdown or exit
+gpio = GPIODriver([pin for pins in STRUT_PINS for pin in pins])
+CONCURRENT_MOTION = True  # move both struts at once in move_to_position
+CONTROL_TICK_SECONDS = 0.02  # a running move checks for a stop or a newer target this often
+RETARGET_ERROR_MM = 5.0  # a running target move only stops for a newer target further than this from its goal
+MIN_MOVE_SECONDS = 0.1  # shorter moves are not worth making
+# Thermal model of each actuator, see thermal.py
+DUTY_CYCLE_LIMIT = 0.22  # rated duty cycle of the actuators
+THERMAL_TAU_SECONDS = 300  # roughly the window the duty cycle is measured over
+THERMAL_CHUNK_SECONDS = 2.0  # after a cool down, wait for budget for at least this much of a move
+thermal = ThermalModel(len(STRUT_PINS), THERMAL_TAU_SECONDS, DUTY_CYCLE_LIMIT)
+# Predictive aiming
+PREDICTION_ITERATIONS = 4  # fixed point iterations of "where will they be when we get there"
+TARGET_HISTORY_SECONDS = 2.0  # window of recent /target positions used to estimate velocity
+TARGET_HISTORY = deque(maxlen=32)  # (monotonic seconds, x mm, y mm) relative to the radar
+MAX_JOB_HISTORY = 100  # finished motion jobs kept for /jobs/<id>
+# Aiming lookup table, see aiming.py
+AIM_TABLE_FILE = 'aiming_table.npz'
+AIM_TABLE_STEPS = (0.5, 25.0)  # grid spacing in degrees and mm
+_aim_table = None
 
 # Flask app setup
 app = Flask(__name__)
+log = logging.getLogger('motor')
 
 
 def calculate_actuator_offsets(angle_offset, distance_mm, current_x, current_y):
@@ -97,7 +134,146 @@ def calculate_actuator_offsets(angle_offset, distance_mm, current_x, current_y):
 
     return (x_offset, y_offset)
 
-def compute_rotation(from_x, from_y, to_x, to_y):
+def actuator_target(angle_offset, distance_mm):
+    """Absolute (x, y) strut extensions for a RADAR target, see calculate_actuator_offsets()"""
+    return calculate_actuator_offsets(angle_offset, distance_mm, 0.0, 0.0)
+
+def aim_position(angle_offset, distance_mm):
+    """
+    Target position for move_to_position() to aim at a RADAR target.
+
+    actuator_target() gives extensions in mm, positions (X_AT, Y_AT and
+    move_to_position()) are in cm.
+    """
+    x_mm, y_mm = actuator_target(angle_offset, distance_mm)
+    return x_mm / 10.0, y_mm / 10.0
+
+def aim_table():
+    """
+    The aiming lookup table for the current geometry.
+
+    Loaded from AIM_TABLE_FILE or built on first use, and rebuilt when
+    LIGHT_HEIGHT_CM, DISTANCE_RADAR_TO_AXIS_CM or MAX_OUT_MM change. Aiming
+    at single targets uses actuator_target(), so nothing loads the table at
+    startup; it is for batch evaluation with actuator_targets().
+    """
+    global _aim_table
+    params = {
+        'light_height_cm': LIGHT_HEIGHT_CM,
+        'distance_radar_to_axis_cm': DISTANCE_RADAR_TO_AXIS_CM,
+        'max_out_mm': MAX_OUT_MM,
+    }
+    if _aim_table is None or _aim_table.params != params:
+        _aim_table = AimingTable.load_or_build(AIM_TABLE_FILE, actuator_target, params, *AIM_TABLE_STEPS)
+    return _aim_table
+
+def actuator_targets(angle_offsets, distances_mm):
+    """
+    Batch version of actuator_target() for NumPy arrays of targets.
+
+    Interpolates the aiming table, so results are within
+    aim_table().error_bound_mm of the closed form.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: x and y strut extensions in mm.
+    """
+    return aim_table().lookup(angle_offsets, distances_mm)
+
+def target_velocity(now=None):
+    """
+    Estimate the target's velocity from recent /target positions.
+
+    Fits a straight line through the positions of the last
+    TARGET_HISTORY_SECONDS with least squares.
+
+    Returns:
+        tuple[float, float, float] | None: (vx, vy, sigma) in mm/s, where sigma is
+        the standard error of the velocity, or None with fewer than 3 samples.
+    """
+    if now is None:
+        now = time.monotonic()
+    samples = [s for s in TARGET_HISTORY if now - s[0] <= TARGET_HISTORY_SECONDS]
+    if len(samples) < 3:
+        return None
+    mean_t = sum(s[0] for s in samples) / len(samples)
+    mean_x = sum(s[1] for s in samples) / len(samples)
+    mean_y = sum(s[2] for s in samples) / len(samples)
+    var_t = sum((s[0] - mean_t) ** 2 for s in samples)
+    if var_t <= 0:
+        return None
+    vx = sum((s[0] - mean_t) * (s[1] - mean_x) for s in samples) / var_t
+    vy = sum((s[0] - mean_t) * (s[2] - mean_y) for s in samples) / var_t
+    residual = sum((s[1] - mean_x - vx * (s[0] - mean_t)) ** 2 +
+                   (s[2] - mean_y - vy * (s[0] - mean_t)) ** 2 for s in samples)
+    sigma = math.sqrt(residual / (2 * (len(samples) - 2)) / var_t)
+    return vx, vy, sigma
+
+def move_duration(from_x, from_y, to_x, to_y):
+    """
+    Seconds move_to_position() will drive the struts for, not counting cool down.
+    """
+    seconds = [abs(s) for s in compute_rotation(from_x, from_y, to_x, to_y, verbose=False)
+               if abs(s) > MIN_MOVE_SECONDS]
+    if CONCURRENT_MOTION:
+        return max(seconds, default=0.0)
+    return sum(seconds)
+
+def predict_target(angle_offset, distance_mm, vx, vy, sigma, current_x, current_y):
+    """
+    Lead a moving target by the time the struts take to get there.
+
+    The move time depends on where we aim and where we aim depends on the move
+    time, so this iterates: predict the position after the current move
+    estimate, compute the move to it, and repeat.
+
+    Args:
+        angle_offset (float): Target angle from the RADAR (-90 to 90 degrees).
+        distance_mm (float): Target distance from the RADAR in mm.
+        vx, vy (float): Target velocity in mm/s, in RADAR coordinates.
+        sigma (float): Standard error of the velocity in mm/s (0 if unknown).
+        current_x, current_y (float): Current actuator positions in cm, like X_AT and Y_AT.
+
+    Returns:
+        tuple[float, float, dict]: Predicted (angle_offset, distance_mm) and a dict
+        describing the prediction, including the expected tracking error.
+    """
+    angle_rad = math.radians(angle_offset)
+    x = distance_mm * math.sin(angle_rad)
+    y = distance_mm * math.cos(angle_rad)
+    speed_mm_s = math.sqrt(vx ** 2 + vy ** 2)
+
+    lead_seconds = 0.0
+    predicted_angle, predicted_distance = angle_offset, distance_mm
+    residual_mm = clamp_mm = uncovered_mm = 0.0
+    for _ in range(PREDICTION_ITERATIONS):
+        px = x + vx * lead_seconds
+        py = y + vy * lead_seconds
+        predicted_angle = max(-90.0, min(90.0, math.degrees(math.atan2(px, py))))
+        predicted_distance = max(0.0, min(8000.0, math.sqrt(px ** 2 + py ** 2)))
+        # How far the aim point had to be pulled in to stay within the RADAR's view
+        predicted_rad = math.radians(predicted_angle)
+        clamp_mm = math.hypot(px - predicted_distance * math.sin(predicted_rad),
+                              py - predicted_distance * math.cos(predicted_rad))
+        new_x, new_y = aim_position(predicted_angle, predicted_distance)
+        seconds = move_duration(current_x, current_y, new_x, new_y)
+        # Do not extrapolate further than a single move may last
+        uncovered_mm = speed_mm_s * max(0.0, seconds - MAX_MOVE_SECONDS)
+        seconds = min(seconds, MAX_MOVE_SECONDS)
+        residual_mm = speed_mm_s * abs(seconds - lead_seconds)
+        lead_seconds = seconds
+
+    return predicted_angle, predicted_distance, {
+        'velocity_x_mm_s': vx,
+        'velocity_y_mm_s': vy,
+        'move_seconds': lead_seconds,
+        # How far the target moves during the move, i.e. the error without prediction
+        'lag_error_mm': speed_mm_s * lead_seconds,
+        # Error left with prediction: unconverged lead, velocity uncertainty, the
+        # aim point clamped to the RADAR's range and travel beyond the capped lead
+        'expected_error_mm': residual_mm + sigma * lead_seconds + clamp_mm + uncovered_mm,
+    }
+
+def compute_rotation(from_x, from_y, to_x, to_y, verbose=True):
     """
     Compute travel times for each strut to move spotlight from one position to another.
 
@@ -109,143 +285,369 @@ def compute_rotation(from_x, from_y, to_x, to_y):
         (strut0_seconds, strut1_seconds): Travel times in seconds
         Positive = extend, Negative = retract
     """
-    print(f"compute {from_x}, {from_y}, {to_x}, {to_y}")
+    if verbose:
+        log.debug('compute rotation', extra={'from': (from_x, from_y), 'to': (to_x, to_y)})
     new_x = (to_x - from_x) * 10  # Convert cm to mm
     new_y = (to_y - from_y) * 10  # Convert cm to mm
-    return mm2time(new_x, 0), mm2time(new_y, 1)  # Use per-strut calibration
+    # Use per-strut calibration, the speed depends on where each strut starts
+    return mm2time(new_x, 0, from_x * 10), mm2time(new_y, 1, from_y * 10)
+
+class CancelToken:
+    """Stops the motion holding it within one control tick once cancelled"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason='cancelled'):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, seconds):
+        """Sleep up to seconds, waking early if cancelled. Returns True if cancelled."""
+        return self._event.wait(max(0.0, seconds))
+
+def set_strut(strut, direction):
+    """Drive a strut: direction 1 extends, -1 retracts, 0 stops it"""
+    extend_pin, retract_pin = STRUT_PINS[strut]
+    gpio.output(extend_pin, direction > 0)
+    gpio.output(retract_pin, direction < 0)
+
+def drive(seconds, preempt=None, token=None):
+    """
+    Drive the struts for their own time each (positive=extend, negative=retract).
+
+    The struts start together and the control loop wakes every
+    CONTROL_TICK_SECONDS, or as soon as the cancel token is set, to release
+    struts whose time is up and to check for a stop. A stop or a newer target
+    therefore takes effect within one tick.
+
+    Args:
+        seconds (tuple[float, float]): Seconds for strut 0 and strut 1, 0 to leave it idle.
+        preempt (callable | None): Called every tick with the seconds left;
+            returning True stops the struts where they are.
+        token (CancelToken | None): Stops the move when cancelled, defaults
+            to the motion controller's token for the running job.
+
+    Returns:
+        list[float]: Seconds each strut was actually driven, signed like seconds.
+    """
+    if token is None:
+        token = motion.token
+    started = time.monotonic()
+    stopped = [started] * len(seconds)
+    running = set()
+    for strut, strut_seconds in enumerate(seconds):
+        set_strut(strut, (strut_seconds > 0) - (strut_seconds < 0))
+        if strut_seconds:
+            running.add(strut)
+    if running and motion.trace is not None:
+        motion.trace.setdefault('gpio', time.monotonic())  # first edge of the job, for latency
+    try:
+        while running:
+            now = time.monotonic()
+            elapsed = now - started
+            for strut in [s for s in running if elapsed >= abs(seconds[s])]:
+                set_strut(strut, 0)
+                stopped[strut] = now
+                running.discard(strut)
+            if not running:
+                break
+            remaining = max(abs(seconds[s]) for s in running) - elapsed
+            if token.cancelled or (preempt is not None and preempt(remaining)):
+                break
+            next_release = min(abs(seconds[s]) for s in running) - elapsed
+            token.wait(min(CONTROL_TICK_SECONDS, next_release))
+    finally:
+        now = time.monotonic()
+        for strut in running:
+            set_strut(strut, 0)
+            stopped[strut] = now
+
+    driven = [math.copysign(min(abs(s), stopped[i] - started), s) if s else 0.0
+              for i, s in enumerate(seconds)]
+    # Each actuator heats up for the time it was driven
+    record_motion(driven)
+    return driven
 
 def move_strut0(seconds):
-    """Move strut 0 (positive=extend, negative=retract)"""
+    """Move strut 0 (positive=extend, negative=retract). Returns True if not stopped early."""
     global X_AT, Y_AT
     init()
-    if seconds > 0:
-        print(f"Extending strut 0 for {seconds:.1f}s")
-        gpio.output(17, True)   # Forward
-        gpio.output(22, False)
-        gpio.output(23, False)
-        gpio.output(ORANGE, False)
-    else:
-        print(f"Retracting strut 0 for {abs(seconds):.1f}s")
-        gpio.output(17, False)  # Backward
-        gpio.output(22, True)
-        gpio.output(23, False)
-        gpio.output(ORANGE, False)
+    log.info('move strut', extra={'strut': 0, 'seconds': seconds})
 
-    let_move(abs(seconds))
+    driven = drive((seconds, 0))[0]
 
-    # Update X position tracking (strut0 controls X axis)
-    # Convert time back to distance: seconds / SECONDS_PER_MM_STRUT0 = mm, then mm/10 = cm
-    distance_cm = (seconds / SECONDS_PER_MM_STRUT0) / 10.0
-    X_AT += distance_cm
-    print(f"Updated X_AT to {X_AT:.2f} cm")
+    # Update X position tracking (strut0 controls X axis) from the time actually driven
+    track_motion((driven, 0))
+    log.debug('position', extra={'x': X_AT, 'y': Y_AT})
 
-    gpio.cleanup()
+    return abs(driven) >= abs(seconds)
 
 def move_strut1(seconds):
-    """Move strut 1 (positive=extend, negative=retract)"""
+    """Move strut 1 (positive=extend, negative=retract). Returns True if not stopped early."""
     global X_AT, Y_AT
     init()
-    if seconds > 0:
-        print(f"Extending strut 1 for {seconds:.1f}s")
-        gpio.output(17, False)
-        gpio.output(22, False)
-        gpio.output(23, True)   # Forward
-        gpio.output(ORANGE, False)
-    else:
-        print(f"Retracting strut 1 for {abs(seconds):.1f}s")
-        gpio.output(17, False)
-        gpio.output(22, False)
-        gpio.output(23, False)  # Backward
-        gpio.output(ORANGE, True)
+    log.info('move strut', extra={'strut': 1, 'seconds': seconds})
+
+    driven = drive((0, seconds))[1]
 
-    let_move(abs(seconds))
+    # Update Y position tracking (strut1 controls Y axis) from the time actually driven
+    track_motion((0, driven))
+    log.debug('position', extra={'x': X_AT, 'y': Y_AT})
 
-    # Update Y position tracking (strut1 controls Y axis)
-    # Convert time back to distance: seconds / SECONDS_PER_MM_STRUT1 = mm, then mm/10 = cm
-    distance_cm = (seconds / SECONDS_PER_MM_STRUT1) / 10.0
-    Y_AT += distance_cm
-    print(f"Updated Y_AT to {Y_AT:.2f} cm")
+    return abs(driven) >= abs(seconds)
+
+def move_struts(strut0_seconds, strut1_seconds, preempt=None):
+    """
+    Move both struts at the same time (positive=extend, negative=retract).
 
-    gpio.cleanup()
+    Both direction pins are set together and each strut is released when
+    its own time is up, so the move takes max(t0, t1) rather than t0 + t1.
 
-def move_to_position(target_x, target_y):
-    """Move spotlight to target position"""
+    Args:
+        preempt (callable | None): See drive().
+
+    Returns:
+        bool: True if the move ran to completion, False if it was preempted
+        or cancelled.
+    """
     global X_AT, Y_AT
+    init()
+    seconds = (strut0_seconds, strut1_seconds)
+    log.info('move struts', extra={'seconds': seconds})
+    driven = drive(seconds, preempt)
+    completed = all(abs(d) >= abs(s) for d, s in zip(driven, seconds))
 
-    # Calculate required movements
-    strut0_time, strut1_time = compute_rotation(X_AT, Y_AT, target_x, target_y)
+    # Update position tracking, see move_strut0/move_strut1
+    track_motion(driven)
+    log.debug('position', extra={'x': X_AT, 'y': Y_AT})
+    return completed
 
-    # Apply cooling if needed
-    cool_down()
+def move_to_position(target_x, target_y, preempt=None):
+    """
+    Move spotlight to target position
 
-    # Move struts (could be done simultaneously, but doing sequentially for safety)
-    if abs(strut0_time) > 0.1:  # Only move if significant
-        move_strut0(strut0_time)
-        cool_down()
+    The target is clamped to the struts' travel. Each drive is limited to
+    MAX_MOVE_SECONDS and to the time to the end stop, see limit_drive(), and
+    drives longer than the thermal budget are split into chunks with a cool
+    down in between, see plan_chunk().
 
-    if abs(strut1_time) > 0.1:  # Only move if significant
-        move_strut1(strut1_time)
-        cool_down()
+    Args:
+        preempt (callable | None): See drive(). When it or the cancel token
+            cuts the move short the position is left where the struts stopped.
+
+    Returns:
+        bool: True if the spotlight reached the target.
+    """
+    global X_AT, Y_AT
+
+    # Find the stops again first if dead reckoning has drifted too far
+    if not rehome_if_uncertain():
+        return False
+
+    target_x = max(0.0, min(MAX_OUT_MM / 10.0, target_x))
+    target_y = max(0.0, min(MAX_OUT_MM / 10.0, target_y))
+    while True:
+        # Calculate required movements from where the struts are now
+        remaining = [significant(strut, t)
+                     for strut, t in enumerate(compute_rotation(X_AT, Y_AT, target_x, target_y))]
+        wanted = [significant(strut, limit_drive(strut, t)) for strut, t in enumerate(remaining)]
+        if not any(wanted):
+            break
+        if not CONCURRENT_MOTION and wanted[0]:
+            wanted[1] = 0  # Sequential moves, one strut at a time
+        # Largest move the thermal model allows now, the rest after a cool down
+        chunk = plan_chunk(wanted)
+        if not any(chunk):
+            if not wait_for_budget(wanted, preempt):
+                log.info('move stopped', extra={'x': X_AT, 'y': Y_AT})
+                return False
+            continue
+        if chunk != wanted:
+            log.info('split move', extra={'seconds': chunk, 'wanted_seconds': wanted})
+        if not move_struts(chunk[0], chunk[1], preempt):
+            log.info('move stopped', extra={'x': X_AT, 'y': Y_AT})
+            return False
+        if chunk == remaining:
+            break  # the whole move was made
 
     # Update current position
     X_AT = target_x
     Y_AT = target_y
-    print(f"Now at position: ({X_AT}, {Y_AT})")
-
-def let_move(seconds):
-    global ACTIVE_SECONDS, MOVE_SECONDS, DUTY_CYCLE
-    print("sleeping for structs to move")
-    sleep(seconds)
-    ACTIVE_SECONDS=ACTIVE_SECONDS+seconds
-    MOVE_SECONDS=MOVE_SECONDS+seconds
-    DUTY_CYCLE=ACTIVE_SECONDS/MOVE_SECONDS
-    print(f"active: {ACTIVE_SECONDS} / move: {MOVE_SECONDS} / cycle: {DUTY_CYCLE}")
-
-
-def let_wait(seconds):
-    global ACTIVE_SECONDS, MOVE_SECONDS, DUTY_CYCLE
-    print("sleeping for cooldown")
-    sleep(seconds)
-    MOVE_SECONDS = MOVE_SECONDS + seconds  # Add to total time
-    DUTY_CYCLE = ACTIVE_SECONDS / MOVE_SECONDS  # Correct calculation
-    print(f"active: {ACTIVE_SECONDS} / move: {MOVE_SECONDS} / cycle: {DUTY_CYCLE}")
-
-def cool_down():
-    global ACTIVE_SECONDS, MOVE_SECONDS, DUTY_CYCLE
-    # loop and continue to sleep until the duty cycle gets below .22
-    while DUTY_CYCLE > .22:
-        print(f"Duty cycle {DUTY_CYCLE:.3f} too high, cooling down...")
-        let_wait(10)
-
-def mm2time(millimeters, strut_num):
+    log.info('at position', extra={'x': X_AT, 'y': Y_AT})
+    return True
+
+def record_motion(seconds):
+    """Charge the seconds each strut was driven to its thermal model"""
+    thermal.record(seconds)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('duty cycle', extra={'duty': [round(thermal.duty(s), 3) for s in range(len(seconds))]})
+
+def duty_cycle():
+    """Duty cycle of the hottest strut"""
+    return max(thermal.duty(strut) for strut in range(len(STRUT_PINS)))
+
+def limit_drive(strut, seconds):
+    """seconds capped at MAX_MOVE_SECONDS and at the drive time from where the strut is to its end stop"""
+    if not seconds:
+        return 0
+    position_mm = model_position(strut_position_mm(strut))
+    travel_mm = MAX_OUT_MM - position_mm if seconds > 0 else position_mm
+    to_stop = abs(calibration.duration(strut, math.copysign(travel_mm, seconds), position_mm))
+    return math.copysign(min(abs(seconds), MAX_MOVE_SECONDS, to_stop), seconds)
+
+def plan_chunk(seconds):
+    """
+    Largest safe part of a move: each strut runs for its seconds, or for as
+    long as its thermal budget allows if that is shorter. Struts with less
+    than MIN_MOVE_SECONDS of budget wait.
+    """
+    chunk = []
+    for strut, strut_seconds in enumerate(seconds):
+        step = min(abs(strut_seconds), thermal.budget(strut))
+        chunk.append(math.copysign(step, strut_seconds) if step >= MIN_MOVE_SECONDS else 0)
+    return chunk
+
+def wait_for_budget(seconds, preempt=None, token=None):
+    """
+    Rest until one of the struts can make at least THERMAL_CHUNK_SECONDS of
+    its move (or all of it, if shorter).
+
+    Returns:
+        bool: False if the wait was cancelled or preempted.
+    """
+    if token is None:
+        token = motion.token
+    wait = min(thermal.wait_seconds(strut, min(abs(s), THERMAL_CHUNK_SECONDS))
+               for strut, s in enumerate(seconds) if s)
+    log.info('cooling down', extra={'duty': round(duty_cycle(), 3), 'wait_seconds': wait})
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if token.wait(min(CONTROL_TICK_SECONDS, deadline - time.monotonic())):
+            return False
+        if preempt is not None and preempt(max(abs(s) for s in seconds)):
+            return False
+    return True
+
+def round_seconds(seconds):
+    """Seconds for a JSON response, None if the wait is endless (the move never fits)"""
+    return round(seconds, 1) if math.isfinite(seconds) else None
+
+def motion_budget():
+    """Per strut duty cycle and how far it may move right now without a cool down"""
+    budget = []
+    for strut in range(len(STRUT_PINS)):
+        seconds = thermal.budget(strut)
+        position_mm = model_position(strut_position_mm(strut))
+        budget.append({
+            'strut': strut,
+            'duty_cycle': round(thermal.duty(strut), 3),
+            'budget_seconds': round(seconds, 1),
+            'budget_mm': round(calibration.curve(strut, 1).distance(seconds, position_mm), 1),
+            # Rest needed before a full MAX_MOVE_SECONDS move
+            'cooldown_seconds': round_seconds(thermal.wait_seconds(strut, MAX_MOVE_SECONDS)),
+        })
+    return budget
+
+def mm2time(millimeters, strut_num, position_mm=None):
     """
     Calculates the time in seconds needed to move a linear actuator
     a specified distance in millimeters.
 
-    The calculation uses per-strut calibration rates:
-    - Strut 0: 5 seconds for 20mm (0.25 sec/mm)
-    - Strut 1: 5 seconds for 16mm (0.3125 sec/mm)
+    The calculation uses the strut's calibrated speed curve for the
+    direction of travel, including start-up lag and the change of speed
+    with extension (see calibration.py). Without a fitted calibration file
+    this is SECONDS_PER_MM_STRUT0/1 per mm (0.0769 sec/mm, 130mm in 10 seconds).
 
     Args:
-      millimeters: The desired distance to travel in mm.
+      millimeters: The desired distance to travel in mm (negative=retract).
       strut_num: Which strut (0 or 1) to get calibration for.
+      position_mm: Extension the move starts from, the strut's current one by default.
 
     Returns:
-      The time in seconds required to travel that distance.
+      The time in seconds required to travel that distance, signed like millimeters.
     """
-    if strut_num == 0:
-        seconds_per_mm = SECONDS_PER_MM_STRUT0
+    if position_mm is None:
+        position_mm = strut_position_mm(strut_num)
+    return calibration.duration(strut_num, millimeters, model_position(position_mm))
+
+def strut_position_mm(strut):
+    """Dead reckoned extension of a strut in mm"""
+    return (X_AT if strut == 0 else Y_AT) * 10.0
+
+def model_position(position_mm):
+    """An extension within the strut's travel, for the speed curves"""
+    return max(0.0, min(MAX_OUT_MM, position_mm))
+
+def significant(strut, seconds):
+    """seconds, or 0 if the move is too short to bother with once the start-up lag is taken off"""
+    lag = calibration.curve(strut, seconds).lag_seconds
+    return seconds if abs(seconds) - lag > MIN_MOVE_SECONDS else 0
+
+def track_motion(driven):
+    """
+    Dead reckoning: move X_AT/Y_AT by the distance the calibration predicts for
+    the seconds each strut was driven, and grow their uncertainty by the
+    calibration's error for that distance.
+    """
+    global X_AT, Y_AT
+    for strut, seconds in enumerate(driven):
+        if not seconds:
+            continue
+        start_mm = strut_position_mm(strut)
+        moved_mm = calibration.distance(strut, seconds, model_position(start_mm))
+        POSITION_SIGMA_MM[strut] = math.hypot(POSITION_SIGMA_MM[strut], calibration.error_mm(strut, moved_mm))
+        LAST_MOVES[strut] = (seconds, start_mm, moved_mm)
+        if strut == 0:
+            X_AT += moved_mm / 10.0
+        else:
+            Y_AT += moved_mm / 10.0
+
+def rehome_strut(strut):
+    """
+    Partial re-home: retract one strut onto its stop, only for as long as it
+    takes from where it should be plus its uncertainty, then zero it.
+
+    Returns:
+        bool: False if the move was cancelled before reaching the stop.
+    """
+    global X_AT, Y_AT
+    position_mm = strut_position_mm(strut)
+    mm = max(0.0, position_mm) + 3 * POSITION_SIGMA_MM[strut] + REHOME_MARGIN_MM
+    seconds = min(abs(calibration.duration(strut, -mm, model_position(position_mm))), MAX_MOVE_SECONDS)
+    log.info('re-homing strut', extra={'strut': strut, 'sigma_mm': POSITION_SIGMA_MM[strut], 'seconds': seconds})
+    wanted = [0, 0]
+    wanted[strut] = -seconds
+    while thermal.budget(strut) < seconds:
+        if not wait_for_budget(wanted):
+            return False
+    init()
+    driven = drive(wanted)
+    if abs(driven[strut]) < seconds:
+        track_motion(driven)
+        return False
+    if strut == 0:
+        X_AT = 0
     else:
-        seconds_per_mm = SECONDS_PER_MM_STRUT1
+        Y_AT = 0
+    POSITION_SIGMA_MM[strut] = 0.0
+    return True
 
-    return millimeters * seconds_per_mm
+def rehome_if_uncertain():
+    """Re-home the struts whose uncertainty is over REHOME_SIGMA_MM. False if cancelled."""
+    for strut, sigma in enumerate(POSITION_SIGMA_MM):
+        if sigma > REHOME_SIGMA_MM and not rehome_strut(strut):
+            return False
+    return True
 
 def init():
-    gpio.setmode(gpio.BCM)
-    gpio.setup(17, gpio.OUT)
-    gpio.setup(22, gpio.OUT)
-    gpio.setup(23, gpio.OUT)
-    gpio.setup(ORANGE, gpio.OUT)
+    """Claim the strut pins; only the first call does any work"""
+    gpio.claim()
 
 
 # def fttf(sec):
@@ -376,14 +778,13 @@ def init():
 #     gpio.cleanup()
 
 def bothin(sec):
+    """Retract both struts for sec seconds. Returns True if not stopped early."""
+    global X_AT, Y_AT
     init()
-    print("f t f t - 17:F 22:T 23:F ORANGE:T")
-    gpio.output(17, False)
-    gpio.output(22, True)
-    gpio.output(23, False)
-    gpio.output(ORANGE, True)
-    let_move(sec)  # remember duty cycle
-    gpio.cleanup()
+    log.info('move struts', extra={'seconds': (-sec, -sec)})
+    driven = drive((-sec, -sec))  # remember duty cycle
+    track_motion(driven)
+    return abs(driven[0]) >= sec
 
 # DEAD FUNCTIONS - GPIO testing/debug code from development
 # def zero_out_one_in(sec):
@@ -534,6 +935,350 @@ def bothin(sec):
 #     input("Press Enter to continue...")
 #     gpio.cleanup()
 
+def aim_at(angle_offset, distance_mm, velocity=None, preempt=None):
+    """
+    Aim the spotlight at a RADAR target.
+
+    Args:
+        angle_offset (float): The angular offset from the RADAR (-90 to 90 degrees).
+        distance_mm (float): The distance to the target from the RADAR in mm.
+        velocity (tuple | None): (vx, vy, sigma) in mm/s to lead the target by
+            the move time, see predict_target(), or None to aim where it is.
+        preempt (callable | None): Lets a newer target cut the move short,
+            see move_struts(). Also given goal=(x, y), the position in cm
+            the move ends at.
+
+    Returns:
+        dict: The aim point, the actuator targets in cm, whether they were reached
+        and the prediction, if any.
+    """
+    prediction = None
+    if velocity is not None:
+        angle_offset, distance_mm, prediction = predict_target(
+            angle_offset, distance_mm, *velocity, X_AT, Y_AT)
+    new_x, new_y = aim_position(angle_offset, distance_mm)
+    if preempt is not None:
+        preempt = functools.partial(preempt, goal=(new_x, new_y))
+    completed = move_to_position(new_x, new_y, preempt)
+    return {
+        'completed': completed,
+        'angle_offset': angle_offset,
+        'distance_mm': distance_mm,
+        'current_x': X_AT,
+        'current_y': Y_AT,
+        'new_x': new_x,
+        'new_y': new_y,
+        'prediction': prediction,
+    }
+
+class MotionController:
+    """
+    Runs motion commands one at a time on a dedicated thread.
+
+    HTTP handlers submit a command and return straight away with a job ID;
+    the job's progress and result can be read back with job(). Commands run
+    in submission order, so the struts never get two commands at once.
+
+    Targets are coalesced instead of queued: there is a single pending
+    target slot and a newer target replaces one that has not started yet.
+    A running target move stops within one control tick when a newer
+    target arrives more than RETARGET_ERROR_MM from where the move ends, and
+    the new move starts from where the struts stopped; a closer one waits
+    for the move to finish.
+
+    Each job gets a fresh CancelToken; stop() cancels the running job and
+    drops everything queued behind it.
+    """
+
+    def __init__(self):
+        self.commands = queue.Queue()  # (job id, func, args), or None to run the pending target
+        self.jobs = OrderedDict()  # job id -> job dict, oldest first
+        self.current = None  # id of the running job
+        self.pending_target = None  # (job id, func, args) of the newest unstarted target
+        self.targets_dropped = 0  # replaced before they started
+        self.targets_superseded = 0  # cut short by a newer target
+        self.seconds_saved = 0.0  # estimated actuator seconds not spent on stale targets
+        self.token = CancelToken()  # cancels the running job
+        self.trace = None  # latency timestamps of the running job, see submit_target()
+        self._traces = {}  # job id -> trace of jobs that have not started
+        self._pending_goal = None  # (job id, position in cm) of the pending target, see _goal()
+        self._superseded = None  # (goal, pending target) of the move _retarget() stopped
+        self._idle = threading.Event()
+        self._idle.set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the controller thread (done on first submit)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='motion-controller', daemon=True)
+                self._thread.start()
+
+    def _new_job(self, action, estimated_seconds, params):
+        job = {
+            'id': next(self._ids),
+            'action': action,
+            'params': params,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'estimated_seconds': estimated_seconds,
+            'result': None,
+            'error': None,
+        }
+        with self._lock:
+            self.jobs[job['id']] = job
+            self._trim()
+        return job
+
+    def submit(self, action, func, *args, estimated_seconds=None, **params):
+        """
+        Queue func(*args) as a job.
+
+        Args:
+            action (str): Short name of the command, e.g. 'extend' or 'reset'.
+            func (callable): Runs the motion; its return value is the job result.
+            estimated_seconds (float | None): Expected run time, for progress.
+            params: Request parameters to echo back in the job.
+
+        Returns:
+            dict: A snapshot of the new job.
+        """
+        self.start()
+        job = self._new_job(action, estimated_seconds, params)
+        self.commands.put((job['id'], func, args))
+        return self.job(job['id'])
+
+    def submit_target(self, angle_offset, distance_mm, velocity=None, trace=None):
+        """
+        Aim at a target, replacing any target that has not started yet.
+
+        Args:
+            trace (dict | None): time.monotonic() stamps of the target's way
+                through the pipeline, see latency.py; the controller adds
+                'accepted', 'started' and 'finished', drive() adds 'gpio' at
+                the first pin change and 'dropped' is set if a newer target
+                replaced it. Finished and dropped traces go to the latency recorder.
+
+        Returns:
+            dict: A snapshot of the new job.
+        """
+        self.start()
+        job = self._new_job('target', None, {'angle_offset': angle_offset, 'distance_mm': distance_mm,
+                                             'velocity': velocity})
+        item = (job['id'], aim_at, (angle_offset, distance_mm, velocity, self._retarget))
+        dropped_trace = None
+        with self._lock:
+            if trace is not None:
+                trace['accepted'] = time.monotonic()
+                self._traces[job['id']] = trace
+            replaced, self.pending_target = self.pending_target, item
+            if replaced is not None:
+                dropped = self.jobs.get(replaced[0])
+                if dropped is not None:
+                    dropped['status'] = 'dropped'
+                    dropped['finished_at'] = time.time()
+                dropped_trace = self._traces.pop(replaced[0], None)
+                if dropped_trace is not None:
+                    dropped_trace['dropped'] = True
+                self.targets_dropped += 1
+                self.seconds_saved += self._target_seconds(*replaced[2][:2])
+        if replaced is None:
+            self.commands.put(None)  # one wake-up per pending slot fill
+        if dropped_trace is not None:
+            recorder.record_trace(dropped_trace)
+        return self.job(job['id'])
+
+    @staticmethod
+    def _target_seconds(angle_offset, distance_mm):
+        """Estimated move time to a target from the current position"""
+        new_x, new_y = aim_position(angle_offset, distance_mm)
+        return move_duration(X_AT, Y_AT, new_x, new_y)
+
+    def _goal(self, item):
+        """Position in cm a target job will move to, from where the struts are now"""
+        job_id, _, (angle_offset, distance_mm, velocity, _) = item
+        if self._pending_goal is None or self._pending_goal[0] != job_id:
+            if velocity is not None:
+                angle_offset, distance_mm, _ = predict_target(angle_offset, distance_mm, *velocity, X_AT, Y_AT)
+            self._pending_goal = (job_id, aim_position(angle_offset, distance_mm))
+        return self._pending_goal[1]
+
+    def _retarget(self, remaining_seconds, goal=None):
+        """
+        preempt callback for target moves: stop for a newer target, unless it
+        is within RETARGET_ERROR_MM of goal, where the running move ends.
+        """
+        pending = self.pending_target
+        if pending is None:
+            return False
+        if goal is not None:
+            new_goal = self._goal(pending)
+            if max(abs(new_goal[0] - goal[0]), abs(new_goal[1] - goal[1])) * 10.0 <= RETARGET_ERROR_MM:
+                return False
+        with self._lock:
+            self.targets_superseded += 1
+            self._superseded = (goal, pending)
+        return True
+
+    def _count_saved(self, goal, item):
+        """
+        Add the move time a superseded move saved, now that the struts have
+        stopped: finishing it and then moving to the new target, less moving
+        to the new target straight from here.
+        """
+        if goal is None:
+            return
+        new_goal = self._goal(item)
+        saved = (move_duration(X_AT, Y_AT, *goal) + move_duration(*goal, *new_goal)
+                 - move_duration(X_AT, Y_AT, *new_goal))
+        with self._lock:
+            self.seconds_saved += max(0.0, saved)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job['status'] in ('done', 'failed', 'dropped', 'cancelled')]
+        for job_id in finished[:max(0, len(self.jobs) - MAX_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def _run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                with self._lock:
+                    item, self.pending_target = self.pending_target, None
+                if item is None:
+                    continue
+            job_id, func, args = item
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job['status'] == 'cancelled':
+                    continue  # stopped while queued, and maybe trimmed since
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+                self.current = job_id
+                self.token = token = CancelToken()
+                self.trace = trace = self._traces.pop(job_id, None)
+                if trace is not None:
+                    trace['started'] = time.monotonic()
+                self._idle.clear()
+            try:
+                result = func(*args)
+                status, error = 'done', None
+            except Exception as e:
+                result, status, error = None, 'failed', str(e)
+            superseded, self._superseded = self._superseded, None
+            if superseded is not None:
+                self._count_saved(*superseded)
+            with self._lock:
+                if token.cancelled:
+                    status, error = 'cancelled', token.reason
+                job['status'] = status
+                job['result'] = result
+                job['error'] = error
+                job['finished_at'] = time.time()
+                if trace is not None:
+                    trace['finished'] = time.monotonic()
+                self.current = None
+                self.trace = None
+                self._idle.set()
+            if trace is not None:
+                recorder.record_trace(trace)
+
+    def stop(self, reason='stopped', timeout=None):
+        """
+        Stop the running job within one control tick and cancel queued jobs.
+
+        Args:
+            reason (str): Recorded as the error of the cancelled jobs.
+            timeout (float | None): Seconds to wait for the struts to stop.
+
+        Returns:
+            list[int]: IDs of the jobs that were cancelled.
+        """
+        cancelled = []
+        with self._lock:
+            now = time.time()
+            if self.pending_target is not None:
+                self.pending_target = None
+            dropped_traces = list(self._traces.values())
+            self._traces.clear()
+            for job_id, job in self.jobs.items():
+                if job['status'] == 'queued':
+                    job['status'] = 'cancelled'
+                    job['error'] = reason
+                    job['finished_at'] = now
+                    cancelled.append(job_id)
+            if self.current is not None:
+                self.token.cancel(reason)
+                cancelled.append(self.current)
+        for trace in dropped_traces:
+            trace['dropped'] = True
+            recorder.record_trace(trace)
+        if timeout is not None:
+            self._idle.wait(timeout)
+        return cancelled
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until no job is running or waiting to run.
+
+        Returns:
+            bool: False if timeout seconds passed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                busy = any(job['status'] in ('queued', 'running') for job in self.jobs.values())
+            if not busy:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(CONTROL_TICK_SECONDS)
+
+    def job(self, job_id):
+        """A snapshot of a job with its progress, or None if unknown"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        if job['status'] == 'running':
+            job['elapsed_seconds'] = time.time() - job['started_at']
+            if job['estimated_seconds']:
+                job['progress'] = min(0.99, job['elapsed_seconds'] / job['estimated_seconds'])
+        elif job['status'] in ('done', 'failed'):
+            job['elapsed_seconds'] = job['finished_at'] - job['started_at']
+            job['progress'] = 1.0
+        elif job['status'] == 'cancelled' and job['started_at'] is not None:
+            job['elapsed_seconds'] = job['finished_at'] - job['started_at']
+            job['progress'] = 0.0
+            if job['estimated_seconds']:
+                job['progress'] = min(1.0, job['elapsed_seconds'] / job['estimated_seconds'])
+        else:
+            job['progress'] = 0.0
+        return job
+
+    def status(self):
+        """Summary of the controller for /status"""
+        with self._lock:
+            current = self.current
+            pending = self.pending_target[0] if self.pending_target is not None else None
+        return {
+            'busy': current is not None,
+            'current_job': self.job(current) if current is not None else None,
+            'queued_jobs': self.commands.qsize(),
+            'pending_target_job': pending,
+            'targets_dropped': self.targets_dropped,
+            'targets_superseded': self.targets_superseded,
+            'actuator_seconds_saved': round(self.seconds_saved, 1),
+        }
+
+motion = MotionController()
+
 # HTTP API Endpoints
 @app.route('/', methods=['GET'])
 def home():
@@ -635,6 +1380,7 @@ def home():
 
         <div class="section">
             <h3>🔄 System Control</h3>
+            <button class="btn-danger" onclick="stopMotion()">Stop</button>
             <button class="btn-warning" onclick="resetSystem()">Reset System</button>
             <button class="btn-danger" onclick="shutdownSystem()">Shutdown</button>
             <div id="system-response" class="response" style="display:none;"></div>
@@ -694,6 +1440,11 @@ def home():
             showResponse('moveto-response', result, url);
         }
 
+        async function stopMotion() {
+            const result = await makeRequest('/stop', 'POST');
+            showResponse('system-response', result, '/stop');
+        }
+
         async function resetSystem() {
             const result = await makeRequest('/reset');
             showResponse('system-response', result, '/reset');
@@ -729,16 +1480,28 @@ def get_current_xy():
 def shutdown():
     """Shutdown the microservice"""
     try:
-        gpio.cleanup()
+        # Stop the struts within a control tick before letting go of the pins
+        motion.stop('shutdown', timeout=1)
+        gpio.close()
         return jsonify({'status': 'shutting down'})
     finally:
         # Give time for response to send
-        import threading
         def delayed_shutdown():
             time.sleep(1)
             os._exit(0)
         threading.Thread(target=delayed_shutdown).start()
 
+@app.route('/stop', methods=['GET', 'POST'])
+def stop():
+    """Stop the running move where it is and cancel queued moves"""
+    cancelled = motion.stop()
+    return jsonify({
+        'status': 'stopped',
+        'cancelled_jobs': cancelled,
+        'current_x': X_AT,
+        'current_y': Y_AT,
+    })
+
 @app.route('/target', methods=['GET'])
 def target():
     """Move spotlight to target based on angle offset and distance
@@ -746,23 +1509,26 @@ def target():
     Query params:
         angle: float - angle offset from radar (-90 to 90 degrees)
         distance: float - distance in mm (max ~8000)
+        predict: 1 to aim where the target will be when the move finishes
+        vx, vy: float - target velocity in mm/s for prediction (optional)
+        speed: float - radar radial speed in cm/s for prediction (optional)
+            Without vx/vy or speed, velocity comes from recent /target calls.
     """
+    trace = {'received': time.monotonic()}
     try:
-        # Check duty cycle first
-        global DUTY_CYCLE, ACTIVE_SECONDS, MOVE_SECONDS
-        if DUTY_CYCLE > 0.22:
-            # Calculate estimated cooldown time
-            # duty_cycle = active_seconds / move_seconds
-            # We need: 0.22 = active_seconds / (move_seconds + additional_wait_time)
-            # Solving for additional_wait_time: additional_wait_time = (active_seconds / 0.22) - move_seconds
-            estimated_cooldown = max(0, (ACTIVE_SECONDS / 0.22) - MOVE_SECONDS)
+        # Check duty cycle first: neither strut can move at all
+        struts = range(len(STRUT_PINS))
+        if all(thermal.budget(strut) < MIN_MOVE_SECONDS for strut in struts):
+            # Rest until the first strut can make a minimal move again
+            estimated_cooldown = min(thermal.wait_seconds(strut, MIN_MOVE_SECONDS) for strut in struts)
 
             return jsonify({
                 'status': 'cooling_down',
                 'message': 'Duty cycle is above cutoff, waiting for cooldown',
-                'current_duty_cycle': round(DUTY_CYCLE, 3),
-                'cutoff_threshold': 0.22,
-                'estimated_cooldown_seconds': round(estimated_cooldown, 1)
+                'current_duty_cycle': round(duty_cycle(), 3),
+                'cutoff_threshold': DUTY_CYCLE_LIMIT,
+                'estimated_cooldown_seconds': round_seconds(estimated_cooldown),
+                'motion_budget': motion_budget(),
             }), 200
 
         # Get parameters
@@ -774,19 +1540,34 @@ def target():
             return jsonify({'error': 'angle must be between -90 and 90 degrees'}), 400
         if not (0 <= distance_mm <= 8000):
             return jsonify({'error': 'distance must be between 0 and 8000 mm'}), 400
-        new_x, new_y = calculate_actuator_offsets(angle_offset, distance_mm, X_AT, Y_AT)
-        move_to_position(new_x, new_y)
-        # TODO: User will implement the targeting logic here
-        # Placeholder response for now
+
+        # Remember where the target was for velocity estimates
+        angle_rad = math.radians(angle_offset)
+        TARGET_HISTORY.append((time.monotonic(), distance_mm * math.sin(angle_rad),
+                               distance_mm * math.cos(angle_rad)))
+
+        velocity = None
+        if request.args.get('predict', '0') not in ('0', 'false', ''):
+            if 'vx' in request.args or 'vy' in request.args:
+                # Velocity from the caller, e.g. a tracker
+                velocity = (float(request.args.get('vx', 0)), float(request.args.get('vy', 0)), 0.0)
+            elif 'speed' in request.args:
+                # Radar radial speed in cm/s, positive is away from the sensor
+                speed_mm_s = float(request.args['speed']) * 10
+                velocity = (speed_mm_s * math.sin(angle_rad), speed_mm_s * math.cos(angle_rad), 0.0)
+            else:
+                velocity = target_velocity() or (0.0, 0.0, 0.0)
+
+        # Latest wins: replaces a target that has not started moving yet
+        job = motion.submit_target(angle_offset, distance_mm, velocity, trace=trace)
         return jsonify({
             'status': 'targeting',
+            'job_id': job['id'],
             'angle_offset': angle_offset,
             'distance_mm': distance_mm,
             'current_x': X_AT,
             'current_y': Y_AT,
-            'new_x': new_x,
-            'new_y': new_y,
-        })
+        }), 202
 
     except ValueError:
         return jsonify({'error': 'Invalid parameters - angle and distance must be numbers'}), 400
@@ -817,30 +1598,28 @@ def retract_strut(strut, seconds, bypass=None):
         if seconds > MAX_MOVE_SECONDS:
             return jsonify({'error': f'seconds cannot exceed {MAX_MOVE_SECONDS}'}), 400
 
-        # Check duty cycle (unless bypassed for testing)
-        global DUTY_CYCLE, ACTIVE_SECONDS, MOVE_SECONDS
-        if DUTY_CYCLE > 0.22 and bypass != 'force':
-            estimated_cooldown = max(0, (ACTIVE_SECONDS / 0.22) - MOVE_SECONDS)
+        # Check the strut's thermal budget (unless bypassed for testing)
+        if thermal.budget(strut) < seconds and bypass != 'force':
+            estimated_cooldown = thermal.wait_seconds(strut, seconds)
             return jsonify({
                 'status': 'cooling_down',
                 'message': 'Duty cycle is above cutoff, waiting for cooldown. Use /in/<strut>/<seconds>/force to bypass',
-                'current_duty_cycle': round(DUTY_CYCLE, 3),
-                'estimated_cooldown_seconds': round(estimated_cooldown, 1)
+                'current_duty_cycle': round(thermal.duty(strut), 3),
+                'estimated_cooldown_seconds': round_seconds(estimated_cooldown)
             }), 200
 
         # Retract the specified strut (negative value for retraction)
-        if strut == 0:
-            move_strut0(-seconds)
-        else:
-            move_strut1(-seconds)
+        job = motion.submit('retract', move_strut0 if strut == 0 else move_strut1, -seconds,
+                            estimated_seconds=seconds, strut=strut, seconds=seconds)
 
         return jsonify({
             'status': 'success',
+            'job_id': job['id'],
             'action': 'retract',
             'strut': strut,
             'seconds': seconds,
-            'message': f'Strut {strut} retracted for {seconds} seconds'
-        })
+            'message': f'Strut {strut} retracting for {seconds} seconds'
+        }), 202
 
     except ValueError:
         return jsonify({'error': 'seconds must be a valid number'}), 400
@@ -871,30 +1650,28 @@ def extend_strut(strut, seconds, bypass=None):
         if seconds > MAX_MOVE_SECONDS:
             return jsonify({'error': f'seconds cannot exceed {MAX_MOVE_SECONDS}'}), 400
 
-        # Check duty cycle (unless bypassed for testing)
-        global DUTY_CYCLE, ACTIVE_SECONDS, MOVE_SECONDS
-        if DUTY_CYCLE > 0.22 and bypass != 'force':
-            estimated_cooldown = max(0, (ACTIVE_SECONDS / 0.22) - MOVE_SECONDS)
+        # Check the strut's thermal budget (unless bypassed for testing)
+        if thermal.budget(strut) < seconds and bypass != 'force':
+            estimated_cooldown = thermal.wait_seconds(strut, seconds)
             return jsonify({
                 'status': 'cooling_down',
                 'message': 'Duty cycle is above cutoff, waiting for cooldown. Use /out/<strut>/<seconds>/force to bypass',
-                'current_duty_cycle': round(DUTY_CYCLE, 3),
-                'estimated_cooldown_seconds': round(estimated_cooldown, 1)
+                'current_duty_cycle': round(thermal.duty(strut), 3),
+                'estimated_cooldown_seconds': round_seconds(estimated_cooldown)
             }), 200
 
         # Extend the specified strut (positive value for extension)
-        if strut == 0:
-            move_strut0(seconds)
-        else:
-            move_strut1(seconds)
+        job = motion.submit('extend', move_strut0 if strut == 0 else move_strut1, seconds,
+                            estimated_seconds=seconds, strut=strut, seconds=seconds)
 
         return jsonify({
             'status': 'success',
+            'job_id': job['id'],
             'action': 'extend',
             'strut': strut,
             'seconds': seconds,
-            'message': f'Strut {strut} extended for {seconds} seconds'
-        })
+            'message': f'Strut {strut} extending for {seconds} seconds'
+        }), 202
 
     except ValueError:
         return jsonify({'error': 'seconds must be a valid number'}), 400
@@ -924,53 +1701,134 @@ def move_to_mm(strut, mm, bypass=None):
             return jsonify({'error': f'distance cannot exceed {MAX_OUT_MM}mm'}), 400
 
         # Convert millimeters to seconds using per-strut calibration
-        seconds = mm2time(abs(mm), strut)
-        if mm < 0:
-            seconds = -seconds  # Negative for retraction
+        seconds = mm2time(mm, strut)  # Signed, negative for retraction with the retract curve
 
         # Validate time limit
         if abs(seconds) > MAX_MOVE_SECONDS:
             return jsonify({'error': f'calculated time {abs(seconds):.2f}s exceeds {MAX_MOVE_SECONDS}s limit'}), 400
 
-        # Check duty cycle (unless bypassed for testing)
-        global DUTY_CYCLE, ACTIVE_SECONDS, MOVE_SECONDS
-        if DUTY_CYCLE > 0.22 and bypass != 'force':
-            estimated_cooldown = max(0, (ACTIVE_SECONDS / 0.22) - MOVE_SECONDS)
+        # Check the strut's thermal budget (unless bypassed for testing)
+        if thermal.budget(strut) < abs(seconds) and bypass != 'force':
+            estimated_cooldown = thermal.wait_seconds(strut, seconds)
             return jsonify({
                 'status': 'cooling_down',
                 'message': f'Duty cycle is above cutoff, waiting for cooldown. Use /moveto/{strut}/{mm}/force to bypass',
-                'current_duty_cycle': round(DUTY_CYCLE, 3),
-                'estimated_cooldown_seconds': round(estimated_cooldown, 1)
+                'current_duty_cycle': round(thermal.duty(strut), 3),
+                'estimated_cooldown_seconds': round_seconds(estimated_cooldown)
             }), 200
 
         # Move the specified strut
-        if strut == 0:
-            move_strut0(seconds)
-        else:
-            move_strut1(seconds)
+        job = motion.submit('moveto', move_strut0 if strut == 0 else move_strut1, seconds,
+                            estimated_seconds=abs(seconds), strut=strut, distance_mm=mm)
 
         return jsonify({
             'status': 'success',
+            'job_id': job['id'],
             'action': 'extend' if mm > 0 else 'retract',
             'strut': strut,
             'distance_mm': mm,
             'calculated_seconds': round(seconds, 3),
-            'calibration_rate': SECONDS_PER_MM_STRUT0 if strut == 0 else SECONDS_PER_MM_STRUT1,
-            'message': f'Strut {strut} moved {mm}mm in {abs(seconds):.2f} seconds'
-        })
+            'calibration_rate': abs(seconds / mm) if mm else None,  # sec/mm for this move
+            'message': f'Strut {strut} moving {mm}mm in {abs(seconds):.2f} seconds'
+        }), 202
 
     except ValueError:
         return jsonify({'error': 'mm must be a valid number'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def home_struts():
+    """Retract both struts into their stops and zero the position"""
+    global X_AT, Y_AT
+    if not bothin(77):  # hit the stop
+        return False  # stopped on the way, the position is tracked from the time driven
+    X_AT = Y_AT = 0  # back to center
+    POSITION_SIGMA_MM[:] = [0.0, 0.0]
+    thermal.reset()  # this is boot up - doesn't count
+    return True
+
 @app.route('/reset', methods=['GET'])
 def reset():
-    global X_AT, Y_AT, ORANGE, DUTY_CYCLE
-    bothin(77)  # hit the stop
-    X_AT = Y_AT = 0  # back to center
-    DUTY_CYCLE = 0  # this is boot up - doesn't count
-    return jsonify({})
+    job = motion.submit('reset', home_struts, estimated_seconds=77)
+    return jsonify({'status': 'resetting', 'job_id': job['id']}), 202
+
+@app.route('/calibrate/<int:strut>/<moved_mm>', methods=['GET'])
+def calibrate(strut, moved_mm):
+    """Record how far a strut really moved in its last move
+
+    Appends the move to the move log for `python calibration.py fit` and
+    corrects the strut's position.
+
+    Args:
+        strut: Strut number (0 or 1)
+        moved_mm: Measured distance of the last move in mm (negative=retract)
+    """
+    global X_AT, Y_AT
+    try:
+        moved_mm = float(moved_mm)
+    except ValueError:
+        return jsonify({'error': 'moved_mm must be a valid number'}), 400
+    if strut not in [0, 1]:
+        return jsonify({'error': 'strut must be 0 or 1'}), 400
+    if motion.current is not None:
+        return jsonify({'error': 'a move is running, measure once it has finished'}), 409
+    if LAST_MOVES[strut] is None:
+        return jsonify({'error': f'strut {strut} has not moved yet'}), 400
+
+    seconds, start_mm, estimated_mm = LAST_MOVES[strut]
+    append_log(MOVE_LOG_FILE, strut, seconds, start_mm, moved_mm)
+    LAST_MOVES[strut] = None  # one measurement per move
+    # The measurement replaces the dead reckoned position
+    if strut == 0:
+        X_AT = (start_mm + moved_mm) / 10.0
+    else:
+        Y_AT = (start_mm + moved_mm) / 10.0
+    POSITION_SIGMA_MM[strut] = 0.0
+    return jsonify({
+        'status': 'recorded',
+        'strut': strut,
+        'seconds': seconds,
+        'start_mm': start_mm,
+        'estimated_mm': estimated_mm,
+        'measured_mm': moved_mm,
+        'log': MOVE_LOG_FILE,
+    })
+
+@app.route('/calibration', methods=['GET'])
+def get_calibration():
+    """Speed curves in use and the position uncertainty of each strut"""
+    return jsonify({
+        'calibration': calibration.to_dict(),
+        'position_sigma_mm': POSITION_SIGMA_MM,
+        'rehome_sigma_mm': REHOME_SIGMA_MM,
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Pipeline stage latency histograms in the Prometheus text format"""
+    return Response(recorder.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Progress and result of a motion job"""
+    job = motion.job(job_id)
+    if job is None:
+        return jsonify({'error': f'no such job {job_id}'}), 404
+    return jsonify(job)
+
+@app.route('/status', methods=['GET'])
+def get_status():
+    """Position, duty cycle and motion controller state"""
+    status = {
+        'x': X_AT,
+        'y': Y_AT,
+        'duty_cycle': duty_cycle(),
+        'motion_budget': motion_budget(),
+        'position_sigma_mm': [round(sigma, 2) for sigma in POSITION_SIGMA_MM],
+        'version': VERSION,
+    }
+    status.update(motion.status())
+    return jsonify(status)
 
 
 # DEAD TESTING FUNCTION - was used for development testing
@@ -1041,22 +1899,34 @@ def reset():
 if __name__ == "__main__":
     import sys
     # Run as HTTP microservice
+    logs.setup()
     print("Starting motor control microservice...")
     print("Endpoints:")
     print("  GET  /current_xy - Get current X,Y position")
     print("  POST /shutdown   - Shutdown the service")
     print("  GET  /target?angle=<deg>&distance=<mm> - Target spotlight")
+    print("  GET  /target?angle=<deg>&distance=<mm>&predict=1[&vx=<mm/s>&vy=<mm/s>|&speed=<cm/s>] - Lead a moving target")
     print("  GET  /in/<strut>/<seconds> - Retract strut for testing")
     print("  GET  /out/<strut>/<seconds> - Extend strut for testing")
     print("  GET  /in/<strut>/<seconds>/force - Retract strut bypassing duty cycle")
     print("  GET  /out/<strut>/<seconds>/force - Extend strut bypassing duty cycle")
     print("  GET  /moveto/<strut>/<mm> - Move strut specific distance in mm")
     print("  GET  /moveto/<strut>/<mm>/force - Move strut mm bypassing duty cycle")
+    print("  GET  /reset - Home both struts")
+    print("  GET  /stop - Stop the running move and cancel queued moves")
+    print("  GET  /calibrate/<strut>/<mm> - Record the measured distance of a strut's last move")
+    print("  GET  /calibration - Speed curves and position uncertainty")
+    print("  GET  /jobs/<id> - Progress of a motion job (motion endpoints return a job_id)")
+    print("  GET  /status - Position, duty cycle, motion budget per strut and motion controller state")
+    print("  GET  /metrics - Latency histograms of the target pipeline (Prometheus)")
     print("\nStarting server on http://0.0.0.0:5000")
+    init()  # hold the pins until shutdown
     #bothin(28)  # hit the stop
     X_AT = Y_AT = 0  # back to center
-    DUTY_CYCLE = 0  # this is boot up - doesn't count
+    thermal.reset()  # this is boot up - doesn't count
     move_strut0(5)
     move_strut1(5)
+    motion.start()
+    recorder.start_reporting()
     app.run(host='0.0.0.0', port=5000, debug=False)
 
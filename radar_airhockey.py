@@ -1,7 +1,9 @@
+import argparse
 import pygame
 import math
 import time
-from rd03d import RD03D
+from radar_capture import add_replay_arguments, open_radar
+from text_cache import cache as text_cache
 import sys
 
 class GameSettings:
@@ -230,7 +232,7 @@ class AIPlayer:
         self.paddle.update_velocity()
 
 class RadarAirHockey:
-    def __init__(self):
+    def __init__(self, replay=None, speed=1.0):
         pygame.init()
         self.settings = GameSettings()
         
@@ -243,7 +245,7 @@ class RadarAirHockey:
         
         # Initialize radar
         try:
-            self.radar = RD03D()
+            self.radar = open_radar(replay, speed, threaded=True)
             self.radar_connected = True
             print("Radar connected successfully!")
         except Exception as e:
@@ -282,6 +284,9 @@ class RadarAirHockey:
         
         # Player position smoothing
         self.smoothed_player_pos = Vector2(self.player_paddle.pos.x, self.player_paddle.pos.y)
+
+        # Settings overlay, made on first use
+        self._overlay = None
     
     def get_radar_position(self):
         """Get position from radar sensor"""
@@ -369,14 +374,13 @@ class RadarAirHockey:
     def draw_ui(self):
         """Draw user interface elements"""
         # Score
-        score_text = self.font.render(f"Player: {self.player_score}  AI: {self.ai_score}", 
-                                     True, (255, 255, 255))
-        self.screen.blit(score_text, (10, 10))
+        text_cache.draw(self.screen, self.font, f"Player: {self.player_score}  AI: {self.ai_score}",
+                        (255, 255, 255), (10, 10))
         
         # Instructions
         if not self.radar_connected:
-            demo_text = self.small_font.render("DEMO MODE - Use mouse to control paddle", 
-                                             True, (255, 255, 100))
+            demo_text = text_cache.render(self.small_font, "DEMO MODE - Use mouse to control paddle",
+                                          (255, 255, 100))
             self.screen.blit(demo_text, (10, self.settings.window_height - 30))
         
         # Controls
@@ -388,15 +392,16 @@ class RadarAirHockey:
         ]
         
         for i, control in enumerate(controls):
-            text = self.small_font.render(control, True, (200, 200, 200))
+            text = text_cache.render(self.small_font, control, (200, 200, 200))
             self.screen.blit(text, (self.settings.window_width - 150, 10 + i * 20))
     
     def draw_settings(self):
         """Draw settings overlay"""
-        overlay = pygame.Surface((self.settings.window_width, self.settings.window_height))
-        overlay.set_alpha(200)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
+        if self._overlay is None:
+            self._overlay = pygame.Surface((self.settings.window_width, self.settings.window_height))
+            self._overlay.set_alpha(200)
+            self._overlay.fill((0, 0, 0))
+        self.screen.blit(self._overlay, (0, 0))
         
         settings_text = [
             "SETTINGS",
@@ -414,14 +419,13 @@ class RadarAirHockey:
         y_offset = 100
         for text in settings_text:
             if text == "SETTINGS":
-                rendered = self.font.render(text, True, (255, 255, 100))
+                text_cache.draw(self.screen, self.font, text, (255, 255, 100), (50, y_offset))
             elif text == "":
                 y_offset += 10
                 continue
             else:
-                rendered = self.small_font.render(text, True, (255, 255, 255))
+                text_cache.draw(self.screen, self.small_font, text, (255, 255, 255), (50, y_offset))
             
-            self.screen.blit(rendered, (50, y_offset))
             y_offset += 30
     
     def handle_settings_input(self, key):
@@ -518,7 +522,7 @@ class RadarAirHockey:
                 self.draw_settings()
             
             if self.game_paused and not self.show_settings:
-                pause_text = self.font.render("PAUSED - Press SPACE to resume", True, (255, 255, 100))
+                pause_text = text_cache.render(self.font, "PAUSED - Press SPACE to resume", (255, 255, 100))
                 text_rect = pause_text.get_rect(center=(self.settings.window_width//2, self.settings.window_height//2))
                 self.screen.blit(pause_text, text_rect)
             
@@ -532,5 +536,8 @@ class RadarAirHockey:
         sys.exit()
 
 if __name__ == "__main__":
-    game = RadarAirHockey()
+    parser = argparse.ArgumentParser(description='Radar controlled air hockey')
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+    game = RadarAirHockey(args.replay, args.speed)
     game.run()
\ No newline at end of file
@@ -0,0 +1,335 @@
+"""
+Record raw RD-03D UART data and replay it without the sensor.
+
+A capture file is an 8 byte magic, the wall clock start time, and then one
+record per UART read: seconds since the start of the capture, the chunk
+length and the raw bytes, exactly as the radar sent them.
+
+Usage:
+    python radar_capture.py record <file> [--seconds N] [--port /dev/ttyS0]
+    python radar_capture.py info <file>
+"""
+import argparse
+import asyncio
+import bisect
+import mmap
+import struct
+import time
+from collections import deque
+
+from rd03d import RD03D, decode_frames, find_frames
+
+MAGIC = b'RD03CAP1'
+FILE_HEADER = struct.Struct('<8sd')  # magic, wall clock start time
+RECORD_HEADER = struct.Struct('<dI')  # seconds since start, chunk length
+
+
+class CaptureWriter:
+    """Appends timestamped raw UART chunks to a capture file"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(MAGIC, time.time()))
+        self.started = time.monotonic()
+        self.chunks = 0
+        self.bytes = 0
+
+    def write(self, data, timestamp=None):
+        """Store one chunk. timestamp is a time.monotonic() value, default now."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.file.write(RECORD_HEADER.pack(timestamp - self.started, len(data)))
+        self.file.write(data)
+        self.chunks += 1
+        self.bytes += len(data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Capture:
+    """A memory-mapped capture file with an index of its chunks"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        magic, self.started_at = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an RD03D capture')
+
+        self.times = []    # Seconds since start of each chunk
+        self.offsets = []  # Offset of each chunk's data in the file
+        self.lengths = []
+        pos = FILE_HEADER.size
+        while pos + RECORD_HEADER.size <= len(self.map):
+            seconds, length = RECORD_HEADER.unpack_from(self.map, pos)
+            pos += RECORD_HEADER.size
+            if pos + length > len(self.map):
+                break  # Truncated last record, recorder was killed
+            self.times.append(seconds)
+            self.offsets.append(pos)
+            self.lengths.append(length)
+            pos += length
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    def chunk(self, index):
+        """The raw bytes of a chunk, as a memoryview into the mapped file"""
+        offset = self.offsets[index]
+        return self.view[offset:offset + self.lengths[index]]
+
+    def find_frames(self):
+        """rd03d.find_frames() over the mapped file, offsets are into the joined chunk data"""
+        return find_frames(self.map, (self.offsets, self.lengths))
+
+    def decode_frames(self):
+        """rd03d.decode_frames() over the mapped file, reading the chunks in place"""
+        return decode_frames(self.map, (self.offsets, self.lengths))
+
+    def data(self):
+        """All chunks joined into one bytes object.
+
+        This copies the whole capture into memory, use find_frames() and
+        decode_frames() to work on the mapped file instead.
+        """
+        return b''.join(self.chunk(i) for i in range(len(self)))
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+
+class ReplaySerial:
+    """Serves a capture through the part of the serial.Serial interface RD03D uses.
+
+    Chunks become readable when their recorded time comes round, scaled by
+    speed: 1.0 is real time, 10 plays ten times faster and 0 (or None)
+    releases the next chunk as soon as the previous one has been read.
+    """
+
+    def __init__(self, path, speed=1.0, timeout=0.1):
+        self.capture = Capture(path)
+        self.speed = speed or 0
+        self.timeout = timeout
+        self.is_open = True
+        self._started = None  # Replay clock starts at the first read
+        self._chunk = 0       # Chunk currently being read
+        self._offset = 0      # Bytes already read from that chunk
+
+    def _now(self):
+        if self._started is None:
+            self._started = time.monotonic()
+        return (time.monotonic() - self._started) * self.speed
+
+    def _released(self):
+        """Number of chunks that have arrived by now"""
+        if not self.speed:
+            return min(self._chunk + 1, len(self.capture))
+        return bisect.bisect_right(self.capture.times, self._now())
+
+    def next_release(self):
+        """Seconds of wall time until the next chunk arrives, None at the end"""
+        if self._chunk >= len(self.capture):
+            return None
+        if not self.speed:
+            return 0.0
+        released = self._released()
+        if released > self._chunk:
+            return 0.0
+        return max(0.0, (self.capture.times[released] - self._now()) / self.speed)
+
+    @property
+    def finished(self):
+        return self._chunk >= len(self.capture)
+
+    @property
+    def in_waiting(self):
+        released = self._released()
+        if released <= self._chunk:
+            return 0
+        return sum(self.capture.lengths[self._chunk:released]) - self._offset
+
+    def readinto(self, buffer):
+        """Copy waiting bytes into buffer, blocking up to timeout for the first one"""
+        if not self.in_waiting:
+            wait = self.next_release()
+            if wait is None or wait > self.timeout:
+                time.sleep(self.timeout)
+                return 0
+            time.sleep(wait)
+
+        count = 0
+        released = self._released()
+        while count < len(buffer) and self._chunk < released:
+            chunk = self.capture.chunk(self._chunk)
+            take = min(len(buffer) - count, len(chunk) - self._offset)
+            buffer[count:count + take] = chunk[self._offset:self._offset + take]
+            count += take
+            self._offset += take
+            if self._offset == len(chunk):
+                self._chunk += 1
+                self._offset = 0
+        return count
+
+    def read(self, size=1):
+        buffer = bytearray(size)
+        return bytes(buffer[:self.readinto(buffer)])
+
+    def write(self, data):
+        return len(data)  # Mode commands have no effect on a recording
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        if self.speed:
+            self._chunk = self._released()
+            self._offset = 0
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.capture.close()
+
+
+class RD03DReplay(RD03D):
+    """An RD03D that reads from a capture file instead of the serial port.
+
+    Args:
+        path: Capture file written by CaptureWriter.
+        speed: 1.0 for real time, >1 accelerated, 0 for as fast as possible.
+        multi_mode: Recorded for compatibility, the capture decides the mode.
+        threaded: Decode on a background thread, as for RD03D.
+    """
+
+    def __init__(self, path, speed=1.0, multi_mode=True, threaded=False):
+        super().__init__(multi_mode=multi_mode, threaded=threaded, uart=ReplaySerial(path, speed))
+
+    def set_multi_mode(self, multi_mode=True):
+        """The mode is whatever was recorded, there is no sensor to switch"""
+        self.multi_mode = multi_mode
+
+    @property
+    def finished(self):
+        """True once the whole capture has been read"""
+        return self.uart.finished
+
+    async def frames(self, queue_depth=1, idle_timeout=None):
+        """Asynchronously iterate over the capture's frames, paced like the sensor.
+
+        Follows RD03D.frames(): a slow consumer only gets the newest
+        queue_depth frames, and None is yielded after idle_timeout seconds
+        without a frame.
+        """
+        self.stop_reader()
+        uart = self.uart
+        queue = deque(maxlen=queue_depth)
+        idle_since = time.monotonic()
+        while not uart.finished or queue:
+            if not queue:
+                wait = uart.next_release()
+                if idle_timeout is not None and wait > idle_timeout:
+                    await asyncio.sleep(idle_timeout)
+                    yield None
+                    continue
+                await asyncio.sleep(wait)
+
+            # Take every chunk that has arrived while the consumer was busy
+            waiting = uart.in_waiting
+            while waiting > 0:
+                count = uart.readinto(self._view[self._fill:self._fill + waiting])
+                waiting -= count
+                self._received(count)
+                for frame in self._drain_frames(time.monotonic()):
+                    if len(queue) == queue.maxlen:
+                        self.frames_dropped += 1
+                    queue.append(frame)
+
+            if queue:
+                frame = queue.popleft()
+                self.targets = frame.targets
+                idle_since = time.monotonic()
+                yield frame
+            elif idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                idle_since = time.monotonic()
+                yield None
+
+
+def open_radar(replay=None, speed=1.0, **kwargs):
+    """Open the sensor, or a capture file if replay is given"""
+    if replay:
+        return RD03DReplay(replay, speed=speed, **kwargs)
+    return RD03D(**kwargs)
+
+
+def add_replay_arguments(parser):
+    """Add --replay/--speed options for open_radar() to an argparse parser"""
+    parser.add_argument('--replay', metavar='FILE',
+                        help='read radar data from a capture file instead of the sensor')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='replay speed: 1 real time, >1 faster, 0 as fast as possible')
+
+
+def record(path, seconds=None, port='/dev/ttyS0'):
+    """Record raw UART data from the sensor until interrupted or seconds pass"""
+    radar = RD03D(port)
+    writer = CaptureWriter(path)
+    radar.capture = writer
+    print(f"Recording to {path}, Ctrl-C to stop")
+    try:
+        while seconds is None or time.monotonic() - writer.started < seconds:
+            radar.update()
+            time.sleep(0.005)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        radar.close()
+        writer.close()
+    print(f"{writer.chunks} chunks, {writer.bytes} bytes")
+
+
+def info(path):
+    capture = Capture(path)
+    started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture.started_at))
+    total = sum(capture.lengths)
+    print(f"{path}: recorded {started}")
+    print(f"  {len(capture)} chunks, {total} bytes, {capture.duration:.1f}s")
+    try:
+        print(f"  {len(capture.find_frames())} frames")
+    except RuntimeError:
+        pass  # No numpy to count frames with
+    capture.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and inspect RD03D captures')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='record raw UART data from the sensor')
+    record_parser.add_argument('file')
+    record_parser.add_argument('--seconds', type=float)
+    record_parser.add_argument('--port', default='/dev/ttyS0')
+    info_parser = commands.add_parser('info', help='summarize a capture file')
+    info_parser.add_argument('file')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.file, args.seconds, args.port)
+    else:
+        info(args.file)
+
+
+if __name__ == "__main__":
+    main()
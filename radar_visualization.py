@@ -1,7 +1,229 @@
+import argparse
 import pygame
 import math
 import time
-from rd03d import RD03D
+from collections import deque
+import numpy as np
+from radar_capture import add_replay_arguments, open_radar
+from rd03d import Target
+from tracker import MultiTargetTracker
+from text_cache import cache as text_cache
+
+DIRTY_SEGMENT_PIXELS = 32  # long lines are split into rects of this length for dirty updates
+MATCH_DISTANCE_MM = 600  # a target this close to one in the previous frame is taken to be the same
+FRAME_INTERVAL_SECONDS = 0.1  # radar frame interval until it has been measured
+TRAIL_SECONDS = 10.0  # history kept and drawn per track
+MAX_FRAME_RATE = 20  # radar frames per second the trail buffers are sized for
+HEATMAP_HALF_LIFE_SECONDS = 600.0  # occupancy fades to half in this time
+HEATMAP_RANGE_MM = 8000  # the heatmap grid covers 0..this, whatever the display range
+HEATMAP_REFRESH_SECONDS = 0.5  # the heatmap layer is redrawn this often
+HEATMAP_PIXELS = 4  # heatmap cells are drawn at 1/HEATMAP_PIXELS resolution and scaled up
+
+
+def line_rects(start, end, width):
+    """Small rects covering a line, so a diagonal line doesn't dirty its whole bounding box"""
+    length = math.hypot(end[0] - start[0], end[1] - start[1])
+    steps = max(1, int(length // DIRTY_SEGMENT_PIXELS) + 1)
+    pad = width + 1
+    rects = []
+    for i in range(steps):
+        x0 = start[0] + (end[0] - start[0]) * i / steps
+        y0 = start[1] + (end[1] - start[1]) * i / steps
+        x1 = start[0] + (end[0] - start[0]) * (i + 1) / steps
+        y1 = start[1] + (end[1] - start[1]) * (i + 1) / steps
+        left, top = min(x0, x1) - pad, min(y0, y1) - pad
+        rects.append(pygame.Rect(int(left), int(top),
+                                 int(abs(x1 - x0) + 2 * pad) + 1, int(abs(y1 - y0) + 2 * pad) + 1))
+    return rects
+
+
+class FrameStats:
+    """Recent frame times and how much of the window each frame pushed, for the HUD"""
+
+    def __init__(self, size=60, refresh_seconds=0.5):
+        self.frame_ms = deque(maxlen=size)
+        self.dirty = deque(maxlen=size)  # fraction of the window updated
+        self.refresh_seconds = refresh_seconds
+        self._lines = []
+        self._refreshed = 0.0
+
+    def add(self, seconds, dirty_fraction):
+        self.frame_ms.append(seconds * 1000)
+        self.dirty.append(dirty_fraction)
+
+    def lines(self):
+        """HUD text, refreshed every refresh_seconds so it can be read"""
+        now = time.monotonic()
+        if self.frame_ms and now - self._refreshed >= self.refresh_seconds:
+            self._refreshed = now
+            self._lines = [
+                f"Frame: {sum(self.frame_ms) / len(self.frame_ms):.1f}ms avg, {max(self.frame_ms):.1f}ms max",
+                f"Updated: {sum(self.dirty) / len(self.dirty):.0%} of window",
+            ]
+        return self._lines
+
+
+class TargetInterpolator:
+    """Smooth target motion between radar frames for the display.
+
+    The display runs faster than the radar, so targets are shown one radar
+    frame interval in the past, interpolated between the two frames around
+    that time. Slots are matched to the nearest target of the previous
+    frame, since the sensor reorders its slots.
+
+    Args:
+        match_mm: Targets further than this from every previous target jump instead.
+    """
+
+    def __init__(self, match_mm=MATCH_DISTANCE_MM):
+        self.match_mm = match_mm
+        self.previous = None  # Frame
+        self.current = None   # Frame
+        self.interval = FRAME_INTERVAL_SECONDS  # smoothed time between frames
+
+    def update(self, frame):
+        """Take the newest frame from the radar, a no-op if it has been seen"""
+        if frame is None or (self.current is not None and frame.seq == self.current.seq):
+            return False
+        if self.current is not None:
+            elapsed = frame.timestamp - self.current.timestamp
+            if elapsed > 0:
+                self.interval += 0.1 * (min(elapsed, 1.0) - self.interval)
+        self.previous, self.current = self.current, frame
+        return True
+
+    def targets(self, now=None):
+        """The current frame's target slots, moved to where they were at now - interval"""
+        if self.current is None:
+            return [None, None, None]
+        if self.previous is None:
+            return list(self.current.targets)
+        now = time.monotonic() if now is None else now
+        span = self.current.timestamp - self.previous.timestamp
+        if span <= 0:
+            return list(self.current.targets)
+        fraction = min(1.0, max(0.0, (now - self.interval - self.previous.timestamp) / span))
+        result = []
+        for target in self.current.targets:
+            start = self._match(target)
+            if start is None or fraction >= 1.0:
+                result.append(target)
+                continue
+            result.append(Target(start.x + (target.x - start.x) * fraction,
+                                 start.y + (target.y - start.y) * fraction,
+                                 start.speed + (target.speed - start.speed) * fraction,
+                                 target.pixel_distance))
+        return result
+
+    def _match(self, target):
+        """The previous frame's target nearest to target, or None if none is close"""
+        if not (target.x or target.y):
+            return None  # empty slot
+        best, best_distance = None, self.match_mm
+        for candidate in self.previous.targets:
+            if not (candidate.x or candidate.y):
+                continue
+            distance = math.hypot(candidate.x - target.x, candidate.y - target.y)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+
+class TrackHistory:
+    """The last seconds of every track's positions in fixed-size NumPy ring buffers.
+
+    Each live track owns one row of a (max_tracks, capacity) ring; a row is
+    freed when its track is dropped, so memory does not grow with run time.
+
+    Args:
+        seconds: History kept per track.
+        max_tracks: Tracks followed at once, as MultiTargetTracker.max_tracks.
+        rate: Highest radar frame rate, sizes the rings.
+    """
+
+    def __init__(self, seconds=TRAIL_SECONDS, max_tracks=8, rate=MAX_FRAME_RATE):
+        self.seconds = seconds
+        self.capacity = int(math.ceil(seconds * rate))
+        self.points = np.zeros((max_tracks, self.capacity, 2), dtype=np.float32)  # x, y in mm
+        self.times = np.full((max_tracks, self.capacity), -np.inf)
+        self.heads = np.zeros(max_tracks, dtype=np.intp)  # next write position per row
+        self.rows = {}  # track id -> row
+        self.last_timestamp = None
+
+    def add(self, tracks, timestamp):
+        """Append the positions of tracks (from MultiTargetTracker) at timestamp"""
+        live = {track.id for track in tracks}
+        for track_id in [i for i in self.rows if i not in live]:
+            del self.rows[track_id]
+        for track in tracks:
+            row = self.rows.get(track.id)
+            if row is None:
+                free = sorted(set(range(len(self.heads))) - set(self.rows.values()))
+                if not free:
+                    continue
+                row = self.rows[track.id] = free[0]
+                self.times[row] = -np.inf
+            head = self.heads[row]
+            self.points[row, head] = track.x, track.y
+            self.times[row, head] = timestamp
+            self.heads[row] = (head + 1) % self.capacity
+        self.last_timestamp = timestamp
+
+    def trail(self, track_id, now=None):
+        """A track's positions over the last seconds before now, oldest first, as an (n, 2) array in mm"""
+        row = self.rows.get(track_id)
+        if row is None or self.last_timestamp is None:
+            return self.points[0, :0]
+        now = self.last_timestamp if now is None else now
+        order = (np.arange(self.capacity) + self.heads[row]) % self.capacity
+        return self.points[row, order[self.times[row, order] >= now - self.seconds]]
+
+
+class OccupancyHeatmap:
+    """Time people spent in each cell of a polar (angle, range) grid, fading with a half life.
+
+    Args:
+        fov_angle: Field of view covered, degrees.
+        angle_bins, range_bins: Grid size; range bins cover 0..HEATMAP_RANGE_MM.
+        half_life: Seconds for old occupancy to fade to half.
+    """
+
+    def __init__(self, fov_angle=120, angle_bins=60, range_bins=80, half_life=HEATMAP_HALF_LIFE_SECONDS):
+        self.fov_angle = fov_angle
+        self.max_range = HEATMAP_RANGE_MM
+        self.half_life = half_life
+        self.grid = np.zeros((angle_bins, range_bins), dtype=np.float32)  # seconds of presence
+        self.last_timestamp = None
+
+    def add(self, x, y, timestamp):
+        """Decay the grid to timestamp and add the frame interval to the cells of points x, y (mm)"""
+        dt = 0.0
+        if self.last_timestamp is not None:
+            dt = min(1.0, max(0.0, timestamp - self.last_timestamp))
+            self.grid *= 0.5 ** (dt / self.half_life)
+        self.last_timestamp = timestamp
+        if not len(x) or not dt:
+            return
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        angle, distance = self.cells(np.degrees(np.arctan2(x, y)), np.hypot(x, y))
+        inside = (angle >= 0) & (angle < self.grid.shape[0]) & (distance < self.grid.shape[1])
+        np.add.at(self.grid, (angle[inside], distance[inside]), dt)
+
+    def cells(self, angles, distances):
+        """Grid indices of angles (degrees) and distances (mm), out of range ones included"""
+        angle = np.floor((angles + self.fov_angle / 2) / self.fov_angle * self.grid.shape[0]).astype(np.intp)
+        distance = np.floor(distances / self.max_range * self.grid.shape[1]).astype(np.intp)
+        return angle, distance
+
+
+def heat_colormap():
+    """256 RGB colors from black through blue and red to yellow"""
+    stops = np.linspace(0, 255, 4)
+    levels = np.arange(256)
+    colors = [(0, 0, 0), (0, 0, 140), (200, 0, 0), (255, 230, 0)]
+    return np.stack([np.interp(levels, stops, [c[i] for c in colors]) for i in range(3)], axis=1).astype(np.uint8)
+
 
 class RadarDisplay:
     def __init__(self, width=1200, height=900):
@@ -44,7 +266,29 @@ class RadarDisplay:
         
         # Sweep animation
         self.sweep_angle = 0
-        self.sweep_speed = 2
+        self.sweep_speed = 60  # degrees per second, the same at any frame rate
+        self._sweep_time = None
+
+        # Pre-rendered rings, lines and labels, see draw_radar_background()
+        self._background = None
+        self._background_key = None
+        self._backdrop = None  # what frames are erased to: the background, with the heatmap under it if shown
+
+        # Trails and heatmap, see draw_trails() and update_backdrop()
+        self.history = None   # TrackHistory
+        self.heatmap = None   # OccupancyHeatmap
+        self.show_trails = False
+        self.show_heatmap = False
+        self._heatmap_drawn = 0.0
+        self._heatmap_layers = None  # surfaces and cell lookup for the current geometry
+
+        # Dirty rectangles, see begin_frame() and end_frame()
+        self.full_redraw = False  # flip the whole window every frame instead
+        self._drawn = []     # rects drawn this frame, restored from the background next frame
+        self._restored = []  # rects of last frame put back by begin_frame()
+        self._updated = []   # rects of info panel lines redrawn this frame
+        self._flip = True    # the whole window changed
+        self._panel_lines = []  # (text, color, font, position, rect) on screen in the panel
         
     def set_max_range(self, range_meters):
         """Set the maximum range in meters"""
@@ -70,8 +314,8 @@ class RadarDisplay:
         
         return int(x), int(y)
     
-    def draw_range_arc(self, radius, start_angle, end_angle, color, width=1):
-        """Draw an arc for range circles within the FOV"""
+    def draw_range_arc(self, radius, start_angle, end_angle, color, width=1, surface=None):
+        """Draw an arc for range circles within the FOV, on the screen unless surface is given"""
         if radius <= 0 or radius > self.radar_radius:
             return
             
@@ -91,12 +335,109 @@ class RadarDisplay:
         
         # Draw the arc as connected line segments
         if len(points) > 1:
-            pygame.draw.lines(self.screen, color, False, points, width)
-    
+            pygame.draw.lines(surface or self.screen, color, False, points, width)
+
+    def background_key(self):
+        """Everything the background depends on; it is redrawn when this changes"""
+        return (self.max_range, self.fov_angle, self.width, self.height,
+                self.center_x, self.center_y, self.radar_radius)
+
     def draw_radar_background(self):
-        """Draw the radar display background"""
-        # Fill background
-        self.screen.fill(self.BLACK)
+        """Draw the radar display background.
+
+        The background only changes with max_range, fov_angle or the
+        geometry, so it is rendered once into an off-screen surface and
+        blitted every frame.
+        """
+        self.update_backdrop()
+        self.screen.blit(self._backdrop, (0, 0))
+
+    def radar_rect(self):
+        """Screen area of the radar fan"""
+        return pygame.Rect(self.center_x - self.radar_radius, self.center_y - self.radar_radius,
+                           2 * self.radar_radius + 1, self.radar_radius + 1).clip(self.screen.get_rect())
+
+    def update_backdrop(self):
+        """Bring the backdrop up to date.
+
+        Returns:
+            'all' if the background was rendered again, 'heatmap' if only the
+            radar area changed, None if nothing did.
+        """
+        key = self.background_key()
+        if self._background is None or key != self._background_key:
+            self._background = self.render_background()
+            self._background_key = key
+            self._heatmap_layers = None
+            self._backdrop = self._background
+            if self.show_heatmap and self.heatmap is not None:
+                self.render_heatmap()
+            return 'all'
+        if self.show_heatmap and self.heatmap is not None:
+            if self._backdrop is self._background or time.monotonic() - self._heatmap_drawn >= HEATMAP_REFRESH_SECONDS:
+                self.render_heatmap()
+                return 'heatmap'
+        elif self._backdrop is not self._background:
+            self._backdrop = self._background
+            return 'heatmap'
+        return None
+
+    def heatmap_layers(self):
+        """Surfaces and the screen cell -> grid cell lookup for the heatmap, made once per geometry"""
+        if self._heatmap_layers is None:
+            area = self.radar_rect()
+            size = (math.ceil(area.width / HEATMAP_PIXELS), math.ceil(area.height / HEATMAP_PIXELS))
+            # Centre of every low resolution pixel, in mm from the radar
+            px = area.left + (np.arange(size[0]) + 0.5) * HEATMAP_PIXELS
+            py = area.top + (np.arange(size[1]) + 0.5) * HEATMAP_PIXELS
+            scale = self.max_range / self.radar_radius
+            x = (px[:, None] - self.center_x) * scale
+            y = (self.center_y - py[None, :]) * scale
+            distances = np.hypot(x, y)
+            angle, distance = self.heatmap.cells(np.degrees(np.arctan2(x, y)), distances)
+            rows, columns = self.heatmap.grid.shape
+            inside = ((angle >= 0) & (angle < rows) & (distance >= 0) & (distance < columns)
+                      & (distances <= self.max_range) & (np.abs(np.degrees(np.arctan2(x, y))) <= self.fov_angle / 2))
+            lookup = np.where(inside, angle * columns + distance, rows * columns)  # last index is an empty cell
+            # Rings and labels go over the heat, black is see-through
+            overlay = self._background.subsurface(area).copy()
+            overlay.set_colorkey(self.BLACK)
+            self._heatmap_layers = {
+                'area': area,
+                'lookup': lookup,
+                'cells': np.zeros(rows * columns + 1, dtype=np.float32),
+                'colors': heat_colormap(),
+                'small': pygame.Surface(size, 0, 32),
+                'scaled': pygame.Surface(area.size, 0, 32),
+                'overlay': overlay,
+                'backdrop': self._background.copy(),
+            }
+        return self._heatmap_layers
+
+    def render_heatmap(self):
+        """Draw the heatmap under the background's radar area into the backdrop"""
+        layers = self.heatmap_layers()
+        cells = layers['cells']
+        cells[:-1] = self.heatmap.grid.ravel()
+        peak = cells.max()
+        values = cells[layers['lookup']]
+        if peak > 0:
+            # sqrt brings out places people only passed through
+            levels = (np.sqrt(values / peak) * 255).astype(np.uint8)
+        else:
+            levels = np.zeros(values.shape, dtype=np.uint8)
+        pygame.surfarray.blit_array(layers['small'], layers['colors'][levels])
+        pygame.transform.smoothscale(layers['small'], layers['area'].size, layers['scaled'])
+        backdrop = layers['backdrop']
+        backdrop.blit(layers['scaled'], layers['area'])
+        backdrop.blit(layers['overlay'], layers['area'])
+        self._backdrop = backdrop
+        self._heatmap_drawn = time.monotonic()
+
+    def render_background(self):
+        """Render range rings, FOV and angle lines and their labels into a new surface"""
+        surface = pygame.Surface((self.width, self.height)).convert()
+        surface.fill(self.BLACK)
         
         # Draw range circles/arcs only within FOV
         fov_half = self.fov_angle / 2
@@ -115,7 +456,7 @@ class RadarDisplay:
             radius = self.distance_to_pixels(range_mm)
             if 0 < radius <= self.radar_radius:
                 # Draw arc only within FOV
-                self.draw_range_arc(radius, -fov_half, fov_half, self.DARK_GREEN)
+                self.draw_range_arc(radius, -fov_half, fov_half, self.DARK_GREEN, surface=surface)
                 
                 # Range labels - position them better
                 label_angle = 0  # Put label at center of FOV
@@ -125,14 +466,14 @@ class RadarDisplay:
                 
                 label = self.small_font.render(f"{range_m}m", True, self.DARK_GREEN)
                 label_rect = label.get_rect(center=(label_x, label_y))
-                self.screen.blit(label, label_rect)
+                surface.blit(label, label_rect)
         
         # Draw field of view boundary lines
         for angle in [-fov_half, fov_half]:
             screen_angle = math.radians(self.angle_to_screen_angle(angle))
             end_x = self.center_x + self.radar_radius * math.cos(screen_angle)
             end_y = self.center_y - self.radar_radius * math.sin(screen_angle)
-            pygame.draw.line(self.screen, self.GREEN, 
+            pygame.draw.line(surface, self.GREEN, 
                            (self.center_x, self.center_y), (end_x, end_y), 2)
         
         # Draw angle lines every 30 degrees within FOV
@@ -141,7 +482,7 @@ class RadarDisplay:
                 screen_angle = math.radians(self.angle_to_screen_angle(angle))
                 end_x = self.center_x + self.radar_radius * math.cos(screen_angle)
                 end_y = self.center_y - self.radar_radius * math.sin(screen_angle)
-                pygame.draw.line(self.screen, self.DARK_GREEN, 
+                pygame.draw.line(surface, self.DARK_GREEN, 
                                (self.center_x, self.center_y), (end_x, end_y), 1)
                 
                 # Angle labels
@@ -149,17 +490,17 @@ class RadarDisplay:
                 label_y = self.center_y - (self.radar_radius + 25) * math.sin(screen_angle)
                 label = self.small_font.render(f"{angle}°", True, self.DARK_GREEN)
                 label_rect = label.get_rect(center=(label_x, label_y))
-                self.screen.blit(label, label_rect)
+                surface.blit(label, label_rect)
         
         # Draw center line (0 degrees)
         screen_angle = math.radians(self.angle_to_screen_angle(0))
         end_x = self.center_x + self.radar_radius * math.cos(screen_angle)
         end_y = self.center_y - self.radar_radius * math.sin(screen_angle)
-        pygame.draw.line(self.screen, self.GREEN, 
+        pygame.draw.line(surface, self.GREEN, 
                        (self.center_x, self.center_y), (end_x, end_y), 1)
         
         # Draw center point
-        pygame.draw.circle(self.screen, self.GREEN, (self.center_x, self.center_y), 4)
+        pygame.draw.circle(surface, self.GREEN, (self.center_x, self.center_y), 4)
         
         # Draw radar area outline
         fov_half_rad = math.radians(fov_half)
@@ -175,7 +516,100 @@ class RadarDisplay:
             arc_points.append((x, y))
         arc_points.append((self.center_x, self.center_y))
         
-        pygame.draw.polygon(self.screen, self.DARK_GREEN, arc_points, 1)
+        pygame.draw.polygon(surface, self.DARK_GREEN, arc_points, 1)
+
+        self.render_panel(surface)
+        return surface
+
+    def render_panel(self, surface):
+        """The info panel box and speed legend, which never change"""
+        panel_x = 10
+
+        # Draw panel background
+        panel_rect = pygame.Rect(5, 5, self.info_panel_width - 10, self.height - 10)
+        pygame.draw.rect(surface, (20, 20, 20), panel_rect)
+        pygame.draw.rect(surface, self.DARK_GREEN, panel_rect, 2)
+
+        # Legend
+        legend_y = self.height - 140
+        legend_title = self.small_font.render("Speed Legend:", True, self.WHITE)
+        surface.blit(legend_title, (panel_x, legend_y))
+
+        # Speed arrow legend
+        pygame.draw.line(surface, self.RED, (panel_x, legend_y + 25), (panel_x + 30, legend_y + 25), 3)
+        pygame.draw.polygon(surface, self.RED, [(panel_x + 30, legend_y + 25),
+                                                (panel_x + 25, legend_y + 20),
+                                                (panel_x + 25, legend_y + 30)])
+        away_text = self.small_font.render("Moving Away", True, self.WHITE)
+        surface.blit(away_text, (panel_x + 40, legend_y + 20))
+
+        pygame.draw.line(surface, self.GREEN, (panel_x, legend_y + 45), (panel_x + 30, legend_y + 45), 3)
+        pygame.draw.polygon(surface, self.GREEN, [(panel_x, legend_y + 45),
+                                                  (panel_x + 5, legend_y + 40),
+                                                  (panel_x + 5, legend_y + 50)])
+        toward_text = self.small_font.render("Moving Toward", True, self.WHITE)
+        surface.blit(toward_text, (panel_x + 40, legend_y + 40))
+
+    def begin_frame(self):
+        """Start a frame: draw the whole background if it changed, else erase what the last frame drew"""
+        changed = self.update_backdrop()
+        if self.full_redraw or changed == 'all':
+            self.screen.blit(self._backdrop, (0, 0))
+            self._flip = True
+            self._panel_lines = []
+            self._restored = []
+        else:
+            for rect in self._drawn:
+                self.screen.blit(self._backdrop, rect, rect)
+            self._flip = False
+            self._restored = self._drawn
+            if changed == 'heatmap':
+                area = self.radar_rect()
+                self.screen.blit(self._backdrop, area, area)
+                self._restored = self._restored + [area]
+        self._drawn = []
+        self._updated = []
+
+    def end_frame(self):
+        """Push the frame to the window, only the changed rects unless everything changed.
+
+        Returns:
+            float: Fraction of the window that was updated.
+        """
+        if self._flip:
+            pygame.display.flip()
+            return 1.0
+        rects = self._restored + self._drawn + self._updated
+        pygame.display.update(rects)
+        window = self.screen.get_rect()
+        area = sum(r.clip(window).width * r.clip(window).height for r in rects)
+        return min(1.0, area / (self.width * self.height))
+
+    def draw_panel_lines(self, lines):
+        """Draw the info panel text, only redrawing lines that changed or were drawn over.
+
+        Args:
+            lines: (text, color, font, position) for every line in the panel.
+        """
+        previous = self._panel_lines
+        current = []
+        for i, (text, color, font, position) in enumerate(lines):
+            old = previous[i] if i < len(previous) else None
+            if old is not None and old[:4] == (text, color, font, position) \
+                    and old[4].collidelist(self._restored) == -1:
+                current.append(old)
+                continue
+            if old is not None:
+                self.screen.blit(self._backdrop, old[4], old[4])
+                self._updated.append(old[4])
+            rect = text_cache.draw(self.screen, font, text, color, position)
+            self._updated.append(rect)
+            current.append((text, color, font, position, rect))
+        # Erase lines the panel no longer has
+        for old in previous[len(lines):]:
+            self.screen.blit(self._backdrop, old[4], old[4])
+            self._updated.append(old[4])
+        self._panel_lines = current
     
     def draw_sweep(self):
         """Draw rotating sweep line"""
@@ -199,12 +633,35 @@ class RadarDisplay:
                         pygame.draw.line(self.screen, color, 
                                        (self.center_x, self.center_y), 
                                        (alpha_end_x, alpha_end_y), max(1, 3-i))
-        
-        # Update sweep angle
-        self.sweep_angle += self.sweep_speed
+                        self._drawn.extend(line_rects((self.center_x, self.center_y),
+                                                      (alpha_end_x, alpha_end_y), max(1, 3-i)))
+        
+        # Update sweep angle by the time since the last frame
+        now = time.monotonic()
+        if self._sweep_time is not None:
+            self.sweep_angle += self.sweep_speed * min(now - self._sweep_time, 0.1)
+        self._sweep_time = now
         if self.sweep_angle > fov_half:
             self.sweep_angle = -fov_half
     
+    def draw_trails(self):
+        """Draw the recent path of every track, kept inside the radar area"""
+        if not self.show_trails or self.history is None:
+            return
+        scale = self.radar_radius / self.max_range
+        colors = [self.BRIGHT_GREEN, self.YELLOW, self.RED, self.WHITE]
+        self.screen.set_clip(self.radar_rect())
+        for track_id in sorted(self.history.rows):
+            points = self.history.trail(track_id)
+            if len(points) < 2:
+                continue
+            screen = np.empty(points.shape)
+            screen[:, 0] = self.center_x + points[:, 0] * scale
+            screen[:, 1] = self.center_y - points[:, 1] * scale
+            color = [c // 2 for c in colors[track_id % len(colors)]]
+            self._drawn.append(pygame.draw.lines(self.screen, color, False, screen.tolist(), 2))
+        self.screen.set_clip(None)
+
     def draw_target(self, target, target_num):
         """Draw a target with speed arrow"""
         if target.distance > self.max_range:
@@ -221,7 +678,7 @@ class RadarDisplay:
         color = colors[target_num % len(colors)]
         
         # Draw target dot
-        pygame.draw.circle(self.screen, color, (x, y), 8)
+        self._drawn.append(pygame.draw.circle(self.screen, color, (x, y), 8))
         pygame.draw.circle(self.screen, self.WHITE, (x, y), 8, 2)
         
         # Draw speed arrow (speed is radial - toward or away from sensor)
@@ -242,7 +699,7 @@ class RadarDisplay:
                 arrow_color = self.GREEN
             
             # Draw arrow line
-            pygame.draw.line(self.screen, arrow_color, (x, y), (arrow_end_x, arrow_end_y), 3)
+            self._drawn.append(pygame.draw.line(self.screen, arrow_color, (x, y), (arrow_end_x, arrow_end_y), 3))
             
             # Draw arrow head
             arrow_angle = math.atan2(arrow_end_y - y, arrow_end_x - x)
@@ -252,31 +709,25 @@ class RadarDisplay:
             head2_x = arrow_end_x - head_length * math.cos(arrow_angle + 0.5)
             head2_y = arrow_end_y - head_length * math.sin(arrow_angle + 0.5)
             
-            pygame.draw.polygon(self.screen, arrow_color, 
-                              [(arrow_end_x, arrow_end_y), (head1_x, head1_y), (head2_x, head2_y)])
+            self._drawn.append(pygame.draw.polygon(self.screen, arrow_color, 
+                              [(arrow_end_x, arrow_end_y), (head1_x, head1_y), (head2_x, head2_y)]))
         
         # Target label
         label_text = f"T{target_num+1}"
-        label = self.small_font.render(label_text, True, color)
-        self.screen.blit(label, (x + 12, y - 12))
+        label = text_cache.render(self.small_font, label_text, color)
+        self._drawn.append(self.screen.blit(label, (x + 12, y - 12)))
     
-    def draw_info_panel(self, targets):
-        """Draw information panel"""
+    def draw_info_panel(self, targets, stats=None):
+        """Draw information panel; the box and legend are part of the background"""
         panel_x = 10
         panel_y = 10
-        
-        # Draw panel background
-        panel_rect = pygame.Rect(5, 5, self.info_panel_width - 10, self.height - 10)
-        pygame.draw.rect(self.screen, (20, 20, 20), panel_rect)
-        pygame.draw.rect(self.screen, self.DARK_GREEN, panel_rect, 2)
+        lines = []
         
         # Title
-        title = self.font.render("mmWave Radar", True, self.WHITE)
-        self.screen.blit(title, (panel_x, panel_y))
+        lines.append(("mmWave Radar", self.WHITE, self.font, (panel_x, panel_y)))
         
         # Range info
-        range_text = self.small_font.render(f"Max Range: {self.max_range/1000:.1f}m", True, self.GRAY)
-        self.screen.blit(range_text, (panel_x, panel_y + 30))
+        lines.append((f"Max Range: {self.max_range/1000:.1f}m", self.GRAY, self.small_font, (panel_x, panel_y + 30)))
         
         # Target info
         y_offset = 60
@@ -295,45 +746,51 @@ class RadarDisplay:
                 
                 for j, line in enumerate(info_lines):
                     text_color = color if j == 0 else self.WHITE
-                    text = self.small_font.render(line, True, text_color)
-                    self.screen.blit(text, (panel_x, panel_y + y_offset + j * 18))
+                    lines.append((line, text_color, self.small_font, (panel_x, panel_y + y_offset + j * 18)))
                 
                 y_offset += 120
         
         if active_targets == 0:
-            no_targets = self.small_font.render("No targets detected", True, self.GRAY)
-            self.screen.blit(no_targets, (panel_x, panel_y + y_offset))
-        
-        # Legend
-        legend_y = self.height - 140
-        legend_title = self.small_font.render("Speed Legend:", True, self.WHITE)
-        self.screen.blit(legend_title, (panel_x, legend_y))
-        
-        # Speed arrow legend
-        pygame.draw.line(self.screen, self.RED, (panel_x, legend_y + 25), (panel_x + 30, legend_y + 25), 3)
-        pygame.draw.polygon(self.screen, self.RED, [(panel_x + 30, legend_y + 25), 
-                                                   (panel_x + 25, legend_y + 20), 
-                                                   (panel_x + 25, legend_y + 30)])
-        away_text = self.small_font.render("Moving Away", True, self.WHITE)
-        self.screen.blit(away_text, (panel_x + 40, legend_y + 20))
-        
-        pygame.draw.line(self.screen, self.GREEN, (panel_x, legend_y + 45), (panel_x + 30, legend_y + 45), 3)
-        pygame.draw.polygon(self.screen, self.GREEN, [(panel_x, legend_y + 45), 
-                                                     (panel_x + 5, legend_y + 40), 
-                                                     (panel_x + 5, legend_y + 50)])
-        toward_text = self.small_font.render("Moving Toward", True, self.WHITE)
-        self.screen.blit(toward_text, (panel_x + 40, legend_y + 40))
+            lines.append(("No targets detected", self.GRAY, self.small_font, (panel_x, panel_y + y_offset)))
+
+        # Frame time stats, above the legend
+        if stats is not None:
+            for j, line in enumerate(stats.lines()):
+                lines.append((line, self.GRAY, self.small_font, (panel_x, self.height - 185 + j * 18)))
+
+        self.draw_panel_lines(lines)
 
 def main():
-    # Initialize radar
-    radar = RD03D()
+    parser = argparse.ArgumentParser(description='mmWave radar display')
+    add_replay_arguments(parser)
+    parser.add_argument('--full-redraw', action='store_true',
+                        help='flip the whole window every frame, to compare frame times')
+    parser.add_argument('--fps', type=int, default=60, help='display frame rate')
+    parser.add_argument('--trails', action='store_true', help='draw where each person has been (T toggles)')
+    parser.add_argument('--heatmap', action='store_true', help='show an occupancy heatmap (H toggles)')
+    parser.add_argument('--trail-seconds', type=float, default=TRAIL_SECONDS, help='length of the trails')
+    args = parser.parse_args()
+
+    # Initialize radar, frames are read and decoded on a background thread and
+    # the render loop only picks up the newest one, so serial reads never stall a frame
+    radar = open_radar(args.replay, args.speed, threaded=True)
     radar.set_multi_mode(True)
     
     # Initialize display with larger window to test scaling
     display = RadarDisplay(1200, 800)  # Larger window
     display.set_max_range(7)  # Set to 7 meters
+    display.full_redraw = args.full_redraw
     
     clock = pygame.time.Clock()
+    stats = FrameStats()
+    interpolator = TargetInterpolator()
+
+    # Track people for trails and the heatmap, in fixed-size buffers
+    tracker = MultiTargetTracker()
+    display.history = TrackHistory(args.trail_seconds, tracker.max_tracks)
+    display.heatmap = OccupancyHeatmap(display.fov_angle)
+    display.show_trails = args.trails
+    display.show_heatmap = args.heatmap
     
     print("Radar visualization started. Close window to exit.")
     print(f"Max range: {display.max_range/1000}m")
@@ -346,25 +803,37 @@ def main():
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+                    display.show_trails = not display.show_trails
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                    display.show_heatmap = not display.show_heatmap
             
-            # Update radar data
-            radar.update()
-            targets = [radar.get_target(1), radar.get_target(2), radar.get_target(3)]
+            # Newest radar frame, without waiting, and targets between frames
+            frame = radar.latest()
+            if interpolator.update(frame):
+                tracker.update(frame.targets, frame.timestamp)
+                display.history.add(tracker.tracks(0.0), frame.timestamp)
+                people = tracker.tracks()
+                display.heatmap.add([t.x for t in people], [t.y for t in people], frame.timestamp)
+            targets = interpolator.targets()
             
-            # Draw everything
-            display.draw_radar_background()
+            # Draw everything, erasing only what the last frame drew
+            started = time.perf_counter()
+            display.begin_frame()
             display.draw_sweep()
+            display.draw_trails()
             
             # Draw targets
             for i, target in enumerate(targets):
                 if target:
                     display.draw_target(target, i)
             
-            display.draw_info_panel(targets)
+            display.draw_info_panel(targets, stats)
             
-            # Update display
-            pygame.display.flip()
-            clock.tick(30)  # 30 FPS
+            # Update display, only the changed rects
+            dirty = display.end_frame()
+            stats.add(time.perf_counter() - started, dirty)
+            clock.tick(args.fps)
     
     except KeyboardInterrupt:
         pass
@@ -1,41 +1,213 @@
+import asyncio
+import os
+import queue
 import serial
+import struct
+import threading
 import time
 import math
+from collections import deque, namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for batch decoding of recorded captures
+    np = None
 
 class Target:
+    __slots__ = ('x', 'y', 'speed', 'pixel_distance', '_distance', '_angle')
+
     def __init__(self, x, y, speed, pixel_distance):
         self.x = x                  # mm
         self.y = y                  # mm
         self.speed = speed          # cm/s
         self.pixel_distance = pixel_distance  # mm
-        self.distance = math.sqrt(x**2 + y**2)
-        self.angle = math.degrees(math.atan2(x, y))
+        self._distance = None       # computed on first access
+        self._angle = None
+
+    @property
+    def distance(self):
+        """Distance from the sensor in mm"""
+        if self._distance is None:
+            self._distance = math.sqrt(self.x**2 + self.y**2)
+        return self._distance
+
+    @property
+    def angle(self):
+        """Angle from straight ahead in degrees, positive is right"""
+        if self._angle is None:
+            self._angle = math.degrees(math.atan2(self.x, self.y))
+        return self._angle
     
     def __str__(self):
         return ('Target(x={}mm, y={}mm, speed={}cm/s, pixel_dist={}mm, '
                 'distance={:.1f}mm, angle={:.1f}°)').format(
                 self.x, self.y, self.speed, self.pixel_distance, self.distance, self.angle)
 
+# Columns produced by decode_frames(), one row per frame and one column per target slot
+TARGET_DTYPE = [
+    ('x', 'i4'),                # mm
+    ('y', 'i4'),                # mm
+    ('speed', 'i4'),            # cm/s
+    ('pixel_distance', 'u2'),   # mm
+    ('distance', 'f8'),         # mm
+    ('angle', 'f8'),            # degrees
+]
+
+def _layout(buffer, chunks):
+    """The buffer as a uint8 array, the data length, and its pieces as
+    (buffer offsets, lengths, data offsets) arrays or None if it is contiguous"""
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    if chunks is None:
+        return raw, len(raw), None
+    offsets, lengths = (np.asarray(column, dtype=np.intp) for column in chunks)
+    data_starts = np.cumsum(lengths) - lengths
+    return raw, int(lengths.sum()), (offsets, lengths, data_starts)
+
+def _locate(positions, pieces):
+    """Buffer offsets of data offsets"""
+    if pieces is None:
+        return positions
+    offsets, _, data_starts = pieces
+    piece = np.searchsorted(data_starts, positions, side='right') - 1
+    return positions + offsets[piece] - data_starts[piece]
+
+def _header_candidates(raw, size, pieces):
+    """Data offsets of every byte that could start a frame"""
+    limit = size - RD03D.FRAME_LENGTH + 1
+    if pieces is None:
+        return np.flatnonzero(raw[:limit] == RD03D.FRAME_HEADER[0])
+    offsets, lengths, data_starts = pieces
+    found = np.flatnonzero(raw == RD03D.FRAME_HEADER[0])
+    # Keep the matches inside a piece, not in the bytes between them
+    piece = np.searchsorted(offsets, found, side='right') - 1
+    found, piece = found[piece >= 0], piece[piece >= 0]
+    inside = found < offsets[piece] + lengths[piece]
+    starts = found[inside] - offsets[piece[inside]] + data_starts[piece[inside]]
+    return starts[starts < limit]
+
+def find_frames(buffer, chunks=None):
+    """Find the start offsets of all complete frames in a bytes-like blob.
+
+    Frames are matched on the full header and the tail at the fixed frame
+    length, and scanned front to back without overlap, like the reader does.
+
+    Args:
+        buffer: bytes, bytearray, memoryview or mmap of raw UART data.
+        chunks: (offsets, lengths) if the data is stored in pieces within
+            buffer, like the records of a capture file. The bytes between
+            the pieces are skipped, and the pieces are read in place.
+
+    Returns:
+        numpy.ndarray: Frame start offsets in ascending order, in the data
+        with the gaps between chunks left out.
+    """
+    if np is None:
+        raise RuntimeError('find_frames requires numpy')
+    raw, size, pieces = _layout(buffer, chunks)
+    length = RD03D.FRAME_LENGTH
+    if size < length:
+        return np.empty(0, dtype=np.intp)
+
+    # Candidate headers, then check the remaining delimiter bytes on those only
+    starts = _header_candidates(raw, size, pieces)
+    for offset, value in enumerate(RD03D.FRAME_HEADER[1:], 1):
+        starts = starts[raw[_locate(starts + offset, pieces)] == value]
+    for offset, value in enumerate(RD03D.FRAME_TAIL, length - len(RD03D.FRAME_TAIL)):
+        starts = starts[raw[_locate(starts + offset, pieces)] == value]
+
+    # A frame inside the payload of an earlier one is rare, drop it the way a scan would
+    if len(starts) > 1 and (np.diff(starts) < length).any():
+        keep = []
+        next_free = 0
+        for start in starts.tolist():
+            if start >= next_free:
+                keep.append(start)
+                next_free = start + length
+        starts = np.array(keep, dtype=np.intp)
+    return starts
+
+def decode_frames(buffer, chunks=None):
+    """Decode every frame in a recorded capture at once.
+
+    Gives the same values as RD03D._decode_frame, frame by frame, with
+    distance and angle already computed (angle to within float rounding).
+
+    Args:
+        buffer: bytes, bytearray, memoryview or mmap of raw UART data.
+        chunks: (offsets, lengths) of the pieces of data in buffer, see find_frames().
+
+    Returns:
+        numpy.ndarray: Structured array of TARGET_DTYPE with shape (frames, 3).
+    """
+    starts = find_frames(buffer, chunks)
+    raw, _, pieces = _layout(buffer, chunks)
+
+    # Gather the 24 target bytes of every frame as little-endian uint16 fields
+    payload = raw[_locate(starts[:, None] + np.arange(4, 4 + RD03D.TARGETS_STRUCT.size), pieces)]
+    fields = payload.view('<u2').reshape(len(starts), 3, 4)
+
+    # Sign-magnitude, with the sign bit set for positive values
+    magnitude = (fields[..., :3] & 0x7FFF).astype(np.int32)
+    signed = np.where(fields[..., :3] & 0x8000, magnitude, -magnitude)
+
+    result = np.empty((len(starts), 3), dtype=TARGET_DTYPE)
+    result['x'] = signed[..., 0]
+    result['y'] = signed[..., 1]
+    result['speed'] = signed[..., 2]
+    result['pixel_distance'] = fields[..., 3]
+    x = result['x'].astype(np.float64)
+    y = result['y'].astype(np.float64)
+    result['distance'] = np.sqrt(x * x + y * y)
+    result['angle'] = np.degrees(np.arctan2(x, y))
+    return result
+
+# A decoded frame as published by the background reader. timestamp is the
+# time.monotonic() of the UART read that completed it, decoded when it was decoded.
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'targets', 'decoded'], defaults=(None,))
+
 class RD03D:
     SINGLE_TARGET_CMD = bytes([0xFD, 0xFC, 0xFB, 0xFA, 0x02, 0x00, 0x80, 0x00, 0x04, 0x03, 0x02, 0x01])
     MULTI_TARGET_CMD  = bytes([0xFD, 0xFC, 0xFB, 0xFA, 0x02, 0x00, 0x90, 0x00, 0x04, 0x03, 0x02, 0x01])
+    FRAME_HEADER = bytes([0xAA, 0xFF, 0x03, 0x00])
+    FRAME_TAIL = bytes([0x55, 0xCC])
+    FRAME_LENGTH = 30  # header + 3 targets * 8 bytes + tail
+    TARGETS_STRUCT = struct.Struct('<' + 'hhhH' * 3)  # x, y, speed, pixel_distance per target
+    BUFFER_SIZE = 512  # ~17 frames, the UART is read in chunks of at most this
     
-    def __init__(self, uart_port='/dev/ttyS0', baudrate=256000, multi_mode=True):
-        self.uart = serial.Serial(uart_port, baudrate, timeout=0.1)
+    def __init__(self, uart_port='/dev/ttyS0', baudrate=256000, multi_mode=True, threaded=False,
+                 uart=None):
+        if uart is None:
+            uart = serial.Serial(uart_port, baudrate, timeout=0.1)
+            time.sleep(0.2)
+        self.uart = uart  # serial.Serial, or anything with the same read interface
+        self.capture = None  # Optional radar_capture.CaptureWriter for raw UART data
         self.targets = []  # Stores up to 3 targets
-        self.buffer = b''  # Buffer to handle split messages
-        time.sleep(0.2)
+        self.buffer = bytearray(self.BUFFER_SIZE)  # Preallocated, handles split messages
+        self._view = memoryview(self.buffer)
+        self._fill = 0  # Number of valid bytes at the start of the buffer
+        self._reader = None  # Background reader thread, see start_reader()
+        self._reader_running = False
+        self._latest = None  # Mailbox: the newest Frame, replaced whole by the reader
+        self._subscribers = []  # Queues the reader also puts every Frame into, see subscribe()
+        self._seen_seq = 0  # Sequence number of the last frame update() returned
+        self.frames_decoded = 0
+        self.frames_dropped = 0  # Frames a slow frames() consumer never saw
         self.set_multi_mode(multi_mode)
+        if threaded:
+            self.start_reader()
     
     def set_multi_mode(self, multi_mode=True):
         """Set Radar mode: True=Multi-target, False=Single-target"""
+        restart = self.stop_reader()
         cmd = self.MULTI_TARGET_CMD if multi_mode else self.SINGLE_TARGET_CMD
         self.uart.write(cmd)
         self.uart.flush()  # Force immediate send
         time.sleep(0.2)
         self.uart.reset_input_buffer()  # Clear buffer after switching
-        self.buffer = b''  # Clear internal buffer too
+        self._fill = 0  # Clear internal buffer too
         self.multi_mode = multi_mode
+        if restart:
+            self.start_reader()
     
     @staticmethod
     def parse_signed16(high, low):
@@ -48,75 +220,241 @@ class RD03D:
         targets = []
         if len(data) < 30 or data[0] != 0xAA or data[1] != 0xFF or data[-2] != 0x55 or data[-1] != 0xCC:
             return targets  # invalid frame
-        
-        for i in range(3):
-            base = 4 + i*8
-            x = self.parse_signed16(data[base+1], data[base])
-            y = self.parse_signed16(data[base+3], data[base+2])
-            speed = self.parse_signed16(data[base+5], data[base+4])
-            pixel_dist = data[base+6] + (data[base+7] << 8)
-            targets.append(Target(x, y, speed, pixel_dist))
-        
-        return targets
+
+        x0, y0, s0, p0, x1, y1, s1, p1, x2, y2, s2, p2 = self.TARGETS_STRUCT.unpack_from(data, 4)
+
+        # Fields are sign-magnitude with the sign bit set for positive values
+        # (see parse_signed16). Read as int16 a set sign bit gives raw - 0x10000,
+        # so the value is v + 0x8000 for negative v and -v otherwise.
+        return [
+            Target(x0 + 0x8000 if x0 < 0 else -x0, y0 + 0x8000 if y0 < 0 else -y0,
+                   s0 + 0x8000 if s0 < 0 else -s0, p0),
+            Target(x1 + 0x8000 if x1 < 0 else -x1, y1 + 0x8000 if y1 < 0 else -y1,
+                   s1 + 0x8000 if s1 < 0 else -s1, p1),
+            Target(x2 + 0x8000 if x2 < 0 else -x2, y2 + 0x8000 if y2 < 0 else -y2,
+                   s2 + 0x8000 if s2 < 0 else -s2, p2),
+        ]
     
-    def _find_complete_frame(self, data):
-        """Find a complete frame in the data buffer"""
-        # Look for frame start (0xAA 0xFF)
-        start_idx = -1
-        for i in range(len(data) - 1):
-            if data[i] == 0xAA and data[i+1] == 0xFF:
-                start_idx = i
+    def _find_latest_frame(self, data, limit):
+        """Find the most recent complete frame in data[:limit].
+
+        Scans backwards for the frame tail with ``rfind`` and checks that a
+        frame header sits exactly FRAME_LENGTH bytes earlier, so a tail byte
+        pair inside a target payload is never mistaken for a frame boundary.
+
+        Returns:
+            (start, end): Offsets of the latest frame, or (-1, -1) if none.
+        """
+        end = data.rfind(self.FRAME_TAIL, 0, limit)
+        while end != -1:
+            start = end + len(self.FRAME_TAIL) - self.FRAME_LENGTH
+            if start < 0:
                 break
-        
-        if start_idx == -1:
-            return None, data  # No frame start found, keep all data
-        
-        # Look for frame end (0x55 0xCC) after the start
-        for i in range(start_idx + 2, len(data) - 1):
-            if data[i] == 0x55 and data[i+1] == 0xCC:
-                # Found complete frame
-                frame = data[start_idx:i+2]
-                remaining = data[i+2:]
-                return frame, remaining
-        
-        # Frame start found but no end yet, keep data from start
-        return None, data[start_idx:]
-    
+            if data.startswith(self.FRAME_HEADER, start):
+                return start, end + len(self.FRAME_TAIL)
+            end = data.rfind(self.FRAME_TAIL, 0, end + 1)
+        return -1, -1
+
+    def _find_next_frame(self, data, pos, limit):
+        """Find the first complete frame in data[pos:limit].
+
+        Returns:
+            The frame start offset, or -1 if there is no complete frame.
+        """
+        start = data.find(self.FRAME_HEADER, pos, limit)
+        while start != -1 and start + self.FRAME_LENGTH <= limit:
+            if data.startswith(self.FRAME_TAIL, start + self.FRAME_LENGTH - len(self.FRAME_TAIL)):
+                return start
+            start = data.find(self.FRAME_HEADER, start + 1, limit)
+        return -1
+
+    def _discard(self, count):
+        """Drop the first count bytes of the buffer, moving the rest to the front"""
+        if count <= 0:
+            return
+        remaining = self._fill - count
+        if remaining > 0:
+            self.buffer[:remaining] = self._view[count:self._fill]
+        self._fill = max(0, remaining)
+
     def update(self):
         """Update internal targets list with latest data from radar."""
-        # Read all available data and add to buffer
-        if self.uart.in_waiting > 0:
-            new_data = self.uart.read(self.uart.in_waiting)
-            self.buffer += new_data
-        
-        # If buffer gets too large, keep only the most recent data
-        if len(self.buffer) > 300:  # ~10 frames worth
-            self.buffer = self.buffer[-150:]  # Keep last ~5 frames
-        
-        # Try to extract the MOST RECENT complete frame
-        latest_frame = None
-        temp_buffer = self.buffer
-        
-        while True:
-            frame, temp_buffer = self._find_complete_frame(temp_buffer)
-            if frame:
-                latest_frame = frame  # Keep updating to get the latest
+        if self._reader is not None:
+            frame = self._latest
+            if frame is None or frame.seq == self._seen_seq:
+                return False
+            self._seen_seq = frame.seq
+            self.targets = frame.targets
+            return True
+
+        updated = False
+        waiting = self.uart.in_waiting
+        while waiting > 0:
+            # Read straight into the free end of the buffer
+            free = len(self.buffer) - self._fill
+            count = self.uart.readinto(self._view[self._fill:self._fill + min(waiting, free)])
+            if not count:
+                break
+            self._received(count)
+            waiting -= count
+
+            # Extract the MOST RECENT complete frame in a single pass
+            start, end = self._find_latest_frame(self.buffer, self._fill)
+            if start != -1:
+                decoded = self._decode_frame(self._view[start:end])
+                if decoded:
+                    self.targets = decoded
+                    updated = True
+                self._discard(end)
             else:
+                self._discard_to_partial_frame()
+
+        return updated
+
+    def _received(self, count):
+        """Account for count bytes just stored at the free end of the buffer"""
+        if self.capture is not None:
+            self.capture.write(self._view[self._fill:self._fill + count])
+        self._fill += count
+
+    def _discard_to_partial_frame(self):
+        """No complete frame left, drop anything before the last frame start"""
+        start = self.buffer.rfind(self.FRAME_HEADER, 0, self._fill)
+        if start == -1 or self._fill - start >= self.FRAME_LENGTH:
+            # Corrupted frame or line noise, keep only a possible partial frame
+            start = max(0, self._fill - self.FRAME_LENGTH + 1)
+        if start > 0:
+            self._discard(start)
+
+    def start_reader(self):
+        """Start a daemon thread that blocks on the UART and decodes every frame.
+
+        While it runs, update() no longer touches the serial port; it picks
+        up the newest frame from the reader's mailbox instead.
+        """
+        if self._reader is not None:
+            return
+        self._fill = 0
+        self._reader_running = True
+        self._reader = threading.Thread(target=self._reader_loop, name='rd03d-reader', daemon=True)
+        self._reader.start()
+
+    def stop_reader(self):
+        """Stop the background reader. Returns True if it was running."""
+        reader = self._reader
+        if reader is None:
+            return False
+        self._reader_running = False
+        reader.join()
+        self._reader = None
+        return True
+
+    def _reader_loop(self):
+        while self._reader_running:
+            # Block for at least one byte (up to the UART timeout), then take what is waiting
+            free = len(self.buffer) - self._fill
+            wanted = max(1, min(self.uart.in_waiting, free))
+            count = self.uart.readinto(self._view[self._fill:self._fill + wanted])
+            if not count:
+                continue
+            self._received(count)
+            for frame in self._drain_frames(time.monotonic()):
+                # A single reference store, readers never see a half-written frame
+                self._latest = frame
+                for frames in self._subscribers:
+                    self._publish(frames, frame)
+
+    def _publish(self, frames, frame):
+        """Put a frame into a subscriber queue, dropping its oldest frame if it is full"""
+        while True:
+            try:
+                frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    frames.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _drain_frames(self, timestamp):
+        """Decode every complete frame in the buffer, oldest first, as Frames"""
+        pos = 0
+        while True:
+            start = self._find_next_frame(self.buffer, pos, self._fill)
+            if start == -1:
                 break
-        
-        # Update buffer to remaining data after last complete frame
-        if latest_frame:
-            # Find where the latest frame ends in the original buffer
-            frame_end_pos = self.buffer.rfind(latest_frame) + len(latest_frame)
-            self.buffer = self.buffer[frame_end_pos:]
-            
-            decoded = self._decode_frame(latest_frame)
+            pos = start + self.FRAME_LENGTH
+            decoded = self._decode_frame(self._view[start:pos])
             if decoded:
-                self.targets = decoded
-                return True  # Successful update
-        
-        return False  # No valid frame found
-    
+                self.frames_decoded += 1
+                yield Frame(self.frames_decoded, timestamp, decoded, time.monotonic())
+
+        self._discard(pos)
+        self._discard_to_partial_frame()
+
+    def _feed(self, data, timestamp):
+        """Copy bytes received elsewhere into the buffer and decode them as Frames"""
+        view = memoryview(data)
+        while view:
+            count = min(len(view), len(self.buffer) - self._fill)
+            self._view[self._fill:self._fill + count] = view[:count]
+            self._received(count)
+            view = view[count:]
+            yield from self._drain_frames(timestamp)
+
+    async def frames(self, queue_depth=1, idle_timeout=None):
+        """Asynchronously iterate over decoded frames.
+
+        The serial port is read by a non-blocking asyncio transport, so this
+        can share an event loop with other services. When the consumer falls
+        behind, only the newest queue_depth frames are kept and older ones
+        are counted in frames_dropped.
+
+        Args:
+            queue_depth: Frames buffered for a slow consumer.
+            idle_timeout: If set, yield None after this many seconds without a frame.
+
+        Yields:
+            Frame(seq, timestamp, targets, decoded); targets is also stored in self.targets.
+        """
+        self.stop_reader()
+        loop = asyncio.get_running_loop()
+        protocol = _FrameProtocol(self, queue_depth)
+        # Read from a duplicate descriptor so closing the transport leaves the port open
+        pipe = os.fdopen(os.dup(self.uart.fileno()), 'rb', buffering=0)
+        transport, _ = await loop.connect_read_pipe(lambda: protocol, pipe)
+        try:
+            while True:
+                if not protocol.queue:
+                    if protocol.closed:
+                        break
+                    protocol.ready.clear()
+                    try:
+                        await asyncio.wait_for(protocol.ready.wait(), idle_timeout)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                frame = protocol.queue.popleft()
+                self.targets = frame.targets
+                yield frame
+        finally:
+            transport.close()
+
+    def latest(self):
+        """The newest Frame published by the background reader, or None"""
+        return self._latest
+
+    def subscribe(self, frames):
+        """Have the background reader put every Frame into frames, a queue.Queue.
+
+        Unlike latest(), a subscriber sees every frame as soon as it is
+        decoded. A bounded queue that fills up loses its oldest frames, so a
+        slow consumer still gets the newest ones.
+        """
+        self._subscribers.append(frames)
+        self.start_reader()
+
     def get_target(self, target_number=1):
         """Get a target by number (1-based index)."""
         if 1 <= target_number <= len(self.targets):
@@ -125,5 +463,31 @@ class RD03D:
     
     def close(self):
         """Close the UART connection"""
+        self.stop_reader()
         if self.uart.is_open:
             self.uart.close()
+
+
+class _FrameProtocol(asyncio.Protocol):
+    """Feeds bytes from a serial transport to the RD03D frame parser"""
+
+    def __init__(self, radar, queue_depth):
+        self.radar = radar
+        self.queue = deque(maxlen=queue_depth)  # Newest frames, oldest fall off the front
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def data_received(self, data):
+        for frame in self.radar._feed(data, time.monotonic()):
+            if len(self.queue) == self.queue.maxlen:
+                self.radar.frames_dropped += 1
+            self.queue.append(frame)
+        if self.queue:
+            self.ready.set()
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.ready.set()
@@ -0,0 +1,139 @@
+"""
+Radar to spotlight in one process.
+
+The RD03D reader thread puts every decoded frame into a queue, the target
+selector follows people with the tracker and hands the chosen aim point to
+the motion controller's latest-wins target slot, and the controller drives
+the struts. No HTTP is involved on the way; the Flask API of motor.py can
+run alongside as a control plane with --http.
+
+Every target carries a trace of time.monotonic() stamps from the UART read
+that completed its frame to the end of its move, and the per-stage
+latencies go to the histograms of latency.py: a summary line is logged
+every STATS_INTERVAL_SECONDS and /metrics serves them with --http.
+
+Usage:
+    python spotlight_daemon.py [--predict] [--http] [--replay FILE --speed N]
+"""
+import argparse
+import logging
+import queue
+import threading
+import time
+
+import logs
+import motor
+from latency import recorder
+from radar_capture import add_replay_arguments, open_radar
+from tracker import MultiTargetTracker
+
+FRAME_QUEUE_DEPTH = 4  # frames waiting for the selector, the oldest are dropped beyond this
+MIN_AIM_CHANGE_MM = 1.0  # don't retarget for smaller changes of either strut's extension
+STATS_INTERVAL_SECONDS = 10.0
+REPLAY_DRAIN_SECONDS = 60.0  # at the end of a replay, wait this long for the last move to finish
+
+log = logging.getLogger('daemon')
+
+
+class TargetSelector:
+    """Tracks people across frames and picks the one to light.
+
+    Sticks with the person it is following while their track stays
+    confirmed, then switches to the most confident track.
+
+    Args:
+        predict: Lead the target by its tracked velocity, see motor.predict_target().
+        min_change_mm: Skip aim points that move neither strut by more than this.
+    """
+
+    def __init__(self, predict=False, min_change_mm=MIN_AIM_CHANGE_MM):
+        self.tracker = MultiTargetTracker()
+        self.predict = predict
+        self.min_change_mm = min_change_mm
+        self.following = None  # track id
+        self._last_aim = None  # strut extensions of the last target sent
+
+    def select(self, frame):
+        """The (angle, distance_mm, velocity) to aim at for a frame, or None to stay put"""
+        self.tracker.update(frame.targets, frame.timestamp)
+        track = self.tracker.get(self.following) if self.following is not None else None
+        if track is None or track.confidence < self.tracker.confirm_confidence:
+            track = self.tracker.best()
+        if track is None:
+            self.following = None
+            return None
+        self.following = track.id
+
+        angle = max(-90.0, min(90.0, track.angle))
+        distance = max(0.0, min(8000.0, track.distance))
+        aim = motor.actuator_target(angle, distance)
+        if self._last_aim is not None and max(abs(aim[0] - self._last_aim[0]),
+                                              abs(aim[1] - self._last_aim[1])) < self.min_change_mm:
+            return None
+        self._last_aim = aim
+        velocity = (track.vx, track.vy, 0.0) if self.predict else None
+        return angle, distance, velocity
+
+
+def run(radar, selector, stop):
+    """Selector loop: frames in, targets out to the motion controller, until stop is set.
+
+    Returns:
+        bool: True if it ended because a replayed capture ran out.
+    """
+    frames = queue.Queue(maxsize=FRAME_QUEUE_DEPTH)
+    radar.subscribe(frames)
+    while not stop.is_set():
+        try:
+            frame = frames.get(timeout=0.5)
+        except queue.Empty:
+            if getattr(radar, 'finished', False):
+                return True  # end of a replayed capture
+            frame = None
+
+        if frame is not None:
+            aim = selector.select(frame)
+            if aim is not None:
+                trace = {'read': frame.timestamp, 'decoded': frame.decoded, 'selected': time.monotonic()}
+                motor.motion.submit_target(*aim, trace=trace)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Follow people with the spotlight')
+    add_replay_arguments(parser)
+    parser.add_argument('--predict', action='store_true',
+                        help='aim where the target will be when the struts get there')
+    parser.add_argument('--http', action='store_true', help='also serve the motor.py HTTP API')
+    parser.add_argument('--port', type=int, default=5000, help='port for --http')
+    args = parser.parse_args()
+
+    logs.setup()
+    motor.init()  # hold the pins until shutdown
+    motor.motion.start()
+    if args.http:
+        threading.Thread(target=motor.app.run, kwargs={'host': '0.0.0.0', 'port': args.port},
+                         name='http', daemon=True).start()
+
+    radar = open_radar(args.replay, args.speed, threaded=True)
+    radar.set_multi_mode(True)
+    selector = TargetSelector(predict=args.predict)
+    recorder.start_reporting(STATS_INTERVAL_SECONDS)
+    stop = threading.Event()
+    replayed = False
+    try:
+        replayed = run(radar, selector, stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Let the last frames' move finish so its trace is complete, Ctrl-C stops at once
+        if replayed and not motor.motion.wait_idle(REPLAY_DRAIN_SECONDS):
+            log.warning('last move still running, stopping it', extra={'waited_seconds': REPLAY_DRAIN_SECONDS})
+        motor.motion.stop('shutdown', timeout=1)
+        radar.close()
+        motor.gpio.close()
+        log.info(recorder.summary())
+
+
+if __name__ == "__main__":
+    main()
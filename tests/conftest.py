@@ -0,0 +1,12 @@
+"""
+Shared setup for the tests: the modules live at the top of the repository,
+and the struts are driven by the fake GPIO backend so no hardware is needed.
+
+Run from the repository root with:
+    python -m pytest tests
+"""
+import os
+import sys
+
+os.environ.setdefault('GPIO_BACKEND', 'fake')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
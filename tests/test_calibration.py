@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from calibration import Calibration, SpeedCurve, append_log, fit, fit_curve, read_log
+
+CURVES = [
+    SpeedCurve(1, 13.0),
+    SpeedCurve(1, 12.0, lag_seconds=0.15, load=-0.02),
+    SpeedCurve(-1, 14.0, lag_seconds=0.1, load=0.03),
+]
+
+
+@pytest.mark.parametrize('curve', CURVES)
+@pytest.mark.parametrize('mm', [0.5, 5.0, 40.0, 110.0])
+@pytest.mark.parametrize('position_mm', [0.0, 60.0, 120.0])
+def test_duration_and_distance_invert_each_other(curve, mm, position_mm):
+    seconds = curve.duration(mm, position_mm)
+    assert curve.distance(seconds, position_mm) == pytest.approx(mm, rel=1e-9)
+
+
+def test_no_movement_within_the_lag():
+    curve = SpeedCurve(1, 12.0, lag_seconds=0.2)
+    assert curve.distance(0.2, 0.0) == 0.0
+    assert curve.duration(0.0, 0.0) == 0.0
+
+
+def test_signs_follow_the_direction():
+    calibration = Calibration([{1: SpeedCurve(1, 10.0), -1: SpeedCurve(-1, 20.0)}])
+    assert calibration.duration(0, 10.0, 50.0) == pytest.approx(1.0)
+    assert calibration.duration(0, -10.0, 50.0) == pytest.approx(-0.5)
+    assert calibration.distance(0, -0.5, 50.0) == pytest.approx(-10.0)
+
+
+def measured_moves(curve, count, seed=1, noise=0.0):
+    """Moves of strut 0 as /calibrate would log them, if the strut followed curve"""
+    rng = random.Random(seed)
+    moves = []
+    for _ in range(count):
+        start_mm = rng.uniform(10, 110)
+        seconds = rng.uniform(0.5, 4.0)
+        moved = curve.distance(seconds, start_mm) * (1 + rng.gauss(0, noise))
+        moves.append({'strut': 0, 'seconds': seconds * curve.direction, 'start_mm': start_mm,
+                      'moved_mm': moved * curve.direction})
+    return moves
+
+
+@pytest.mark.parametrize('curve', CURVES)
+def test_fit_recovers_the_curve(curve):
+    default = SpeedCurve(curve.direction, 1.0)
+    fitted = fit_curve(curve.direction, measured_moves(curve, 30), default)
+    assert fitted.mm_per_second == pytest.approx(curve.mm_per_second, rel=1e-3)
+    assert fitted.lag_seconds == pytest.approx(curve.lag_seconds, abs=1e-3)
+    assert fitted.load == pytest.approx(curve.load, abs=1e-4)
+    assert fitted.samples == 30
+
+
+def test_fit_error_follows_the_noise():
+    curve = CURVES[1]
+    fitted = fit_curve(1, measured_moves(curve, 200, noise=0.05), SpeedCurve(1, 1.0))
+    assert fitted.error_fraction == pytest.approx(0.05, rel=0.3)
+
+
+def test_fit_without_moves_keeps_the_default():
+    default = SpeedCurve(1, 13.0)
+    assert fit_curve(1, [], default) is default
+
+
+def test_logged_moves_round_trip_through_a_calibration_file(tmp_path):
+    log_path, calibration_path = tmp_path / 'moves.jsonl', tmp_path / 'calibration.json'
+    extend, retract = CURVES[1], CURVES[2]
+    for move in measured_moves(extend, 20) + measured_moves(retract, 20, seed=2):
+        append_log(log_path, move['strut'], move['seconds'], move['start_mm'], move['moved_mm'])
+
+    default = Calibration.default((0.0769, 0.0769))
+    fit(read_log(log_path), default).save(calibration_path)
+    loaded = Calibration.load(calibration_path, (0.0769, 0.0769))
+
+    for seconds in (1.0, -1.0, 3.0, -3.0):
+        expected = (extend if seconds > 0 else retract).distance(seconds, 60.0)
+        assert abs(loaded.distance(0, seconds, 60.0)) == pytest.approx(expected, rel=1e-3)
+    # No moves of strut 1, it keeps the defaults
+    assert loaded.curve(1, 1).mm_per_second == pytest.approx(1 / 0.0769)
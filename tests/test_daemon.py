@@ -0,0 +1,24 @@
+import threading
+
+import motor
+import spotlight_daemon
+from bench_rd03d import make_frame
+from radar_capture import CaptureWriter, RD03DReplay
+
+
+def test_run_reports_the_end_of_a_replay(tmp_path, monkeypatch):
+    path = tmp_path / 'walk.cap'
+    with CaptureWriter(path) as writer:
+        for i in range(20):
+            frame = make_frame([(100 * i, 2000, 0, 0), (0, 0, 0, 0), (0, 0, 0, 0)])
+            writer.write(frame, writer.started + i * 0.01)
+    submitted = []
+    monkeypatch.setattr(motor.motion, 'submit_target', lambda *aim, trace=None: submitted.append(trace))
+
+    radar = RD03DReplay(path, speed=0)  # subscribe() starts the reader
+    try:
+        assert spotlight_daemon.run(radar, spotlight_daemon.TargetSelector(), threading.Event())
+    finally:
+        radar.close()
+    assert submitted
+    assert all(trace['read'] <= trace['decoded'] <= trace['selected'] for trace in submitted)
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from latency import EXPORT_BUCKETS, Histogram, LatencyRecorder
+
+PRECISION = 2 ** (1 - 7)  # relative bucket width with the default precision_bits
+
+
+def exact_percentile(values, fraction):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+@pytest.mark.parametrize('fraction', [0.0, 0.01, 0.5, 0.9, 0.99, 0.999, 1.0])
+def test_percentiles_are_within_bucket_precision(fraction):
+    rng = random.Random(4)
+    values = [rng.lognormvariate(-5, 1.5) for _ in range(20000)]  # ~7ms median, long tail
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    exact = exact_percentile(values, fraction)
+    # Reported as the bucket's upper bound: never below, at most one bucket above
+    assert histogram.percentile(fraction) >= int(exact * 1e6) / 1e6
+    assert histogram.percentile(fraction) <= exact * (1 + PRECISION) + 1e-6
+
+
+def test_percentile_never_exceeds_the_maximum():
+    histogram = Histogram()
+    for value in (0.0123, 0.0124, 0.0125):
+        histogram.record(value)
+    assert histogram.percentile(1.0) == 0.0125
+    assert histogram.max == 0.0125
+
+
+def test_small_values_are_exact_to_the_microsecond():
+    histogram = Histogram()
+    for micros in range(100):
+        histogram.record(micros / 1e6)
+    assert histogram.percentile(0.5) == pytest.approx(49e-6)
+
+
+def test_out_of_range_values_are_clamped():
+    histogram = Histogram(highest_seconds=1.0)
+    histogram.record(-1.0)
+    histogram.record(50.0)
+    assert histogram.count == 2
+    assert histogram.percentile(0.0) == 0.0
+    assert histogram.percentile(1.0) <= 1.0 * (1 + PRECISION)
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    assert histogram.cumulative(EXPORT_BUCKETS) == [0] * len(EXPORT_BUCKETS)
+
+
+def test_cumulative_counts_are_monotonic_and_complete():
+    histogram = Histogram()
+    for value in (0.00005, 0.002, 0.002, 0.3, 75.0):
+        histogram.record(value)
+    counts = histogram.cumulative(EXPORT_BUCKETS)
+    assert counts == sorted(counts)
+    assert counts[EXPORT_BUCKETS.index(0.0001)] == 1
+    assert counts[EXPORT_BUCKETS.index(0.0025)] == 3
+    assert counts[-1] == 4  # 75s is only in +Inf
+
+
+def test_trace_stages_and_outcomes():
+    recorder = LatencyRecorder()
+    recorder.record_trace({'read': 0.0, 'decoded': 0.001, 'selected': 0.002, 'accepted': 0.003,
+                           'started': 0.004, 'gpio': 0.005, 'finished': 1.0})
+    recorder.record_trace({'read': 0.0, 'decoded': 0.001, 'dropped': True})
+    assert recorder.outcomes == {'moved': 1, 'dropped': 1, 'still': 0}
+    assert recorder.histograms['total'].count == 1
+    assert recorder.histograms['decode'].count == 1  # not from the dropped trace
+    assert recorder.histograms['http'].count == 0
+    text = recorder.prometheus()
+    assert 'spotlight_stage_latency_seconds_count{stage="total"} 1' in text
+    assert 'spotlight_targets_total{outcome="dropped"} 1' in text
@@ -0,0 +1,104 @@
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+import logs
+
+
+def record(msg='frame', level=logging.INFO, name='radar'):
+    return logging.LogRecord(name, level, __file__, 1, msg, (), None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable time.monotonic() for the sampling windows"""
+    now = [1000.0]
+    monkeypatch.setattr(logs.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_sampling_suppresses_and_counts(clock):
+    sampler = logs.SampleFilter(per_second=3)
+    records = [record() for _ in range(8)]
+    assert [sampler.filter(r) for r in records] == [True] * 3 + [False] * 5
+    assert not any(hasattr(r, 'suppressed') for r in records)
+
+    clock[0] += 1.0  # next window
+    first = record()
+    assert sampler.filter(first)
+    assert first.suppressed == 5
+    second = record()
+    assert sampler.filter(second)
+    assert not hasattr(second, 'suppressed')
+
+
+def test_sampling_is_per_logger_and_message(clock):
+    sampler = logs.SampleFilter(per_second=1)
+    assert sampler.filter(record('frame'))
+    assert not sampler.filter(record('frame'))
+    assert sampler.filter(record('target'))
+    assert sampler.filter(record('frame', name='motor'))
+
+
+def test_warnings_are_never_sampled(clock):
+    sampler = logs.SampleFilter(per_second=1)
+    assert all(sampler.filter(record(level=logging.WARNING)) for _ in range(10))
+
+
+def test_full_queue_drops_and_counts():
+    handler = logs.AsyncHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_json_lines_carry_the_extra_fields():
+    entry = record('move struts')
+    entry.seconds = (1.5, 0.0)
+    line = logs.JsonFormatter().format(entry)
+    assert '"msg":"move struts"' in line
+    assert '"seconds":[1.5,0.0]' in line
+
+
+class StuckHandler(logging.Handler):
+    """Blocks in emit() until released, like a writer on a hung disk"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+
+    def emit(self, record):
+        self.unblock.wait(5)
+
+
+def test_stop_does_not_block_on_a_stuck_writer():
+    handler = StuckHandler()
+    records = queue.Queue(2)
+    listener = logs.AsyncListener(records, handler)
+    listener.start()
+    records.put(record())  # the writer takes this one and hangs
+    time.sleep(0.05)
+    records.put(record())
+    records.put(record())  # queue now full
+
+    started = time.monotonic()
+    listener.stop(timeout=0.2)
+    assert time.monotonic() - started < 0.5
+    handler.unblock.set()
+
+
+def test_stop_writes_what_is_queued():
+    written = []
+    handler = logging.Handler()
+    handler.emit = written.append
+    records = queue.Queue(10)
+    listener = logs.AsyncListener(records, handler)
+    for _ in range(5):
+        records.put(record())
+    listener.start()
+    listener.stop()
+    assert len(written) == 5
@@ -0,0 +1,234 @@
+import threading
+import time
+
+import pytest
+
+import motor
+
+EXTEND0, RETRACT0 = motor.STRUT_PINS[0]
+EXTEND1, RETRACT1 = motor.STRUT_PINS[1]
+
+
+@pytest.fixture(autouse=True)
+def motor_state():
+    """Struts home and cold, with a clean GPIO log"""
+    motor.motion.stop('test setup', timeout=5)
+    motor.init()
+    motor.gpio.backend.edges.clear()
+    motor.X_AT = motor.Y_AT = 0
+    motor.POSITION_SIGMA_MM[:] = [0.0, 0.0]
+    motor.thermal.reset()
+    yield
+    motor.motion.stop('test teardown', timeout=5)
+
+
+def edges(pin, level):
+    """Times a pin changed to level"""
+    return [t for t, p, l in motor.gpio.backend.edges if p == pin and l == level]
+
+
+def test_move_struts_runs_both_at_once():
+    started = time.monotonic()
+    assert motor.move_struts(0.3, -0.15)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.3 + 0.1  # not 0.45 for one after the other
+    (on0,), (on1,) = edges(EXTEND0, True), edges(RETRACT1, True)
+    (off0,), (off1,) = edges(EXTEND0, False), edges(RETRACT1, False)
+    assert abs(on0 - on1) < 0.01
+    assert off1 - on1 == pytest.approx(0.15, abs=motor.CONTROL_TICK_SECONDS + 0.01)
+    assert off0 - on0 == pytest.approx(0.3, abs=motor.CONTROL_TICK_SECONDS + 0.01)
+    assert not edges(RETRACT0, True) and not edges(EXTEND1, True)
+
+
+def test_move_to_position_takes_the_longer_strut():
+    seconds = motor.move_duration(0, 0, 1.0, 0.5)
+    assert seconds == pytest.approx(10 * motor.SECONDS_PER_MM_STRUT0)
+
+    started = time.monotonic()
+    assert motor.move_to_position(1.0, 0.5)
+    assert time.monotonic() - started == pytest.approx(seconds, abs=0.1)
+    assert (motor.X_AT, motor.Y_AT) == (1.0, 0.5)
+
+
+def test_driven_time_is_charged_to_the_thermal_model():
+    motor.move_struts(0.2, 0)
+    assert motor.thermal.duty(0) > 0
+    assert motor.thermal.duty(1) == 0
+
+
+def wait_for(job_id, timeout=5.0):
+    """The job once it has finished, failed, been dropped or been cancelled"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = motor.motion.job(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return job  # None once trimmed from the history
+        time.sleep(0.005)
+    raise AssertionError(f'job {job_id} still {job["status"]}')
+
+
+@pytest.fixture
+def hold():
+    """A job that keeps the controller busy until the event is set"""
+    release = threading.Event()
+    job = motor.motion.submit('hold', release.wait, 5)
+    yield release
+    release.set()
+    wait_for(job['id'])
+
+
+@pytest.fixture
+def aimed(monkeypatch):
+    """Replace aim_at with one that records its targets and runs for 0.2s of control ticks"""
+    calls = []
+
+    def aim_at(angle_offset, distance_mm, velocity=None, preempt=None):
+        calls.append((angle_offset, distance_mm))
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            if motor.motion.token.wait(motor.CONTROL_TICK_SECONDS):
+                return {'completed': False}
+            if preempt is not None and preempt(deadline - time.monotonic()):
+                return {'completed': False}
+        return {'completed': True}
+
+    monkeypatch.setattr(motor, 'aim_at', aim_at)
+    return calls
+
+
+def test_jobs_run_in_order_with_increasing_ids():
+    order = []
+    jobs = [motor.motion.submit('step', order.append, i) for i in range(5)]
+    assert [job['id'] for job in jobs] == sorted(job['id'] for job in jobs)
+    for job in jobs:
+        assert wait_for(job['id'])['status'] == 'done'
+    assert order == list(range(5))
+
+
+def test_failing_job_reports_its_error():
+    job = motor.motion.submit('fail', int, 'not a number')
+    job = wait_for(job['id'])
+    assert job['status'] == 'failed'
+    assert 'not a number' in job['error']
+
+
+def test_latest_target_wins(hold, aimed):
+    before = motor.motion.targets_dropped
+    jobs = [motor.motion.submit_target(angle, 2000) for angle in (-10, 0, 10)]
+    hold.set()
+    assert wait_for(jobs[-1]['id'])['status'] == 'done'
+    assert [motor.motion.job(job['id'])['status'] for job in jobs[:-1]] == ['dropped', 'dropped']
+    assert aimed == [(10, 2000)]
+    assert motor.motion.targets_dropped - before == 2
+
+
+def test_stop_cancels_the_running_and_queued_jobs():
+    running = motor.motion.submit('drive', motor.drive, (5.0, -5.0))
+    queued = motor.motion.submit('drive', motor.drive, (5.0, 0))
+    while motor.motion.job(running['id'])['status'] == 'queued':
+        time.sleep(0.005)
+
+    started = time.monotonic()
+    cancelled = motor.motion.stop('test', timeout=1)
+    assert time.monotonic() - started < 2 * motor.CONTROL_TICK_SECONDS + 0.05
+    assert set(cancelled) == {running['id'], queued['id']}
+    assert wait_for(running['id'])['status'] == 'cancelled'
+    assert wait_for(queued['id'])['error'] == 'test'
+    assert not any(motor.gpio.levels.values())  # both struts stopped
+
+
+def test_wait_idle_waits_for_queued_and_running_jobs(hold):
+    job = motor.motion.submit('step', time.sleep, 0.1)
+    assert not motor.motion.wait_idle(0.05)
+    hold.set()
+    assert motor.motion.wait_idle(2)
+    assert motor.motion.job(job['id'])['status'] == 'done'
+
+
+def test_trimmed_cancelled_jobs_do_not_stop_the_controller(hold):
+    queued = [motor.motion.submit('step', int, 1) for _ in range(3)]
+    motor.motion.stop('test')  # the holding job ignores the token
+    for _ in range(motor.MAX_JOB_HISTORY + 20):
+        motor.motion.submit('step', int, 1)  # finished jobs pile up and get trimmed
+    assert motor.motion.job(queued[0]['id']) is None
+    hold.set()
+    job = motor.motion.submit('step', int, 2)
+    assert wait_for(job['id'])['status'] == 'done'
+    assert motor.motion._thread.is_alive()
+
+
+def start_target_move(angle_offset, distance_mm, lead_mm=5.0):
+    """Start a real target move from lead_mm short of the target on both struts"""
+    x, y = motor.aim_position(angle_offset, distance_mm)
+    motor.X_AT, motor.Y_AT = x - lead_mm / 10.0, y - lead_mm / 10.0
+    job = motor.motion.submit_target(angle_offset, distance_mm)
+    while motor.motion.job(job['id'])['status'] == 'queued':
+        time.sleep(0.005)
+    return job
+
+
+def test_close_target_lets_the_running_move_finish():
+    superseded = motor.motion.targets_superseded
+    job = start_target_move(10, 2000)
+    motor.motion.submit_target(10.1, 2000)  # well within RETARGET_ERROR_MM of the goal
+    job = wait_for(job['id'])
+    assert job['result']['completed']
+    assert motor.motion.targets_superseded == superseded
+
+
+def test_far_target_stops_the_running_move():
+    superseded = motor.motion.targets_superseded
+    saved = motor.motion.seconds_saved
+    job = start_target_move(10, 2000)
+    submitted = time.monotonic()
+    motor.motion.submit_target(-30, 2000)
+    job = wait_for(job['id'])
+    assert time.monotonic() - submitted < 2 * motor.CONTROL_TICK_SECONDS + 0.05
+    assert not job['result']['completed']
+    assert motor.motion.targets_superseded == superseded + 1
+    assert motor.motion.seconds_saved > saved
+
+
+def test_drives_stop_at_the_end_stops():
+    full_stroke = motor.calibration.duration(0, motor.MAX_OUT_MM, 0)
+    assert motor.limit_drive(0, 50.0) == pytest.approx(full_stroke)
+    assert motor.limit_drive(0, -5.0) == 0
+    motor.X_AT = motor.MAX_OUT_MM / 20.0  # half way out
+    assert motor.limit_drive(0, -50.0) == pytest.approx(-full_stroke / 2)
+    assert motor.limit_drive(0, 1.0) == 1.0
+
+
+def test_move_to_position_chunks_are_limited(monkeypatch):
+    drives = []
+
+    def move_struts(strut0_seconds, strut1_seconds, preempt=None):
+        drives.append((strut0_seconds, strut1_seconds))
+        motor.track_motion((strut0_seconds, strut1_seconds))
+        return True
+
+    monkeypatch.setattr(motor, 'move_struts', move_struts)
+    motor.X_AT = -20.0  # dead reckoning far behind the stop
+    assert motor.move_to_position(50.0, 50.0)  # beyond the end stops
+
+    full_stroke = motor.calibration.duration(0, motor.MAX_OUT_MM, 0)
+    assert drives
+    for seconds in drives:
+        assert all(abs(s) <= min(full_stroke, motor.MAX_MOVE_SECONDS) + 1e-9 for s in seconds)
+    assert (motor.X_AT, motor.Y_AT) == (motor.MAX_OUT_MM / 10.0, motor.MAX_OUT_MM / 10.0)
+
+
+def test_moveto_retract_uses_the_retract_curve(monkeypatch):
+    from calibration import Calibration, SpeedCurve
+    curves = {1: SpeedCurve(1, 10.0, lag_seconds=0.1), -1: SpeedCurve(-1, 20.0, lag_seconds=0.3)}
+    monkeypatch.setattr(motor, 'calibration', Calibration([curves, curves]))
+    submitted = []
+    monkeypatch.setattr(motor.motion, 'submit',
+                        lambda action, func, seconds, **params: submitted.append(seconds) or {'id': 0})
+    motor.X_AT = 6.0  # 60mm out
+
+    client = motor.app.test_client()
+    assert client.get('/moveto/0/-20').status_code == 202
+    assert client.get('/moveto/0/20').status_code == 202
+    assert submitted[0] == pytest.approx(-(0.3 + 20 / 20.0))
+    assert submitted[1] == pytest.approx(0.1 + 20 / 10.0)
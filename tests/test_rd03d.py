@@ -0,0 +1,41 @@
+import queue
+import time
+
+from bench_rd03d import LegacyRD03D, make_frame, make_stream, run
+from radar_capture import CaptureWriter, RD03DReplay
+from rd03d import RD03D
+
+FRAMES = 200
+
+
+def test_bench_scanners_agree():
+    data = make_stream(FRAMES)
+    for chunk_size in (30, 64, 1024):
+        _, _, legacy = run(LegacyRD03D, data, chunk_size)
+        _, _, scanner = run(RD03D, data, chunk_size)
+        assert scanner == legacy
+    assert run(RD03D, data, 30)[2] == FRAMES  # one frame per poll
+
+
+def test_subscriber_gets_every_replayed_frame(tmp_path):
+    path = tmp_path / 'walk.cap'
+    with CaptureWriter(path) as writer:
+        for i in range(FRAMES):
+            frame = make_frame([(i, 1000 + i, 0, 0), (0, 0, 0, 0), (0, 0, 0, 0)])
+            # Split every frame over two reads like a busy UART
+            writer.write(frame[:13], writer.started + i * 0.001)
+            writer.write(frame[13:], writer.started + i * 0.001)
+
+    radar = RD03DReplay(path, speed=0)
+    frames = queue.Queue()
+    radar.subscribe(frames)
+    deadline = time.monotonic() + 5
+    while frames.qsize() < FRAMES and time.monotonic() < deadline:
+        time.sleep(0.01)
+    radar.close()
+
+    received = [frames.get_nowait() for _ in range(frames.qsize())]
+    assert [frame.seq for frame in received] == list(range(1, FRAMES + 1))
+    assert [frame.targets[0].x for frame in received] == list(range(FRAMES))
+    assert all(frame.decoded >= frame.timestamp for frame in received)
+    assert radar.latest() is received[-1]
@@ -0,0 +1,56 @@
+import math
+import time
+
+import pytest
+
+from thermal import ThermalModel
+
+TAU = 300.0
+LIMIT = 0.22
+COLD_BUDGET = TAU * math.log(1 / (1 - LIMIT))  # ~74.5s
+
+
+@pytest.fixture
+def model():
+    return ThermalModel(2, TAU, LIMIT)
+
+
+def test_cold_budget(model):
+    assert model.budget(0) == pytest.approx(COLD_BUDGET, rel=1e-3)
+    assert model.wait_seconds(0, 10.0) == 0.0
+
+
+def test_running_the_budget_reaches_the_limit(model):
+    t0 = time.monotonic()
+    model.record((COLD_BUDGET, 0.0), now=t0 + COLD_BUDGET)
+    assert model.duty(0, t0 + COLD_BUDGET) == pytest.approx(LIMIT)
+    assert model.budget(0, t0 + COLD_BUDGET) == pytest.approx(0.0, abs=1e-6)
+    assert model.budget(1, t0 + COLD_BUDGET) == pytest.approx(COLD_BUDGET, rel=1e-3)
+
+
+def test_duty_decays_with_tau(model):
+    t0 = time.monotonic()
+    model.record((30.0, 0.0), now=t0 + 30)
+    duty = model.duty(0, t0 + 30)
+    assert model.duty(0, t0 + 30 + TAU) == pytest.approx(duty / math.e)
+
+
+@pytest.mark.parametrize('seconds', [1.0, 10.0, 60.0])
+def test_waiting_buys_the_requested_budget(model, seconds):
+    t0 = time.monotonic()
+    model.record((COLD_BUDGET, 0.0), now=t0 + COLD_BUDGET)
+    now = t0 + COLD_BUDGET
+    wait = model.wait_seconds(0, seconds, now)
+    assert wait > 0
+    assert model.budget(0, now + wait * 0.9) < seconds  # the model only moves forward in time
+    assert model.budget(0, now + wait) == pytest.approx(seconds, rel=1e-6)
+
+
+def test_a_move_longer_than_the_cold_budget_never_fits(model):
+    assert model.wait_seconds(0, COLD_BUDGET + 1) == math.inf
+
+
+def test_reset_forgets_heat(model):
+    model.record((20.0, 20.0))
+    model.reset()
+    assert model.duty(0) == 0.0 and model.duty(1) == 0.0
@@ -0,0 +1,106 @@
+import pytest
+
+from bench_rd03d import make_frame
+from radar_capture import CaptureWriter, RD03DReplay
+from rd03d import Target
+from tracker import MultiTargetTracker
+
+FRAME_SECONDS = 0.1
+
+
+def walk(frames, start, step):
+    """(x, y) positions of someone walking at a constant step per frame"""
+    return [(start[0] + step[0] * i, start[1] + step[1] * i) for i in range(frames)]
+
+
+def targets(*points):
+    """A frame's three target slots, unused slots empty like the sensor reports them"""
+    slots = [Target(x, y, 0, 0) for x, y in points]
+    return slots + [Target(0, 0, 0, 0)] * (3 - len(slots))
+
+
+def nearest(tracks, point):
+    return min(tracks, key=lambda t: (t.x - point[0]) ** 2 + (t.y - point[1]) ** 2)
+
+
+def test_swapped_slots_keep_their_track_ids():
+    tracker = MultiTargetTracker()
+    left = walk(40, (-1500, 2000), (20, 10))
+    right = walk(40, (1500, 3000), (-15, 0))
+    ids = None
+    for i, (a, b) in enumerate(zip(left, right)):
+        # The sensor reorders its slots, here on every other frame
+        frame = targets(a, b) if i % 2 else targets(b, a)
+        tracks = tracker.update(frame, i * FRAME_SECONDS)
+        if i >= 3:
+            assert len(tracks) == 2
+            current = (nearest(tracks, a).id, nearest(tracks, b).id)
+            assert ids is None or current == ids
+            ids = current
+    assert ids[0] != ids[1]
+
+
+def test_velocity_is_estimated():
+    tracker = MultiTargetTracker()
+    for i, point in enumerate(walk(30, (0, 2000), (50, 0))):
+        tracker.update(targets(point), i * FRAME_SECONDS)
+    best = tracker.best()
+    assert best.vx == pytest.approx(500, rel=0.1)  # 50mm per 0.1s
+    assert abs(best.vy) < 50
+
+
+def test_empty_slots_are_not_tracked():
+    tracker = MultiTargetTracker()
+    for i in range(10):
+        assert tracker.update(targets(), i * FRAME_SECONDS) == []
+    assert len(tracker.ids) == 0
+
+
+def test_lost_track_is_dropped_and_a_new_one_gets_a_new_id():
+    tracker = MultiTargetTracker()
+    for i in range(5):
+        tracker.update(targets((0, 2000)), i * FRAME_SECONDS)
+    first = tracker.best().id
+
+    time = 5
+    while tracker.get(first) is not None:
+        tracker.update(targets(), time * FRAME_SECONDS)
+        time += 1
+        assert time < 50
+    for i in range(5):
+        tracker.update(targets((0, 2000)), (time + i) * FRAME_SECONDS)
+    assert tracker.best().id != first
+
+
+def test_far_detection_starts_a_new_track():
+    tracker = MultiTargetTracker(gate_mm=800.0)
+    for i in range(5):
+        tracker.update(targets((0, 2000)), i * FRAME_SECONDS)
+    first = tracker.best().id
+    tracker.update(targets((0, 2100), (3000, 5000)), 5 * FRAME_SECONDS)
+    assert tracker.get(first).y == pytest.approx(2100, abs=100)
+    assert len(tracker.tracks(0.0)) == 2
+
+
+def test_replayed_capture_keeps_ids(tmp_path):
+    left = walk(30, (-1000, 2500), (10, 0))
+    right = walk(30, (1000, 2500), (-10, 0))
+    path = tmp_path / 'two.cap'
+    with CaptureWriter(path) as writer:
+        for i, (a, b) in enumerate(zip(left, right)):
+            slots = [(*a, 0, 0), (*b, 0, 0)] if i % 3 else [(*b, 0, 0), (*a, 0, 0)]
+            writer.write(make_frame(slots + [(0, 0, 0, 0)]), writer.started + i * FRAME_SECONDS)
+
+    radar = RD03DReplay(path, speed=0)
+    tracker = MultiTargetTracker()
+    seen = set()
+    frame = 0
+    while not radar.finished:
+        if radar.update():
+            tracks = tracker.update(radar.targets, frame * FRAME_SECONDS)
+            if frame >= 3:
+                seen.add((nearest(tracks, left[frame]).id, nearest(tracks, right[frame]).id))
+            frame += 1
+    radar.close()
+    assert frame == 30
+    assert len(seen) == 1
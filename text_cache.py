@@ -0,0 +1,110 @@
+"""
+Cached text rendering for the pygame displays.
+
+Font.render() makes a new surface every call, and the info panels render
+the same labels every frame. TextCache keeps rendered strings in an LRU
+cache keyed by (font, string, color), and draws the numbers in a string
+from a glyph atlas per font and color, so a readout like "Distance: 3290mm"
+reuses the surfaces for "Distance: " and "mm" and blits the digits one by
+one. Once the labels have been seen, drawing text allocates no surfaces.
+
+Usage:
+    rect = cache.draw(screen, font, f"Speed: {speed:.1f}cm/s", WHITE, (10, 40))
+    surface = cache.render(font, "PAUSED", YELLOW)   # whole string, cached
+"""
+import re
+from collections import OrderedDict
+
+import pygame
+
+NUMERIC_CHARS = '0123456789.-+'
+CACHE_SIZE = 512  # rendered strings kept
+_NUMBER = re.compile(r'[0-9.+-]+')
+
+
+class GlyphAtlas:
+    """The NUMERIC_CHARS glyphs of one font and color, rendered once into one surface"""
+
+    def __init__(self, font, color, chars=NUMERIC_CHARS):
+        rendered = [font.render(ch, True, color) for ch in chars]
+        width = sum(glyph.get_width() for glyph in rendered)
+        height = max(glyph.get_height() for glyph in rendered)
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.glyphs = {}  # char -> subsurface of the atlas
+        x = 0
+        for ch, glyph in zip(chars, rendered):
+            # Adding onto the cleared atlas copies the glyph's alpha as is
+            self.surface.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_ADD)
+            self.glyphs[ch] = self.surface.subsurface((x, 0, glyph.get_width(), glyph.get_height()))
+            x += glyph.get_width()
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces, plus glyph atlases for numbers.
+
+    Args:
+        size: Rendered strings kept before the least recently used are evicted.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._surfaces = OrderedDict()  # (font, text, color) -> Surface
+        self._atlases = {}  # (font, color) -> GlyphAtlas
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        """The rendered surface for text, antialiased, from the cache if it is there"""
+        key = (font, text, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def atlas(self, font, color):
+        key = (font, color)
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = self._atlases[key] = GlyphAtlas(font, color)
+        return atlas
+
+    def draw(self, surface, font, text, color, position):
+        """Blit text at position, with its numbers drawn glyph by glyph from the atlas.
+
+        Returns:
+            pygame.Rect: The area drawn.
+        """
+        x, y = position
+        height = 0
+        pos = 0
+        for match in _NUMBER.finditer(text):
+            if match.start() > pos:
+                x, height = self._blit(surface, self.render(font, text[pos:match.start()], color), x, y, height)
+            glyphs = self.atlas(font, color).glyphs
+            for ch in match.group():
+                x, height = self._blit(surface, glyphs[ch], x, y, height)
+            pos = match.end()
+        if pos < len(text):
+            x, height = self._blit(surface, self.render(font, text[pos:], color), x, y, height)
+        return pygame.Rect(position[0], y, x - position[0], height)
+
+    @staticmethod
+    def _blit(surface, source, x, y, height):
+        """Blit source at (x, y), return the x after it and the height drawn so far"""
+        surface.blit(source, (x, y))
+        return x + source.get_width(), max(height, source.get_height())
+
+    def clear(self):
+        self._surfaces.clear()
+        self._atlases.clear()
+
+
+# Shared by the displays, fonts are part of the key
+cache = TextCache()
@@ -0,0 +1,94 @@
+"""
+Thermal model of the linear actuators.
+
+The actuators are rated for a 22% duty cycle. Instead of a duty cycle over
+the whole life of the process, each strut keeps an exponentially decaying
+duty estimate: running pulls it towards 1 and resting lets it decay towards
+0, both with time constant tau. A long rest therefore buys a bounded amount
+of running time, and a busy spell is forgotten after a few tau.
+
+Usage:
+    model = ThermalModel(struts=2, tau=300, limit=0.22)
+    seconds = model.budget(0)           # longest move strut 0 may make now
+    model.record((2.5, 0.0))            # after driving strut 0 for 2.5s
+    wait = model.wait_seconds(0, 10.0)  # rest needed before a 10s move
+"""
+import math
+import threading
+import time
+
+
+class ThermalModel:
+    """Exponentially weighted duty cycle per strut.
+
+    Args:
+        struts: Number of actuators.
+        tau: Time constant in seconds; roughly the window the duty cycle is measured over.
+        limit: Duty cycle an actuator must stay at or below.
+    """
+
+    def __init__(self, struts=2, tau=300.0, limit=0.22):
+        self.tau = tau
+        self.limit = limit
+        self._duty = [0.0] * struts
+        self._updated = [time.monotonic()] * struts
+        self._lock = threading.Lock()
+
+    def _advance(self, strut, now):
+        """Let a strut cool from its last update until now"""
+        elapsed = now - self._updated[strut]
+        if elapsed > 0:
+            self._duty[strut] *= math.exp(-elapsed / self.tau)
+            self._updated[strut] = now
+
+    def duty(self, strut, now=None):
+        """Current duty cycle estimate of a strut, 0..1"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._advance(strut, now)
+            return self._duty[strut]
+
+    def record(self, seconds, now=None):
+        """Charge a move that just ended.
+
+        Args:
+            seconds: Seconds each strut was driven (sign is ignored).
+            now: When the move ended, time.monotonic() by default.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for strut, strut_seconds in enumerate(seconds):
+                strut_seconds = abs(strut_seconds)
+                if not strut_seconds:
+                    continue
+                self._advance(strut, now - strut_seconds)
+                heat = math.exp(-strut_seconds / self.tau)
+                self._duty[strut] = 1.0 - (1.0 - self._duty[strut]) * heat
+                self._updated[strut] = now
+
+    def budget(self, strut, now=None):
+        """Longest a strut can run now without going over the limit, in seconds"""
+        duty = self.duty(strut, now)
+        if duty >= self.limit:
+            return 0.0
+        return self.tau * math.log((1.0 - duty) / (1.0 - self.limit))
+
+    def wait_seconds(self, strut, seconds, now=None):
+        """Rest needed before a strut can run for seconds, inf if it never can in one go"""
+        # Running for seconds ends at the limit when starting from this duty cycle
+        start_duty = 1.0 - (1.0 - self.limit) * math.exp(abs(seconds) / self.tau)
+        if start_duty < 0:
+            return math.inf
+        duty = self.duty(strut, now)
+        if duty <= start_duty:
+            return 0.0
+        if start_duty == 0:
+            return math.inf
+        return self.tau * math.log(duty / start_duty)
+
+    def reset(self):
+        """Forget all heat, e.g. at boot when the actuators are known to be cold"""
+        now = time.monotonic()
+        with self._lock:
+            self._duty = [0.0] * len(self._duty)
+            self._updated = [now] * len(self._duty)
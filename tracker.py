@@ -0,0 +1,235 @@
+"""
+Multi-target tracking on top of RD03D frames.
+
+The RD-03D reports up to three targets in slots that it reorders between
+frames. MultiTargetTracker follows each person with a constant velocity
+Kalman filter, associates detections to tracks with an optimal assignment
+each frame, and gives every track a stable ID and a confidence score.
+
+Usage:
+    tracker = MultiTargetTracker()
+    tracks = tracker.update(frame.targets, frame.timestamp)
+    best = tracker.best()
+"""
+import itertools
+import math
+
+import numpy as np
+
+# State is [x, y, vx, vy] in mm and mm/s, measurements are [x, y] in mm
+H = np.array([[1.0, 0.0, 0.0, 0.0],
+              [0.0, 1.0, 0.0, 0.0]])
+
+
+class Track:
+    """A snapshot of one tracked target, usable wherever an rd03d.Target is"""
+    __slots__ = ('id', 'x', 'y', 'vx', 'vy', 'confidence', 'hits', 'age', '_distance', '_angle')
+
+    def __init__(self, track_id, x, y, vx, vy, confidence, hits, age):
+        self.id = track_id
+        self.x = x                  # mm
+        self.y = y                  # mm
+        self.vx = vx                # mm/s
+        self.vy = vy                # mm/s
+        self.confidence = confidence  # 0..1
+        self.hits = hits            # frames with a matching detection
+        self.age = age              # frames since the track was created
+        self._distance = None
+        self._angle = None
+
+    @property
+    def distance(self):
+        """Distance from the sensor in mm"""
+        if self._distance is None:
+            self._distance = math.sqrt(self.x**2 + self.y**2)
+        return self._distance
+
+    @property
+    def angle(self):
+        """Angle from straight ahead in degrees, positive is right"""
+        if self._angle is None:
+            self._angle = math.degrees(math.atan2(self.x, self.y))
+        return self._angle
+
+    @property
+    def speed(self):
+        """Radial speed in cm/s, positive is away from the sensor like Target.speed"""
+        if self.distance == 0:
+            return 0.0
+        return (self.x * self.vx + self.y * self.vy) / self.distance / 10.0
+
+    def __str__(self):
+        return ('Track(id={}, x={:.0f}mm, y={:.0f}mm, vx={:.0f}mm/s, vy={:.0f}mm/s, '
+                'confidence={:.2f})').format(self.id, self.x, self.y, self.vx, self.vy, self.confidence)
+
+
+class MultiTargetTracker:
+    """Tracks people across RD03D frames with one Kalman filter per track.
+
+    All filters are stored in stacked arrays and predicted/corrected in one
+    vectorized step per frame, so the cost per frame does not grow with
+    Python overhead per track.
+
+    Args:
+        gate_mm: Largest distance between a prediction and a detection to associate them.
+        measurement_noise_mm: Standard deviation of the radar position measurement.
+        acceleration_noise: Standard deviation of the unmodelled acceleration in mm/s^2.
+        confirm_confidence: Tracks at or above this confidence are reported.
+        drop_confidence: Tracks whose confidence decays below this are deleted.
+        confidence_rate: How fast confidence follows hits (1.0) and misses (0.0).
+        max_tracks: Upper bound on simultaneous tracks.
+    """
+
+    def __init__(self, gate_mm=800.0, measurement_noise_mm=100.0, acceleration_noise=1500.0,
+                 confirm_confidence=0.5, drop_confidence=0.1, confidence_rate=0.3, max_tracks=8):
+        self.gate_mm = gate_mm
+        self.R = np.eye(2) * measurement_noise_mm**2
+        self.acceleration_noise = acceleration_noise
+        self.confirm_confidence = confirm_confidence
+        self.drop_confidence = drop_confidence
+        self.confidence_rate = confidence_rate
+        self.max_tracks = max_tracks
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.state = np.zeros((0, 4))           # [x, y, vx, vy] per track
+        self.covariance = np.zeros((0, 4, 4))
+        self.confidence = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.age = np.zeros(0, dtype=np.int64)
+        self.last_timestamp = None
+        self._next_id = 1
+        self._assignments = {}  # (rows, detections) -> candidate assignments
+
+    @staticmethod
+    def detections(targets):
+        """Positions of the occupied slots; the sensor reports empty slots as (0, 0)"""
+        points = [(t.x, t.y) for t in targets if t is not None and (t.x != 0 or t.y != 0)]
+        return np.array(points, dtype=float).reshape(-1, 2)
+
+    def predict(self, dt):
+        """Advance all tracks by dt seconds"""
+        if dt <= 0 or not len(self.ids):
+            return
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        # Discrete white noise acceleration model
+        G = np.array([[0.5 * dt**2, 0.0], [0.0, 0.5 * dt**2], [dt, 0.0], [0.0, dt]])
+        Q = G @ G.T * self.acceleration_noise**2
+        self.state = self.state @ F.T
+        self.covariance = F @ self.covariance @ F.T + Q
+
+    def _assign(self, cost):
+        """Optimal track/detection assignment for a (tracks, detections) cost matrix.
+
+        Unmatched detections are modelled as dummy rows costing the gate, so
+        an association is only made when it beats starting a new track. With
+        at most three detections per frame, enumerating the assignments is
+        exact like the Hungarian algorithm and cheaper at this size.
+
+        Returns:
+            Track row for each detection, -1 where a new track is needed.
+        """
+        tracks, count = cost.shape
+        key = (tracks, count)
+        candidates = self._assignments.get(key)
+        if candidates is None:
+            candidates = np.array(list(itertools.permutations(range(tracks + count), count)),
+                                  dtype=np.intp).reshape(-1, count)
+            self._assignments[key] = candidates
+        padded = np.vstack([np.minimum(cost, self.gate_mm), np.full((count, count), self.gate_mm)])
+        best = candidates[padded[candidates, np.arange(count)].sum(axis=1).argmin()]
+        rows = np.where(best < tracks, best, -1)
+        # A gated pair is no better than a dummy row, start a new track for it
+        matched = rows >= 0
+        rows[matched & (cost[np.maximum(rows, 0), np.arange(count)] >= self.gate_mm)] = -1
+        return rows
+
+    def update(self, targets, timestamp):
+        """Feed one frame of targets.
+
+        Args:
+            targets: The frame's rd03d.Target list (empty slots are ignored).
+            timestamp: Frame time in seconds, e.g. Frame.timestamp.
+
+        Returns:
+            list[Track]: Confirmed tracks, most confident first.
+        """
+        if self.last_timestamp is not None:
+            self.predict(timestamp - self.last_timestamp)
+        self.last_timestamp = timestamp
+
+        points = self.detections(targets)
+        rows = np.full(len(points), -1, dtype=np.intp)
+        if len(self.ids) and len(points):
+            predicted = self.state[:, :2]
+            cost = np.linalg.norm(predicted[:, None, :] - points[None, :, :], axis=2)
+            rows = self._assign(cost)
+
+        # Kalman correction for all matched tracks at once
+        matched = rows >= 0
+        if matched.any():
+            idx = rows[matched]
+            P = self.covariance[idx]
+            S = P[:, :2, :2] + self.R
+            K = P[:, :, :2] @ np.linalg.inv(S)
+            innovation = points[matched] - self.state[idx, :2]
+            self.state[idx] += (K @ innovation[:, :, None])[:, :, 0]
+            self.covariance[idx] = (np.eye(4) - K @ H) @ P
+
+        hit = np.zeros(len(self.ids), dtype=bool)
+        hit[rows[matched]] = True
+        rate = self.confidence_rate
+        self.confidence = np.where(hit, self.confidence + rate * (1.0 - self.confidence),
+                                   self.confidence * (1.0 - rate))
+        self.hits += hit
+        self.age += 1
+
+        self._drop(self.confidence >= self.drop_confidence)
+        for point in points[~matched]:
+            self._start(point)
+
+        return self.tracks()
+
+    def _drop(self, keep):
+        self.ids = self.ids[keep]
+        self.state = self.state[keep]
+        self.covariance = self.covariance[keep]
+        self.confidence = self.confidence[keep]
+        self.hits = self.hits[keep]
+        self.age = self.age[keep]
+
+    def _start(self, point):
+        if len(self.ids) >= self.max_tracks:
+            weakest = self.confidence.argmin()
+            if self.confidence[weakest] >= self.confidence_rate:
+                return
+            self._drop(np.arange(len(self.ids)) != weakest)
+        covariance = np.diag([self.R[0, 0], self.R[1, 1], 1000.0**2, 1000.0**2])
+        self.ids = np.append(self.ids, self._next_id)
+        self.state = np.vstack([self.state, [point[0], point[1], 0.0, 0.0]])
+        self.covariance = np.concatenate([self.covariance, covariance[None]])
+        self.confidence = np.append(self.confidence, self.confidence_rate)
+        self.hits = np.append(self.hits, 1)
+        self.age = np.append(self.age, 1)
+        self._next_id += 1
+
+    def tracks(self, min_confidence=None):
+        """Current tracks at or above min_confidence, most confident first"""
+        if min_confidence is None:
+            min_confidence = self.confirm_confidence
+        order = np.argsort(-self.confidence, kind='stable')
+        return [Track(int(self.ids[i]), *map(float, self.state[i]), float(self.confidence[i]),
+                      int(self.hits[i]), int(self.age[i]))
+                for i in order if self.confidence[i] >= min_confidence]
+
+    def best(self):
+        """The most confident confirmed track, or None"""
+        tracks = self.tracks()
+        return tracks[0] if tracks else None
+
+    def get(self, track_id):
+        """A track by ID regardless of confidence, or None if it was dropped"""
+        for track in self.tracks(0.0):
+            if track.id == track_id:
+                return track
+        return None